@@ -334,20 +334,21 @@ class Base(ABC):
             )
         return profile
 
-    def get_any_profiles(self, userids: List[UserID]) -> List[Tuple[UserID, Profile]]:
+    def get_any_profiles(self, userids: List[UserID], keys: Optional[List[str]] = None) -> List[Tuple[UserID, Profile]]:
         """
         Does the identical thing to the above function, but takes a list of user IDs to
         fetch in bulk.
 
         Parameters:
             userids - List of user IDs we are getting the profile for.
+            keys - Optional list of profile keys to fetch, for when only a few are needed.
 
         Returns:
             A list of tuples with the User ID and dictionary representing the user's profile,
             or an empty dictionary if nothing was found.
         """
         userids = list(set(userids))
-        profiles = self.data.remote.user.get_any_profiles(self.game, self.version, userids)
+        profiles = self.data.remote.user.get_any_profiles(self.game, self.version, userids, keys)
         return [
             (
                 userid,
@@ -76,7 +76,7 @@ class Dispatch:
         pcbid = tree.attribute("srcid")
 
         # If we are enforcing, bail out if we don't recognize thie ID
-        pcb = self.__data.local.machine.get_machine(pcbid)
+        pcb = self.__data.local.machine.get_cached_machine(pcbid)
         if self.__config.server.enforce_pcbid and pcb is None:
             self.log("Unrecognized PCBID {}", pcbid)
             raise UnrecognizedPCBIDException(pcbid, modelstring, self.__config.client.address)
@@ -87,7 +87,7 @@ class Dispatch:
 
         request = tree.children[0]
 
-        config = self.__config.clone()
+        config = self.__config.overlay()
         config["machine"] = {
             "pcbid": pcbid,
             "arcade": pcb.arcade,
@@ -96,7 +96,7 @@ class Dispatch:
         # If the machine we looked up is in an arcade, override the global
         # paseli settings with the arcade paseli settings.
         if pcb.arcade is not None:
-            arcade = self.__data.local.machine.get_arcade(pcb.arcade)
+            arcade = self.__data.local.machine.get_cached_arcade(pcb.arcade)
             if arcade is not None:
                 config["paseli"]["enabled"] = arcade.data.get_bool("paseli_enabled")
                 config["paseli"]["infinite"] = arcade.data.get_bool("paseli_infinite")
@@ -141,23 +141,26 @@ class Dispatch:
                     )
                     raise UnrecognizedPCBIDException(pcbid, modelstring, config.client.address)
 
-        # First, try to handle with specific service/method function
-        try:
-            handler = getattr(game, f"handle_{request.name}_{method}_request")
-        except AttributeError:
-            handler = None
-        if handler is not None:
-            response = handler(request)
-
-        if response is None:
-            # Now, try to pass it off to a generic service handler
+        # Run the whole handler in one transaction so that we only commit once
+        # per request instead of once per query.
+        with self.__data.transaction():
+            # First, try to handle with specific service/method function
             try:
-                handler = getattr(game, f"handle_{request.name}_requests")
+                handler = getattr(game, f"handle_{request.name}_{method}_request")
             except AttributeError:
                 handler = None
             if handler is not None:
                 response = handler(request)
 
+            if response is None:
+                # Now, try to pass it off to a generic service handler
+                try:
+                    handler = getattr(game, f"handle_{request.name}_requests")
+                except AttributeError:
+                    handler = None
+                if handler is not None:
+                    response = handler(request)
+
         if response is None:
             # Unrecognized handler
             self.log(f"Unrecognized service {request.name} method {method}")
@@ -72,6 +72,9 @@ class IIDXBase(CoreHandler, CardManagerHandler, PASELIHandler, Base):
     DAN_RANKING_SINGLE: Final[str] = "sgrade"
     DAN_RANKING_DOUBLE: Final[str] = "dgrade"
 
+    # Profile keys needed to show other players on a song's ranking list.
+    RANKING_PROFILE_KEYS: Final[List[str]] = ["name", "pid", "qpro", "shop_location", "sgrade", "dgrade"]
+
     GHOST_TYPE_NONE: Final[int] = 0
     GHOST_TYPE_RIVAL: Final[int] = 100
     GHOST_TYPE_GLOBAL_TOP: Final[int] = 200
@@ -213,9 +216,9 @@ class IIDXBase(CoreHandler, CardManagerHandler, PASELIHandler, Base):
             },
         }
         """
-        all_attempts, remote_attempts = Parallel.execute(
+        local_stats, remote_attempts = Parallel.execute(
             [
-                lambda: self.data.local.music.get_all_attempts(
+                lambda: self.data.local.music.get_clear_statistics(
                     game=self.game,
                     version=self.music_version,
                     songid=songid,
@@ -230,36 +233,18 @@ class IIDXBase(CoreHandler, CardManagerHandler, PASELIHandler, Base):
             ]
         )
 
+        # Local totals are kept up to date as attempts are saved, so we only need to reshape them.
+        # Attempts that were outside of the clear infra are already excluded from plays.
         attempts: Dict[int, Dict[int, Dict[str, int]]] = {}
-        for _, attempt in all_attempts:
-            if attempt.data.get_int("clear_status") == self.CLEAR_STATUS_NO_PLAY:
-                # This attempt was outside of the clear infra, so don't bother with it.
-                continue
-
-            # Terrible temporary structure is terrible.
-            if attempt.id not in attempts:
-                attempts[attempt.id] = {}
-            if attempt.chart not in attempts[attempt.id]:
-                attempts[attempt.id][attempt.chart] = {
-                    "total": 0,
-                    "clears": 0,
-                    "fcs": 0,
+        for statsid in local_stats:
+            attempts[statsid] = {}
+            for statschart in local_stats[statsid]:
+                attempts[statsid][statschart] = {
+                    "total": local_stats[statsid][statschart]["plays"],
+                    "clears": local_stats[statsid][statschart]["clears"],
+                    "fcs": local_stats[statsid][statschart]["combos"],
                 }
 
-            # We saw an attempt, keep the total attempts in sync.
-            attempts[attempt.id][attempt.chart]["total"] = attempts[attempt.id][attempt.chart]["total"] + 1
-
-            if attempt.data.get_int("clear_status", self.CLEAR_STATUS_FAILED) == self.CLEAR_STATUS_FAILED:
-                # This attempt was a failure, so don't count it against clears of full combos
-                continue
-
-            # It was at least a clear
-            attempts[attempt.id][attempt.chart]["clears"] = attempts[attempt.id][attempt.chart]["clears"] + 1
-
-            if attempt.data.get_int("clear_status") == self.CLEAR_STATUS_FULL_COMBO:
-                # This was a full combo clear, so it also counts here
-                attempts[attempt.id][attempt.chart]["fcs"] = attempts[attempt.id][attempt.chart]["fcs"] + 1
-
         # Merge in remote attempts
         for songid in remote_attempts:
             if songid not in attempts:
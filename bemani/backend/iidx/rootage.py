@@ -585,7 +585,9 @@ class IIDXRootage(IIDXCourse, IIDXBase):
             key=lambda s: (s[1].points, s[1].timestamp),
             reverse=True,
         )
-        all_players = {uid: prof for (uid, prof) in self.get_any_profiles([s[0] for s in all_scores])}
+        all_players = {
+            uid: prof for (uid, prof) in self.get_any_profiles([s[0] for s in all_scores], self.RANKING_PROFILE_KEYS)
+        }
 
         shop_id = ID.parse_machine_id(request.attribute("location_id"))
         if not global_scores:
@@ -657,7 +659,7 @@ class IIDXRootage(IIDXCourse, IIDXBase):
                 reverse=True,
             )
             missing_players = [uid for (uid, _) in all_scores if uid not in all_players]
-            for uid, prof in self.get_any_profiles(missing_players):
+            for uid, prof in self.get_any_profiles(missing_players, self.RANKING_PROFILE_KEYS):
                 all_players[uid] = prof
 
             if not global_scores:
@@ -728,7 +728,9 @@ class IIDXSinobuz(IIDXCourse, IIDXBase):
             key=lambda s: (s[1].points, s[1].timestamp),
             reverse=True,
         )
-        all_players = {uid: prof for (uid, prof) in self.get_any_profiles([s[0] for s in all_scores])}
+        all_players = {
+            uid: prof for (uid, prof) in self.get_any_profiles([s[0] for s in all_scores], self.RANKING_PROFILE_KEYS)
+        }
 
         if not global_scores:
             all_scores = [
@@ -803,7 +805,7 @@ class IIDXSinobuz(IIDXCourse, IIDXBase):
                 reverse=True,
             )
             missing_players = [uid for (uid, _) in all_scores if uid not in all_players]
-            for uid, prof in self.get_any_profiles(missing_players):
+            for uid, prof in self.get_any_profiles(missing_players, self.RANKING_PROFILE_KEYS):
                 all_players[uid] = prof
 
             if not global_scores:
@@ -121,9 +121,9 @@ class SoundVoltexBase(CoreHandler, CardManagerHandler, PASELIHandler, Base):
             },
         }
         """
-        all_attempts, remote_attempts = Parallel.execute(
+        local_stats, remote_attempts = Parallel.execute(
             [
-                lambda: self.data.local.music.get_all_attempts(
+                lambda: self.data.local.music.get_clear_statistics(
                     game=self.game,
                     version=self.version,
                 ),
@@ -133,38 +133,19 @@ class SoundVoltexBase(CoreHandler, CardManagerHandler, PASELIHandler, Base):
                 ),
             ]
         )
+
+        # Local totals are kept up to date as attempts are saved, so we only need to reshape them.
         attempts: Dict[int, Dict[int, Dict[str, int]]] = {}
-        for _, attempt in all_attempts:
-            # Terrible temporary structure is terrible.
-            if attempt.id not in attempts:
-                attempts[attempt.id] = {}
-            if attempt.chart not in attempts[attempt.id]:
-                attempts[attempt.id][attempt.chart] = {
-                    "total": 0,
-                    "clears": 0,
-                    "average": 0,
+        for songid in local_stats:
+            attempts[songid] = {}
+            for songchart in local_stats[songid]:
+                stats = local_stats[songid][songchart]
+                attempts[songid][songchart] = {
+                    "total": stats["attempts"],
+                    "clears": stats["clears"],
+                    "average": int(stats["points"] / stats["attempts"]) if stats["attempts"] > 0 else 0,
                 }
 
-            # We saw an attempt, keep the total attempts in sync.
-            attempts[attempt.id][attempt.chart]["average"] = int(
-                (
-                    (attempts[attempt.id][attempt.chart]["average"] * attempts[attempt.id][attempt.chart]["total"])
-                    + attempt.points
-                )
-                / (attempts[attempt.id][attempt.chart]["total"] + 1)
-            )
-            attempts[attempt.id][attempt.chart]["total"] += 1
-
-            if attempt.data.get_int("clear_type", self.CLEAR_TYPE_NO_PLAY) in [
-                self.CLEAR_TYPE_NO_PLAY,
-                self.CLEAR_TYPE_FAILED,
-            ]:
-                # This attempt was a failure, so don't count it against clears of full combos
-                continue
-
-            # It was at least a clear
-            attempts[attempt.id][attempt.chart]["clears"] += 1
-
         # Merge in remote attempts
         for songid in remote_attempts:
             if songid not in attempts:
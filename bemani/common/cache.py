@@ -1,5 +1,190 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple, Union
+
 from flask import Flask
 from flask_caching import Cache
+from flask_caching.backends.base import BaseCache
+from werkzeug.utils import import_string
+
+
+class TieredCache(BaseCache):
+    """
+    A cache backend that keeps a small, short-lived, per-process LRU in front of another
+    backend such as memcached. Hot values that are looked up on nearly every request, such
+    as song catalogs, item lists and game settings, are then served out of process memory
+    instead of costing a network round-trip each time. Since it is just another flask-caching
+    backend, anything using the cache (including @cache.memoize) works unchanged.
+
+    Only reads fill the local tier. Writes and deletes go straight to the remote tier and
+    drop any local copy, so that values handed from one request to the next (which might be
+    served by different processes) are always read back from the remote tier. Writes made
+    by other processes show up once the local copy expires, so the local timeout should be
+    kept short. Values are pickled in the local tier just like the remote tier would, so
+    callers can modify what they get back without affecting anyone else.
+    """
+
+    def __init__(
+        self,
+        remote: BaseCache,
+        local_size: int = 1024,
+        local_timeout: int = 5,
+        default_timeout: int = 300,
+        ignore_delete_many_errors: bool = False,
+    ) -> None:
+        super().__init__(default_timeout=default_timeout, ignore_delete_many_errors=ignore_delete_many_errors)
+        self.remote = remote
+        self.__size = local_size
+        self.__timeout = local_timeout
+        self.__entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__stats = {
+            "local_hits": 0,
+            "local_misses": 0,
+            "remote_hits": 0,
+            "remote_misses": 0,
+        }
+
+    @classmethod
+    def factory(
+        cls,
+        app: Flask,
+        config: Dict[str, Any],
+        args: List[Any],
+        kwargs: Dict[str, Any],
+    ) -> "TieredCache":
+        remote_type = config["CACHE_TIERED_REMOTE"]
+        if "." not in remote_type:
+            remote_type = "flask_caching.backends." + remote_type
+        remote = import_string(remote_type).factory(app, config, list(args), dict(kwargs))
+        return cls(
+            remote,
+            local_size=config.get("CACHE_TIERED_LOCAL_SIZE", 1024),
+            local_timeout=config.get("CACHE_TIERED_LOCAL_TIMEOUT", 5),
+            **kwargs,
+        )
+
+    def __local_get(self, key: str) -> Tuple[bool, Any]:
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry[0] <= now:
+                self.__stats["local_misses"] += 1
+                return (False, None)
+            self.__stats["local_hits"] += 1
+            self.__entries.move_to_end(key)
+            data = entry[1]
+        return (True, pickle.loads(data))
+
+    def __local_set(self, key: str, value: Any) -> None:
+        if value is None:
+            # Backends use None to signal a miss, so there's no point in holding onto it.
+            return
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.__lock:
+            self.__entries.pop(key, None)
+            self.__entries[key] = (time.monotonic() + self.__timeout, data)
+            while len(self.__entries) > self.__size:
+                self.__entries.popitem(last=False)
+
+    def __local_delete(self, *keys: str) -> None:
+        with self.__lock:
+            for key in keys:
+                self.__entries.pop(key, None)
+
+    def __remote_result(self, value: Any) -> None:
+        with self.__lock:
+            if value is None:
+                self.__stats["remote_misses"] += 1
+            else:
+                self.__stats["remote_hits"] += 1
+
+    def statistics(self) -> Dict[str, Dict[str, int]]:
+        """
+        Return hit/miss statistics for each tier, for tuning the local size and timeout.
+
+        Returns:
+            A dictionary keyed by 'local' and 'remote', each containing the number of
+            hits and misses for that tier. The local tier also includes its current size.
+            Remote lookups only happen on a local miss.
+        """
+        with self.__lock:
+            return {
+                "local": {
+                    "hits": self.__stats["local_hits"],
+                    "misses": self.__stats["local_misses"],
+                    "size": len(self.__entries),
+                },
+                "remote": {
+                    "hits": self.__stats["remote_hits"],
+                    "misses": self.__stats["remote_misses"],
+                },
+            }
+
+    def get(self, key: str) -> Any:
+        found, value = self.__local_get(key)
+        if found:
+            return value
+        value = self.remote.get(key)
+        self.__remote_result(value)
+        self.__local_set(key, value)
+        return value
+
+    def get_many(self, *keys: str) -> List[Any]:
+        values: Dict[str, Any] = {}
+        missing: List[str] = []
+        for key in keys:
+            found, value = self.__local_get(key)
+            if found:
+                values[key] = value
+            else:
+                missing.append(key)
+        if missing:
+            for key, value in zip(missing, self.remote.get_many(*missing)):
+                self.__remote_result(value)
+                self.__local_set(key, value)
+                values[key] = value
+        return [values[key] for key in keys]
+
+    def has(self, key: str) -> bool:
+        found, _ = self.__local_get(key)
+        return found or self.remote.has(key)
+
+    def set(self, key: str, value: Any, timeout: Union[int, timedelta, None] = None) -> Optional[bool]:
+        self.__local_delete(key)
+        return self.remote.set(key, value, timeout=timeout)
+
+    def add(self, key: str, value: Any, timeout: Union[int, timedelta, None] = None) -> bool:
+        self.__local_delete(key)
+        return self.remote.add(key, value, timeout=timeout)
+
+    def set_many(self, mapping: Dict[str, Any], timeout: Union[int, timedelta, None] = None) -> List[Any]:
+        self.__local_delete(*mapping.keys())
+        return self.remote.set_many(mapping, timeout=timeout)
+
+    def delete(self, key: str) -> bool:
+        self.__local_delete(key)
+        return self.remote.delete(key)
+
+    def delete_many(self, *keys: str) -> List[Any]:
+        self.__local_delete(*keys)
+        return self.remote.delete_many(*keys)
+
+    def clear(self) -> bool:
+        with self.__lock:
+            self.__entries.clear()
+        return self.remote.clear()
+
+    def inc(self, key: str, delta: int = 1) -> Optional[int]:
+        self.__local_delete(key)
+        return self.remote.inc(key, delta=delta)
+
+    def dec(self, key: str, delta: int = 1) -> Optional[int]:
+        self.__local_delete(key)
+        return self.remote.dec(key, delta=delta)
 
 
 # This somewhat breaks convention of trying to keep flask stuff in only the application
@@ -15,3 +200,17 @@ cache = Cache(
     # utilities that don't want to set up the entire infrastructure, provide a sane default.
     config={"CACHE_TYPE": "SimpleCache"},
 )
+
+
+def cache_statistics() -> Dict[str, Dict[str, int]]:
+    """
+    Return per-tier hit/miss statistics for the cache in use by this process.
+
+    Returns:
+        The statistics from TieredCache.statistics(), or an empty dictionary if the
+        cache isn't tiered.
+    """
+    backend: BaseCache = cache.cache
+    if isinstance(backend, TieredCache):
+        return backend.statistics()
+    return {}
@@ -1,7 +1,13 @@
 import concurrent.futures
-from typing import Any, Callable, List, TypeVar
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+from typing_extensions import Final
 
 T = TypeVar("T")
+C = TypeVar("C", bound=Callable[..., Any])
 
 
 class Parallel:
@@ -9,8 +15,157 @@ class Parallel:
     Utilities for executing parallel operations. This is used as a convenience
     so that we don't have to plumb async/await support (yuck) through the network,
     but we can still make multiple queries at once to remote services and the DB.
+
+    All calls share a single bounded pool of worker threads per process, so that
+    we aren't spinning up and tearing down threads on every request. Calls can be
+    nested freely, since the caller runs any of its own work that a worker hasn't
+    picked up yet instead of blocking on it.
+
+    A thread can also ask for its calls to be run on itself instead, which is needed
+    when the work reads from a DB transaction that only that thread's session can see.
+    Work marked as offloadable, such as talking to remote servers, still goes to the
+    pool so that it isn't held up one call at a time.
     """
 
+    MAX_WORKERS: Final[int] = 32
+
+    __lock = threading.Lock()
+    __executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+    __local = threading.local()
+    __stats: Dict[str, float] = {
+        "queued": 0,
+        "running": 0,
+        "tasks": 0,
+        "inline": 0,
+        "wait_time": 0.0,
+        "run_time": 0.0,
+    }
+
+    @staticmethod
+    def __get_executor() -> concurrent.futures.ThreadPoolExecutor:
+        with Parallel.__lock:
+            if Parallel.__executor is None:
+                Parallel.__executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=Parallel.MAX_WORKERS,
+                    thread_name_prefix="parallel",
+                )
+            return Parallel.__executor
+
+    @staticmethod
+    def _reset() -> None:
+        # Worker threads don't survive a fork, so the child needs to start its own pool.
+        Parallel.__lock = threading.Lock()
+        Parallel.__executor = None
+        Parallel.__stats["queued"] = 0
+        Parallel.__stats["running"] = 0
+
+    @staticmethod
+    def __run(queued: float, inline: bool, func: Callable[..., Any], params: Tuple[Any, ...]) -> Any:
+        start = time.monotonic()
+        with Parallel.__lock:
+            Parallel.__stats["queued"] -= 1
+            Parallel.__stats["running"] += 1
+            Parallel.__stats["wait_time"] += start - queued
+            if inline:
+                Parallel.__stats["inline"] += 1
+        try:
+            return func(*params)
+        finally:
+            with Parallel.__lock:
+                Parallel.__stats["running"] -= 1
+                Parallel.__stats["tasks"] += 1
+                Parallel.__stats["run_time"] += time.monotonic() - start
+
+    @staticmethod
+    def __run_all(calls: Sequence[Tuple[Callable[..., Any], Tuple[Any, ...]]]) -> List[Any]:
+        if len(calls) == 0:
+            return []
+
+        queued = time.monotonic()
+        with Parallel.__lock:
+            Parallel.__stats["queued"] += len(calls)
+
+        # While serial, only work that was marked as not needing this thread may leave it.
+        serial = getattr(Parallel.__local, "serial", 0) > 0
+        pooled = [not serial or getattr(func, "offloadable", False) for func, _ in calls]
+        if len(calls) == 1 or not any(pooled):
+            # Nothing to run alongside, or the caller needs everything to run on its own
+            # thread, so don't bother handing this off.
+            results: List[Any] = []
+            try:
+                for func, params in calls:
+                    results.append(Parallel.__run(queued, True, func, params))
+            except BaseException:
+                with Parallel.__lock:
+                    Parallel.__stats["queued"] -= len(calls) - len(results) - 1
+                raise
+            return results
+
+        executor = Parallel.__get_executor()
+        futures = [
+            executor.submit(Parallel.__run, queued, False, func, params) if pool else None
+            for pool, (func, params) in zip(pooled, calls)
+        ]
+        results = [None] * len(calls)
+        pending = [i for i, future in enumerate(futures) if future is None]
+        pending.extend(i for i, future in enumerate(futures) if future is not None)
+        done = 0
+        try:
+            # Work that has to stay on this thread goes first, so it overlaps with the pool.
+            for i in pending:
+                future = futures[i]
+                func, params = calls[i]
+                if future is None or future.cancel():
+                    # No worker got to this yet, so run it ourselves instead of waiting. This
+                    # is also what keeps nested calls from deadlocking when the pool is busy.
+                    results[i] = Parallel.__run(queued, True, func, params)
+                else:
+                    results[i] = future.result()
+                done += 1
+        except BaseException:
+            # Don't leave work running in the background once we've given up on it.
+            abandoned = [i for i in pending[done + 1 :] if futures[i] is None or futures[i].cancel()]
+            with Parallel.__lock:
+                Parallel.__stats["queued"] -= len(abandoned)
+            concurrent.futures.wait([future for future in futures if future is not None])
+            raise
+
+        return results
+
+    @staticmethod
+    def offloadable(func: C) -> C:
+        """
+        Mark a function as safe to run on the shared worker pool even when the calling thread
+        is inside serial(), because it never touches that thread's DB session. Use this for
+        calls that only talk to remote servers, so they still run alongside each other.
+        """
+        func.offloadable = True  # type: ignore
+        return func
+
+    @staticmethod
+    @contextmanager
+    def serial() -> Iterator[None]:
+        """
+        Run every call made by the current thread inside this block on the current thread,
+        one after another, instead of on the shared worker pool. Blocks can be nested. Calls
+        marked with offloadable() are the exception, and still go to the pool.
+        """
+        Parallel.__local.serial = getattr(Parallel.__local, "serial", 0) + 1
+        try:
+            yield
+        finally:
+            Parallel.__local.serial -= 1
+
+    @staticmethod
+    def statistics() -> Dict[str, float]:
+        """
+        Returns a snapshot of the shared worker pool's counters. This includes the number of
+        tasks currently waiting to run and running, the total number of tasks run and how many
+        of those were run by the caller, and the total seconds tasks spent waiting and running.
+        """
+        with Parallel.__lock:
+            return dict(Parallel.__stats)
+
     @staticmethod
     def execute(lambdas: List[Callable[[], Any]]) -> List[Any]:
         """
@@ -18,18 +173,7 @@ class Parallel:
         Guarantees order of return based on order of callable.
         """
 
-        if len(lambdas) == 0:
-            return []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(lambdas)) as executor:
-            futures = {executor.submit(lambdas[pos]): pos for pos in range(len(lambdas))}
-            results = []  # List: Tuple[Any, int]
-
-            for future in concurrent.futures.as_completed(futures):
-                pos = futures[future]
-                data = future.result()
-                results.append((data, pos))
-
-            return [r[0] for r in sorted(results, key=lambda r: r[1])]
+        return Parallel.__run_all([(lam, ()) for lam in lambdas])
 
     @staticmethod
     def map(lam: Callable[[T], Any], params: List[T]) -> List[Any]:
@@ -39,18 +183,7 @@ class Parallel:
         of return.
         """
 
-        if len(params) == 0:
-            return []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(params)) as executor:
-            futures = {executor.submit(lam, params[pos]): pos for pos in range(len(params))}
-            results = []  # List: Tuple[Any, int]
-
-            for future in concurrent.futures.as_completed(futures):
-                pos = futures[future]
-                data = future.result()
-                results.append((data, pos))
-
-            return [r[0] for r in sorted(results, key=lambda r: r[1])]
+        return Parallel.__run_all([(lam, (param,)) for param in params])
 
     @staticmethod
     def call(lambdas: "List[Callable[..., Any]]", *params: Any) -> List[Any]:
@@ -61,18 +194,7 @@ class Parallel:
         same order as the lambdas.
         """
 
-        if len(lambdas) == 0:
-            return []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(lambdas)) as executor:
-            futures = {executor.submit(lambdas[pos], *params): pos for pos in range(len(lambdas))}
-            results = []  # List: Tuple[Any, int]
-
-            for future in concurrent.futures.as_completed(futures):
-                pos = futures[future]
-                data = future.result()
-                results.append((data, pos))
-
-            return [r[0] for r in sorted(results, key=lambda r: r[1])]
+        return Parallel.__run_all([(lam, params) for lam in lambdas])
 
     @staticmethod
     def flatten(lists: List[List[Any]]) -> List[Any]:
@@ -83,3 +205,7 @@ class Parallel:
         """
 
         return [item for sublist in lists for item in sublist]
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=Parallel._reset)
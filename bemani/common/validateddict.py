@@ -1,5 +1,5 @@
 import copy
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 from bemani.common.constants import GameConstants
 
@@ -13,6 +13,20 @@ def intish(val: Any, base: int = 10) -> Optional[int]:
         return None
 
 
+def _copy(val: Any) -> Any:
+    # Almost everything stored in these came from or is headed to JSON, so a plain walk over
+    # dicts and lists is a much cheaper deep copy than copy.deepcopy(). Anything else that
+    # isn't immutable is left to copy.deepcopy().
+    valtype = type(val)
+    if valtype is dict:
+        return {k: _copy(v) for k, v in val.items()}
+    if valtype is list:
+        return [_copy(v) for v in val]
+    if valtype in {int, str, bool, float, bytes, type(None)}:
+        return val
+    return copy.deepcopy(val)
+
+
 class ValidatedDict(dict):
     """
     Helper class which gives a Dict object superpowers. Allows stores and loads to be
@@ -27,8 +41,17 @@ class ValidatedDict(dict):
     type. If it does not, the value is not updated.
     """
 
+    # Which row this was loaded from and the serialized JSON it was loaded as, if it was loaded
+    # from the DB. The JSON is kept as-is and only decoded when saving back to the same row, so
+    # that the data layer can work out which keys changed.
+    origin: Optional[Tuple[Any, ...]] = None
+    original: Optional[str] = None
+
     def clone(self) -> "ValidatedDict":
-        return ValidatedDict(copy.deepcopy(self))
+        clone = ValidatedDict({k: _copy(v) for k, v in self.items()})
+        clone.origin = self.origin
+        clone.original = self.original
+        return clone
 
     def get_int(self, name: str, default: int = 0) -> int:
         """
@@ -467,7 +490,10 @@ class Profile(ValidatedDict):
         self.extid = extid
 
     def clone(self) -> "Profile":
-        return Profile(self.game, self.version, self.refid, self.extid, copy.deepcopy(self))
+        clone = Profile(self.game, self.version, self.refid, self.extid, {k: _copy(v) for k, v in self.items()})
+        clone.origin = self.origin
+        clone.original = self.original
+        return clone
 
 
 class PlayStatistics(ValidatedDict):
@@ -512,5 +538,5 @@ class PlayStatistics(ValidatedDict):
             self.consecutive_days,
             self.first_play_timestamp,
             self.last_play_timestamp,
-            copy.deepcopy(self),
+            {k: _copy(v) for k, v in self.items()},
         )
@@ -18,6 +18,7 @@ from bemani.data.types import (
     ArcadeID,
 )
 from bemani.data.remoteuser import RemoteUser
+from bemani.data.statistics import AttemptStatistics
 from bemani.data.triggers import Triggers
 
 
@@ -41,5 +42,6 @@ __all__ = [
     "UserID",
     "ArcadeID",
     "RemoteUser",
+    "AttemptStatistics",
     "Triggers",
 ]
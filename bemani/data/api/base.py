@@ -1,20 +1,77 @@
-from typing import List, Optional
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from typing_extensions import Final
 
+from bemani.common import Time
 from bemani.data.api.client import APIClient
 from bemani.data.interfaces import APIProviderInterface
+from bemani.data.types import Server
 
 
 class BaseGlobalData:
+    """
+    Base class for anything that combines local data with data from remote servers.
+
+    The list of remote servers, along with the client used to talk to each of them, is
+    shared by everything in the process. It is only looked up again once the servers are
+    edited, so requests don't have to query the server table every time they talk to a
+    remote server. Since the change is noticed through the shared cache, processes that
+    don't share a cache backend with the admin panel also reload every so often.
+    """
+
+    REFRESH_INTERVAL: Final[int] = Time.SECONDS_IN_MINUTE * 1
+
+    __lock = threading.Lock()
+    __shared: Optional[Tuple[str, float, Dict[int, APIClient]]] = None
+
     def __init__(self, api: APIProviderInterface) -> None:
         self.__localapi = api
-        self.__apiclients: Optional[List[APIClient]] = None
+        self.__apiclients: Optional[Dict[int, APIClient]] = None
+
+    @staticmethod
+    def _reset() -> None:
+        # Another thread might have been holding the lock when we forked, so start fresh.
+        BaseGlobalData.__lock = threading.Lock()
+        BaseGlobalData.__shared = None
+
+    @staticmethod
+    def __connect(servers: List[Server]) -> Dict[int, APIClient]:
+        return {
+            server.id: APIClient(server.uri, server.token, server.allow_stats, server.allow_scores)
+            for server in servers
+        }
+
+    def __load(self) -> Dict[int, APIClient]:
+        version = self.__localapi.get_servers_version()
+        if version is None:
+            # This provider can't tell us when servers change, so don't share them.
+            return self.__connect(self.__localapi.get_all_servers())
+
+        with BaseGlobalData.__lock:
+            shared = BaseGlobalData.__shared
+            if shared is not None:
+                sharedversion, loaded, clients = shared
+                if sharedversion == version and time.monotonic() - loaded < self.REFRESH_INTERVAL:
+                    return clients
+
+        clients = self.__connect(self.__localapi.get_all_servers())
+        with BaseGlobalData.__lock:
+            BaseGlobalData.__shared = (version, time.monotonic(), clients)
+        return clients
 
     @property
-    def clients(self) -> List[APIClient]:
+    def servers(self) -> Dict[int, APIClient]:
         if self.__apiclients is None:
-            servers = self.__localapi.get_all_servers()
-            self.__apiclients = [
-                APIClient(server.uri, server.token, server.allow_stats, server.allow_scores) for server in servers
-            ]
+            self.__apiclients = self.__load()
 
         return self.__apiclients
+
+    @property
+    def clients(self) -> List[APIClient]:
+        return list(self.servers.values())
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=BaseGlobalData._reset)
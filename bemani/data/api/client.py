@@ -1,6 +1,12 @@
+import concurrent.futures
+import hashlib
 import json
+import os
 import requests
-from typing import Tuple, Dict, List, Any, Optional
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from typing import Callable, Set, Tuple, Dict, List, Any, Optional, TypeVar
 from typing_extensions import Final
 
 from bemani.common import (
@@ -8,11 +14,14 @@ from bemani.common import (
     GameConstants,
     VersionConstants,
     DBConstants,
+    Parallel,
     ValidatedDict,
     Time,
     cache,
 )
 
+T = TypeVar("T")
+
 
 class APIException(Exception):
     pass
@@ -38,12 +47,128 @@ class RemoteServerErrorAPIException(APIException):
     pass
 
 
+class CircuitBreaker:
+    """
+    Tracks the health of a single remote server. After enough failed requests in a row
+    the breaker opens, and requests fail right away instead of each one waiting out the
+    full timeout. Once the server has had some time to recover, a single trial request
+    is let through, and depending on how that goes the breaker either closes again or
+    stays open for another round.
+
+    State changes are published to the shared cache so that the admin panel can show
+    the health of each server as seen by the rest of the network.
+    """
+
+    FAILURE_THRESHOLD: Final[int] = 3
+    RESET_TIMEOUT: Final[int] = 30
+
+    CLOSED: Final[str] = "closed"
+    OPEN: Final[str] = "open"
+    HALF_OPEN: Final[str] = "half_open"
+
+    def __init__(self, base_uri: str) -> None:
+        self.base_uri = base_uri
+        self.__lock = threading.Lock()
+        self.__state = CircuitBreaker.CLOSED
+        self.__failures = 0
+        self.__opened = 0.0
+        self.__trial = False
+
+    @staticmethod
+    def __key(base_uri: str) -> str:
+        # Hashed so that we don't run afoul of any key limitations for memcached.
+        return "bemapi-health-" + hashlib.sha1(base_uri.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def status(base_uri: str) -> Dict[str, Any]:
+        """
+        Look up the last published state of the breaker for a given server. Servers that
+        have never had a problem are reported as closed.
+        """
+        return cache.get(CircuitBreaker.__key(base_uri)) or {
+            "state": CircuitBreaker.CLOSED,
+            "failures": 0,
+            "since": None,
+        }
+
+    @property
+    def state(self) -> str:
+        return self.__state
+
+    def __transition(self, state: str) -> None:
+        self.__state = state
+        if state == CircuitBreaker.OPEN:
+            self.__opened = time.monotonic()
+        cache.set(
+            CircuitBreaker.__key(self.base_uri),
+            {
+                "state": state,
+                "failures": self.__failures,
+                "since": Time.now(),
+            },
+            timeout=Time.SECONDS_IN_DAY,
+        )
+
+    def allow(self) -> bool:
+        """
+        Returns whether a request should be made to the server right now. Every request
+        that is allowed must report back with either success() or failure().
+        """
+        with self.__lock:
+            if self.__state == CircuitBreaker.CLOSED:
+                return True
+            if self.__state == CircuitBreaker.OPEN:
+                if time.monotonic() - self.__opened < self.RESET_TIMEOUT:
+                    return False
+                self.__transition(CircuitBreaker.HALF_OPEN)
+            if self.__trial:
+                # Somebody else is already checking whether the server is back.
+                return False
+            self.__trial = True
+            return True
+
+    def success(self) -> None:
+        with self.__lock:
+            self.__failures = 0
+            self.__trial = False
+            if self.__state != CircuitBreaker.CLOSED:
+                self.__transition(CircuitBreaker.CLOSED)
+
+    def failure(self) -> None:
+        with self.__lock:
+            self.__failures += 1
+            self.__trial = False
+            if self.__state == CircuitBreaker.HALF_OPEN or (
+                self.__state == CircuitBreaker.CLOSED and self.__failures >= self.FAILURE_THRESHOLD
+            ):
+                self.__transition(CircuitBreaker.OPEN)
+
+
 class APIClient:
     """
     A client that fully speaks BEMAPI and can pull information from a remote server.
+
+    All clients talking to the same server share a single HTTP session, so connections
+    are kept alive and reused across requests instead of being set up for every call.
+    The number of requests in flight to a single server at once is also capped, so that
+    a slow server can't tie up every worker in the process, and a circuit breaker stops
+    us from talking to a server at all for a while once it starts failing.
+
+    Records, statistics and the catalog are cached, and once cached they are always
+    returned right away. When a cached result gets old, it is refreshed in the background
+    so that game requests never wait on a remote server that already answered once.
     """
 
     API_VERSION: Final[str] = "v1"
+    TIMEOUT: Final[int] = 10
+    MAX_CONCURRENT_REQUESTS: Final[int] = 8
+    MAX_REFRESH_WORKERS: Final[int] = 4
+    STALE_TIMEOUT: Final[int] = Time.SECONDS_IN_DAY
+
+    __lock = threading.Lock()
+    __connections: Dict[str, Tuple[requests.Session, threading.BoundedSemaphore, CircuitBreaker]] = {}
+    __refresher: Optional[concurrent.futures.ThreadPoolExecutor] = None
+    __refreshing: Set[str] = set()
 
     def __init__(self, base_uri: str, token: str, allow_stats: bool, allow_scores: bool) -> None:
         self.base_uri = base_uri
@@ -69,6 +194,70 @@ class APIClient:
         repr_val = repr_val.replace("\n", "_")
         return repr_val
 
+    @staticmethod
+    def _reset() -> None:
+        # Connections can't be shared with a forked child, so the child needs to open its own.
+        APIClient.__lock = threading.Lock()
+        APIClient.__connections = {}
+        APIClient.__refresher = None
+        APIClient.__refreshing = set()
+
+    def __connection(self) -> Tuple[requests.Session, threading.BoundedSemaphore, CircuitBreaker]:
+        with APIClient.__lock:
+            connection = APIClient.__connections.get(self.base_uri)
+            if connection is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.MAX_CONCURRENT_REQUESTS)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                connection = (
+                    session,
+                    threading.BoundedSemaphore(self.MAX_CONCURRENT_REQUESTS),
+                    CircuitBreaker(self.base_uri),
+                )
+                APIClient.__connections[self.base_uri] = connection
+            return connection
+
+    def __cached(self, name: str, timeout: int, default: T, fetch: Callable[[], T], *key: Any) -> T:
+        cachekey = "bemapi-" + hashlib.sha1(repr((repr(self), name, key)).encode("utf-8")).hexdigest()
+        entry = cache.get(cachekey)
+        if entry is None:
+            # Nothing to fall back on, so the first request has to wait for the server.
+            return self.__refresh(cachekey, default, fetch)
+
+        value, fetched = entry
+        if Time.now() - fetched >= timeout:
+            with APIClient.__lock:
+                if cachekey not in APIClient.__refreshing:
+                    APIClient.__refreshing.add(cachekey)
+                    if APIClient.__refresher is None:
+                        APIClient.__refresher = concurrent.futures.ThreadPoolExecutor(
+                            max_workers=self.MAX_REFRESH_WORKERS,
+                            thread_name_prefix="bemapi",
+                        )
+                    APIClient.__refresher.submit(self.__refresh, cachekey, value, fetch)
+        return value
+
+    def __refresh(self, cachekey: str, default: T, fetch: Callable[[], T]) -> T:
+        try:
+            value = fetch()
+        except APIException:
+            # Couldn't talk to server, keep whatever we had last time.
+            return default
+        finally:
+            with APIClient.__lock:
+                APIClient.__refreshing.discard(cachekey)
+
+        cache.set(cachekey, (value, Time.now()), timeout=self.STALE_TIMEOUT)
+        return value
+
+    def get_health(self) -> Dict[str, Any]:
+        """
+        Returns the last known state of this server's circuit breaker, including when it
+        entered that state and how many requests had failed in a row at the time.
+        """
+        return CircuitBreaker.status(self.base_uri)
+
     def _content_type_valid(self, content_type: str) -> bool:
         if ";" in content_type:
             left, right = content_type.split(";", 1)
@@ -97,23 +286,41 @@ class APIClient:
         }
         data = json.dumps(request_args).encode("utf8")
 
+        session, limit, breaker = self.__connection()
+        if not breaker.allow():
+            raise APIException("Remote server is failing, not querying it for now!")
+        if not limit.acquire(timeout=self.TIMEOUT):
+            breaker.failure()
+            raise APIException("Too many outstanding requests to remote server!")
         try:
-            r = requests.request(
+            r = session.request(
                 "GET",
                 uri,
                 headers=headers,
                 data=data,
                 allow_redirects=False,
-                timeout=10,
+                timeout=self.TIMEOUT,
             )
         except Exception:
+            breaker.failure()
             raise APIException("Failed to query remote server!")
+        finally:
+            limit.release()
 
         # Verify that content type is in the form of "application/json; charset=utf-8".
-        if not self._content_type_valid(r.headers["content-type"]):
-            raise APIException(f'API returned invalid content type \'{r.headers["content-type"]}\'!')
+        content_type = r.headers.get("content-type", "")
+        if not self._content_type_valid(content_type):
+            breaker.failure()
+            raise APIException(f"API returned invalid content type '{content_type}'!")
 
-        jsondata = r.json()
+        try:
+            jsondata = r.json()
+        except ValueError:
+            breaker.failure()
+            raise APIException("API returned invalid JSON!")
+
+        # Anything past this point is the server speaking BEMAPI, even if it is telling us no.
+        breaker.success()
 
         if r.status_code == 200:
             return jsondata
@@ -248,6 +455,7 @@ class APIClient:
     # Not caching this, as we would have to go back and ensure that any code which got outdated
     # profiles from a cache didn't end up with KeyError exceptions when trying to link profiles to
     # records. This is the coward's way out, but whatever.
+    @Parallel.offloadable
     def get_profiles(
         self, game: GameConstants, version: int, idtype: APIConstants, ids: List[str]
     ) -> List[Dict[str, Any]]:
@@ -270,7 +478,37 @@ class APIClient:
             # Couldn't talk to server, assume empty profiles
             return []
 
-    @cache.memoize(Time.SECONDS_IN_MINUTE * 1)
+    def fetch_records(
+        self,
+        game: GameConstants,
+        version: int,
+        idtype: APIConstants,
+        ids: List[str],
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch records straight from the remote server. Unlike get_records(), this skips the
+        cache and raises an APIException when the server can't be talked to, so that callers
+        mirroring the data can tell a failure apart from there being nothing new.
+        """
+        servergame, serverversion = self.__translate(game, version)
+        data: Dict[str, Any] = {
+            "ids": ids,
+            "type": idtype.value,
+            "objects": ["records"],
+        }
+        if since is not None:
+            data["since"] = since
+        if until is not None:
+            data["until"] = until
+        resp = self.__exchange_data(
+            f"{self.API_VERSION}/{servergame}/{serverversion}",
+            data,
+        )
+        return resp["records"]
+
+    @Parallel.offloadable
     def get_records(
         self,
         game: GameConstants,
@@ -284,27 +522,39 @@ class APIClient:
         if not self.allow_scores:
             return []
 
-        try:
-            servergame, serverversion = self.__translate(game, version)
-            data: Dict[str, Any] = {
+        # Couldn't talk to server, assume empty records
+        return self.__cached(
+            "records",
+            Time.SECONDS_IN_MINUTE * 1,
+            [],
+            lambda: self.fetch_records(game, version, idtype, ids, since, until),
+            game,
+            version,
+            idtype,
+            ids,
+            since,
+            until,
+        )
+
+    def fetch_statistics(
+        self, game: GameConstants, version: int, idtype: APIConstants, ids: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch statistics straight from the remote server. Like fetch_records(), this skips
+        the cache and raises an APIException when the server can't be talked to.
+        """
+        servergame, serverversion = self.__translate(game, version)
+        resp = self.__exchange_data(
+            f"{self.API_VERSION}/{servergame}/{serverversion}",
+            {
                 "ids": ids,
                 "type": idtype.value,
-                "objects": ["records"],
-            }
-            if since is not None:
-                data["since"] = since
-            if until is not None:
-                data["until"] = until
-            resp = self.__exchange_data(
-                f"{self.API_VERSION}/{servergame}/{serverversion}",
-                data,
-            )
-            return resp["records"]
-        except APIException:
-            # Couldn't talk to server, assume empty records
-            return []
+                "objects": ["statistics"],
+            },
+        )
+        return resp["statistics"]
 
-    @cache.memoize(Time.SECONDS_IN_MINUTE * 5)
+    @Parallel.offloadable
     def get_statistics(
         self, game: GameConstants, version: int, idtype: APIConstants, ids: List[str]
     ) -> List[Dict[str, Any]]:
@@ -312,26 +562,23 @@ class APIClient:
         if not self.allow_stats:
             return []
 
-        try:
-            servergame, serverversion = self.__translate(game, version)
-            resp = self.__exchange_data(
-                f"{self.API_VERSION}/{servergame}/{serverversion}",
-                {
-                    "ids": ids,
-                    "type": idtype.value,
-                    "objects": ["statistics"],
-                },
-            )
-            return resp["statistics"]
-        except APIException:
-            # Couldn't talk to server, assume empty statistics
-            return []
+        # Couldn't talk to server, assume empty statistics
+        return self.__cached(
+            "statistics",
+            Time.SECONDS_IN_MINUTE * 5,
+            [],
+            lambda: self.fetch_statistics(game, version, idtype, ids),
+            game,
+            version,
+            idtype,
+            ids,
+        )
 
-    @cache.memoize(Time.SECONDS_IN_HOUR * 1)
+    @Parallel.offloadable
     def get_catalog(self, game: GameConstants, version: int) -> Dict[str, List[Dict[str, Any]]]:
         # No point disallowing this, since its only ever used for bootstrapping.
 
-        try:
+        def fetch() -> Dict[str, List[Dict[str, Any]]]:
             servergame, serverversion = self.__translate(game, version)
             resp = self.__exchange_data(
                 f"{self.API_VERSION}/{servergame}/{serverversion}",
@@ -342,6 +589,10 @@ class APIClient:
                 },
             )
             return resp["catalog"]
-        except APIException:
-            # Couldn't talk to server, assume empty catalog
-            return {}
+
+        # Couldn't talk to server, assume empty catalog
+        return self.__cached("catalog", Time.SECONDS_IN_HOUR * 1, {}, fetch, game, version)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=APIClient._reset)
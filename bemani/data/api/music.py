@@ -1,4 +1,5 @@
-from typing import List, Optional, Dict, Any, Tuple, Set
+from typing import Callable, List, Optional, Dict, Any, Tuple, Set
+from typing_extensions import Final
 
 from bemani.common import (
     APIConstants,
@@ -6,9 +7,11 @@ from bemani.common import (
     VersionConstants,
     DBConstants,
     Parallel,
+    Time,
 )
 from bemani.data.interfaces import APIProviderInterface
 from bemani.data.api.base import BaseGlobalData
+from bemani.data.api.client import APIClient
 from bemani.data.mysql.user import UserData
 from bemani.data.mysql.music import MusicData
 from bemani.data.remoteuser import RemoteUser
@@ -16,11 +19,38 @@ from bemani.data.types import UserID, Score, Song
 
 
 class GlobalMusicData(BaseGlobalData):
+    # How long we trust data that the scheduler mirrored from a remote server before
+    # going back to asking the server directly, in case the scheduler stopped running.
+    MIRROR_TIMEOUT: Final[int] = Time.SECONDS_IN_HOUR * 1
+
     def __init__(self, api: APIProviderInterface, user: UserData, music: MusicData) -> None:
         super().__init__(api)
+        self.api = api
         self.user = user
         self.music = music
 
+    def __split_servers(
+        self,
+        game: GameConstants,
+        version: int,
+        synctype: str,
+        allowed: Callable[[APIClient], bool],
+    ) -> Tuple[List[int], List[APIClient]]:
+        # Figure out which servers we have an up-to-date local mirror of and which we
+        # still need to talk to directly.
+        syncs = self.api.get_remote_syncs(game, version, synctype)
+        oldest = Time.now() - self.MIRROR_TIMEOUT
+        mirrored: List[int] = []
+        live: List[APIClient] = []
+        for serverid, client in self.servers.items():
+            if not allowed(client):
+                continue
+            if syncs.get(serverid, 0) >= oldest:
+                mirrored.append(serverid)
+            else:
+                live.append(client)
+        return mirrored, live
+
     def __get_cardids(self, userid: UserID) -> List[str]:
         if RemoteUser.is_remote(userid):
             return [RemoteUser.userid_to_card(userid)]
@@ -876,6 +906,10 @@ class GlobalMusicData(BaseGlobalData):
         if version is None or userlist is not None or locationlist is not None:
             return self.music.get_all_records(game, version, userlist, locationlist)
 
+        # Records from servers the scheduler has mirrored can come straight from the DB.
+        mirrored, live = self.__split_servers(game, version, "records", lambda client: client.allow_scores)
+        mirroredscores = self.api.get_remote_records(mirrored, game, version)
+
         # Now, fetch all records remotely and locally
         localcards, localscores, remotescores = Parallel.execute(
             [
@@ -883,7 +917,7 @@ class GlobalMusicData(BaseGlobalData):
                 lambda: self.music.get_all_records(game, version, userlist, locationlist),
                 lambda: Parallel.flatten(
                     Parallel.call(
-                        [client.get_records for client in self.clients],
+                        [client.get_records for client in live],
                         game,
                         version,
                         APIConstants.ID_TYPE_SERVER,
@@ -893,7 +927,7 @@ class GlobalMusicData(BaseGlobalData):
             ]
         )
 
-        return self.__merge_global_records(game, version, localcards, localscores, remotescores)
+        return self.__merge_global_records(game, version, localcards, localscores, mirroredscores + remotescores)
 
     def get_clear_rates(
         self,
@@ -923,32 +957,41 @@ class GlobalMusicData(BaseGlobalData):
         }
         """
 
-        if songid is None and songchart is None:
-            statistics = Parallel.flatten(
-                Parallel.call(
-                    [client.get_statistics for client in self.clients],
-                    game,
-                    version,
-                    APIConstants.ID_TYPE_SERVER,
-                    [],
+        if songchart is not None and songid is None:
+            return {}
+
+        # Statistics from servers the scheduler has mirrored can come straight from the DB.
+        mirrored, live = self.__split_servers(game, version, "statistics", lambda client: client.allow_stats)
+        statistics = self.api.get_remote_statistics(mirrored, game, version, songid, songchart)
+
+        if songid is None:
+            statistics.extend(
+                Parallel.flatten(
+                    Parallel.call(
+                        [client.get_statistics for client in live],
+                        game,
+                        version,
+                        APIConstants.ID_TYPE_SERVER,
+                        [],
+                    )
                 )
             )
-        elif songid is not None:
+        else:
             if songchart is None:
                 ids = [songid]
             else:
                 ids = [songid, songchart]
-            statistics = Parallel.flatten(
-                Parallel.call(
-                    [client.get_statistics for client in self.clients],
-                    game,
-                    version,
-                    APIConstants.ID_TYPE_SONG,
-                    ids,
+            statistics.extend(
+                Parallel.flatten(
+                    Parallel.call(
+                        [client.get_statistics for client in live],
+                        game,
+                        version,
+                        APIConstants.ID_TYPE_SONG,
+                        ids,
+                    )
                 )
             )
-        else:
-            statistics = []
 
         retval: Dict[int, Dict[int, Dict[str, int]]] = {}
         for stat in statistics:
@@ -158,7 +158,11 @@ class GlobalUserData(BaseGlobalData):
             return self.user.get_any_profile(game, version, userid)
 
     def get_any_profiles(
-        self, game: GameConstants, version: int, userids: List[UserID]
+        self,
+        game: GameConstants,
+        version: int,
+        userids: List[UserID],
+        keys: Optional[List[str]] = None,
     ) -> List[Tuple[UserID, Optional[Profile]]]:
         if len(userids) == 0:
             return []
@@ -168,7 +172,7 @@ class GlobalUserData(BaseGlobalData):
 
         if len(remote_ids) == 0:
             # We only have local profiles here, just pass on to the underlying layer
-            return self.user.get_any_profiles(game, version, local_ids)
+            return self.user.get_any_profiles(game, version, local_ids, keys)
         else:
             # We have to fetch some local profiles and some remote profiles, and then
             # merge them together
@@ -176,7 +180,7 @@ class GlobalUserData(BaseGlobalData):
 
             local_profiles, remote_profiles = Parallel.execute(
                 [
-                    lambda: self.user.get_any_profiles(game, version, local_ids),
+                    lambda: self.user.get_any_profiles(game, version, local_ids, keys),
                     lambda: Parallel.flatten(
                         Parallel.call(
                             [client.get_profiles for client in self.clients],
@@ -189,6 +193,15 @@ class GlobalUserData(BaseGlobalData):
                 ]
             )
 
+            # Look up the refid/extid of every remote user we got a profile back for at once.
+            found = {
+                card_to_userid[card.upper()]
+                for profile in remote_profiles
+                for card in profile.get("cards", [])
+                if card.upper() in card_to_userid
+            }
+            ids = self.user.get_refids_and_extids(game, version, [userid for userid in remote_ids if userid in found])
+
             for profile in remote_profiles:
                 cards = [card.upper() for card in profile.get("cards", [])]
                 for card in cards:
@@ -199,24 +212,23 @@ class GlobalUserData(BaseGlobalData):
 
                     # Sanitize the returned data
                     exact_match = profile.get("match", "partial") == "exact"
-                    refid = self.user.get_refid(game, version, userid)
-                    extid = self.user.get_extid(game, version, userid)
+                    refid, extid = ids[userid]
 
                     # Add in our defaults we always provide
-                    local_profiles.append(
-                        (
-                            userid,
-                            self.__format_profile(
-                                Profile(
-                                    game,
-                                    version if exact_match else 0,
-                                    refid,
-                                    extid,
-                                    profile,
-                                ),
-                            ),
+                    formatted = self.__format_profile(
+                        Profile(
+                            game,
+                            version if exact_match else 0,
+                            refid,
+                            extid,
+                            profile,
                         ),
                     )
+                    if keys is not None:
+                        for key in list(formatted.keys()):
+                            if key not in keys:
+                                del formatted[key]
+                    local_profiles.append((userid, formatted))
 
                     # Mark that we saw this card/user
                     del card_to_userid[card]
@@ -40,6 +40,14 @@ class Database:
     def read_only(self) -> bool:
         return bool(self.__config.get("database", {}).get("read_only", False))
 
+    @property
+    def write_behind(self) -> bool:
+        return bool(self.__config.get("database", {}).get("write_behind", False))
+
+    @property
+    def write_behind_interval(self) -> float:
+        return float(self.__config.get("database", {}).get("write_behind_interval", 0.0))
+
 
 class Server:
     def __init__(self, parent_config: "Config") -> None:
@@ -171,6 +179,9 @@ class Config(dict):
     def __init__(self, existing_contents: Dict[str, Any] = {}) -> None:
         super().__init__(existing_contents or {})
 
+        # Top-level sections that are still shared with the config we were overlaid on.
+        self.__shared: Set[str] = set()
+
         self.database = Database(self)
         self.server = Server(self)
         self.client = Client(self)
@@ -179,6 +190,33 @@ class Config(dict):
         self.assets = Assets(self)
         self.machine = Machine(self)
 
+    def __getitem__(self, key: str) -> Any:
+        value = super().__getitem__(key)
+        if key in self.__shared:
+            # Someone is reaching into a section that we share with our parent, most
+            # likely to modify it, so take our own copy of it first.
+            self.__shared.discard(key)
+            value = dict(value)
+            super().__setitem__(key, value)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.__shared.discard(key)
+        super().__setitem__(key, value)
+
+    def overlay(self) -> "Config":
+        """
+        Return a cheap copy of this config which can be modified without affecting
+        the original, for per-request settings. Unlike clone(), sections are only
+        copied once they are accessed with config["section"], which is how code
+        modifies them. Reads through the property accessors never copy anything.
+        Note that the copy is one level deep, so nested sections inside a section
+        are still shared and should be replaced rather than modified in place.
+        """
+        overlay = Config(self)
+        overlay.__shared = {key for key, value in overlay.items() if isinstance(value, dict)}
+        return overlay
+
     def clone(self) -> "Config":
         # Somehow its not possible to clone this object if an instantiated Engine is present,
         # so we do a little shenanigans here.
@@ -236,6 +274,21 @@ class Config(dict):
             return None
         return str(server)
 
+    @property
+    def music_catalog(self) -> Optional[str]:
+        music_catalog = self.get("music_catalog")
+        if music_catalog is None:
+            return None
+        return os.path.abspath(str(music_catalog))
+
+    @property
+    def local_cache_size(self) -> int:
+        return int(self.get("local_cache_size", 1024))
+
+    @property
+    def local_cache_timeout(self) -> int:
+        return int(self.get("local_cache_timeout", 5))
+
     @property
     def theme(self) -> str:
         return str(self.get("theme", "default"))
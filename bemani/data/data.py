@@ -1,4 +1,6 @@
+import atexit
 import os
+from contextlib import AbstractContextManager
 
 import alembic.config
 from alembic.migration import MigrationContext
@@ -14,7 +16,7 @@ from bemani.data.api.user import GlobalUserData
 from bemani.data.api.game import GlobalGameData
 from bemani.data.api.music import GlobalMusicData
 from bemani.data.config import Config
-from bemani.data.mysql.base import metadata
+from bemani.data.mysql.base import WriteBehind, metadata, transaction
 from bemani.data.mysql.user import UserData
 from bemani.data.mysql.music import MusicData
 from bemani.data.mysql.machine import MachineData
@@ -101,13 +103,19 @@ class Data:
         self.__config = config
         self.__session = scoped_session(session_factory)
         self.__url = Data.sqlalchemy_url(config)
-        self.__user = UserData(config, self.__session)
-        self.__music = MusicData(config, self.__session)
-        self.__machine = MachineData(config, self.__session)
-        self.__game = GameData(config, self.__session)
-        self.__network = NetworkData(config, self.__session)
-        self.__lobby = LobbyData(config, self.__session)
-        self.__api = APIData(config, self.__session)
+        self.__write_behind = (
+            WriteBehind(config.database.write_behind_interval) if config.database.write_behind else None
+        )
+        if self.__write_behind is not None:
+            # Don't lose queued writes when the process exits normally.
+            atexit.register(self.__flush_all)
+        self.__user = UserData(config, self.__session, self.__write_behind)
+        self.__music = MusicData(config, self.__session, self.__write_behind)
+        self.__machine = MachineData(config, self.__session, self.__write_behind)
+        self.__game = GameData(config, self.__session, self.__write_behind)
+        self.__network = NetworkData(config, self.__session, self.__write_behind)
+        self.__lobby = LobbyData(config, self.__session, self.__write_behind)
+        self.__api = APIData(config, self.__session, self.__write_behind)
         self.local = LocalProvider(
             self.__user,
             self.__music,
@@ -205,10 +213,49 @@ class Data:
             "head",
         )
 
+    def transaction(self) -> AbstractContextManager[None]:
+        """
+        Returns a context manager which runs every query made inside of it in a single
+        transaction on the current thread's DB session, instead of committing after each
+        query. Everything is committed when the block exits and rolled back if it raises.
+        Nesting blocks is allowed, with inner blocks acting as savepoints.
+        """
+        if self.__session is None:
+            raise Exception("Data object has already been closed!")
+        return transaction(self.__session)
+
+    def __flush_all(self) -> None:
+        if self.__write_behind is not None and self.__session is not None:
+            self.__write_behind.flush_all(self.__session)
+            self.__session.remove()
+
+    def release(self) -> None:
+        """
+        Finish the current thread's DB session, returning its connection to the
+        engine's pool. Unlike close(), this object can keep being used afterwards
+        and will open a fresh session on the next query. This allows a single
+        Data object to be shared across many requests in a long-running worker.
+
+        If write-behind is enabled, this is also where the current thread's
+        queued writes are written out. Only rows from transactions that were
+        committed are written, anything queued by a request that was rolled
+        back has already been thrown away. Rows that can't be written are kept for
+        the next flush instead of failing the request that just finished.
+        """
+        if self.__session is not None:
+            if self.__write_behind is not None and self.__write_behind.due(end_of_request=True):
+                self.__write_behind.flush(self.__session)
+            self.__session.remove()
+
     def close(self) -> None:
         """
         Close any open data connection.
         """
+        if self.__write_behind is not None:
+            # Write out everything that was queued, nobody will get another chance.
+            self.__flush_all()
+            atexit.unregister(self.__flush_all)
+
         # Make sure we don't leak connections between web requests
         if self.__session is not None:
             self.__session.close()
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Dict, List, Optional
 
+from bemani.common import GameConstants
 from bemani.data.types import Server
 
 
@@ -13,3 +14,52 @@ class APIProviderInterface(ABC):
         Returns:
             A list of Server objects sorted by add time.
         """
+
+    def get_servers_version(self) -> Optional[str]:
+        """
+        Look up a token that changes whenever a server is added, edited or removed, so that
+        the list of servers can be kept around for as long as the token stays the same.
+        Providers that can't track this don't need to override it, and the list of servers
+        will be looked up fresh every time it is needed.
+
+        Returns:
+            A string identifying the current list of servers, or None if not supported.
+        """
+        return None
+
+    def get_remote_syncs(self, game: GameConstants, version: int, synctype: str) -> Dict[int, int]:
+        """
+        Given a game/version and a type of remote data, look up when each server's data was
+        last mirrored. Providers that don't mirror remote data don't need to override this,
+        and everything will be fetched from remote servers directly.
+
+        Returns:
+            A dictionary mapping server IDs to the Unix timestamp of the last successful sync.
+        """
+        return {}
+
+    def get_remote_records(self, serverids: List[int], game: GameConstants, version: int) -> List[Dict[str, Any]]:
+        """
+        Look up all mirrored records for a game/version from a set of servers.
+
+        Returns:
+            A list of records in the same format they would have come over BEMAPI.
+        """
+        return []
+
+    def get_remote_statistics(
+        self,
+        serverids: List[int],
+        game: GameConstants,
+        version: int,
+        songid: Optional[int] = None,
+        songchart: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Look up mirrored statistics for a game/version from a set of servers, optionally
+        limited to a single song or a single song/chart.
+
+        Returns:
+            A list of statistics in the same format they would have come over BEMAPI.
+        """
+        return []
@@ -1,9 +1,10 @@
 import uuid
-from sqlalchemy import Table, Column
-from sqlalchemy.types import String, Integer
+from sqlalchemy import Table, Column, UniqueConstraint
+from sqlalchemy.types import String, Integer, JSON
 from typing import Any, Dict, List, Optional
+from typing_extensions import Final
 
-from bemani.common import Time
+from bemani.common import GameConstants, Time, cache
 from bemani.data.mysql.base import BaseData, metadata
 from bemani.data.interfaces import APIProviderInterface
 from bemani.data.types import Client, Server
@@ -37,8 +38,70 @@ server = Table(
     mysql_charset="utf8mb4",
 )
 
+"""
+Table for mirroring the records of remote servers, as pulled down periodically by
+the scheduler. This is keyed by the server we pulled from as well as the game song
+id and chart, since a server only has one record per chart. The data column holds
+the record exactly as the remote server returned it over BEMAPI, so it can be used
+anywhere a record fetched live would be.
+"""
+remote_record = Table(
+    "remote_record",
+    metadata,
+    Column("id", Integer, nullable=False, primary_key=True),
+    Column("serverid", Integer, nullable=False),
+    Column("game", String(32), nullable=False),
+    Column("version", Integer, nullable=False),
+    Column("songid", Integer, nullable=False),
+    Column("chart", Integer, nullable=False),
+    Column("data", JSON, nullable=False),
+    UniqueConstraint("serverid", "game", "version", "songid", "chart", name="serverid_game_version_songid_chart"),
+    mysql_charset="utf8mb4",
+)
+
+"""
+Table for mirroring the play statistics of remote servers, as pulled down periodically
+by the scheduler. Like remote_record, this has one entry per server and song/chart.
+"""
+remote_statistics = Table(
+    "remote_statistics",
+    metadata,
+    Column("id", Integer, nullable=False, primary_key=True),
+    Column("serverid", Integer, nullable=False),
+    Column("game", String(32), nullable=False),
+    Column("version", Integer, nullable=False),
+    Column("songid", Integer, nullable=False),
+    Column("chart", Integer, nullable=False),
+    Column("plays", Integer, nullable=False),
+    Column("clears", Integer, nullable=False),
+    Column("combos", Integer, nullable=False),
+    UniqueConstraint("serverid", "game", "version", "songid", "chart", name="serverid_game_version_songid_chart"),
+    mysql_charset="utf8mb4",
+)
+
+"""
+Table for keeping track of when each type of remote data was last successfully mirrored
+for a given server and game/version. This lets the scheduler only ask for records that
+changed since the last run, and lets request-time code know whether the mirror can be
+trusted or whether it should talk to the remote server directly instead.
+"""
+remote_sync = Table(
+    "remote_sync",
+    metadata,
+    Column("id", Integer, nullable=False, primary_key=True),
+    Column("serverid", Integer, nullable=False),
+    Column("game", String(32), nullable=False),
+    Column("version", Integer, nullable=False),
+    Column("type", String(64), nullable=False),
+    Column("timestamp", Integer, nullable=False),
+    UniqueConstraint("serverid", "game", "version", "type", name="serverid_game_version_type"),
+    mysql_charset="utf8mb4",
+)
+
 
 class APIData(APIProviderInterface, BaseData):
+    SERVERS_VERSION_KEY: Final[str] = "bemapi-servers-version"
+
     def get_all_clients(self) -> List[Client]:
         """
         Grab all authorized clients in the system.
@@ -161,6 +224,24 @@ class APIData(APIProviderInterface, BaseData):
         cursor = self.execute(sql)
         return [format_result(result) for result in cursor.mappings()]
 
+    def get_servers_version(self) -> Optional[str]:
+        """
+        Look up a token that changes whenever a server is added, edited or removed, so that
+        the list of servers can be kept around for as long as the token stays the same.
+
+        Returns:
+            A string identifying the current list of servers.
+        """
+        version = cache.get(self.SERVERS_VERSION_KEY)
+        if version is None:
+            # Nobody has looked this up since the cache was emptied, so start a new version.
+            cache.add(self.SERVERS_VERSION_KEY, uuid.uuid4().hex, timeout=0)
+            version = cache.get(self.SERVERS_VERSION_KEY)
+        return version
+
+    def __invalidate_servers(self) -> None:
+        cache.set(self.SERVERS_VERSION_KEY, uuid.uuid4().hex, timeout=0)
+
     def create_server(self, uri: str, token: str) -> int:
         """
         Given a uri and a token, create a new server.
@@ -181,6 +262,7 @@ class APIData(APIProviderInterface, BaseData):
                 "token": token,
             },
         )
+        self.__invalidate_servers()
         return cursor.lastrowid
 
     def get_server(self, serverid: int) -> Optional[Server]:
@@ -234,6 +316,11 @@ class APIData(APIProviderInterface, BaseData):
             },
         )
 
+        self.__invalidate_servers()
+
+        # The server may now point somewhere else entirely, so start mirroring from scratch.
+        self.destroy_remote_data(server.id)
+
     def destroy_server(self, serverid: int) -> None:
         """
         Given a server ID, remove that server from the DB.
@@ -243,3 +330,211 @@ class APIData(APIProviderInterface, BaseData):
         """
         sql = "DELETE FROM server WHERE id = :id LIMIT 1"
         self.execute(sql, {"id": serverid})
+        self.__invalidate_servers()
+        self.destroy_remote_data(serverid)
+
+    def get_remote_syncs(self, game: GameConstants, version: int, synctype: str) -> Dict[int, int]:
+        """
+        Given a game/version and a type of remote data, look up when each server's data was
+        last mirrored.
+
+        Parameters:
+            game - Enum value identifying a game series.
+            version - Integer identifying the version of the game in the series.
+            synctype - The type of data mirrored, such as 'records' or 'statistics'.
+
+        Returns:
+            A dictionary mapping server IDs to the Unix timestamp of the last successful sync.
+        """
+        sql = "SELECT serverid, timestamp FROM remote_sync WHERE game = :game AND version = :version AND type = :type"
+        cursor = self.execute(sql, {"game": game.value, "version": version, "type": synctype})
+        return {result["serverid"]: result["timestamp"] for result in cursor.mappings()}
+
+    def __put_remote_sync(
+        self, serverid: int, game: GameConstants, version: int, synctype: str, timestamp: int
+    ) -> None:
+        sql = """
+            INSERT INTO remote_sync (serverid, game, version, type, timestamp)
+            VALUES (:serverid, :game, :version, :type, :timestamp)
+            ON DUPLICATE KEY UPDATE timestamp = VALUES(timestamp)
+        """
+        self.execute(
+            sql,
+            {
+                "serverid": serverid,
+                "game": game.value,
+                "version": version,
+                "type": synctype,
+                "timestamp": timestamp,
+            },
+        )
+
+    def put_remote_records(
+        self,
+        serverid: int,
+        game: GameConstants,
+        version: int,
+        records: List[Dict[str, Any]],
+        timestamp: int,
+    ) -> None:
+        """
+        Given a list of records fetched from a remote server, store them in the mirror,
+        replacing any older record for the same song/chart.
+
+        Parameters:
+            serverid - Integer specifying the server the records came from.
+            game - Enum value identifying a game series.
+            version - Integer identifying the version of the game in the series.
+            records - A list of records as returned by the remote server over BEMAPI.
+            timestamp - The Unix timestamp that the records are up to date as of.
+        """
+        sql = """
+            INSERT INTO remote_record (serverid, game, version, songid, chart, data)
+            VALUES (:serverid, :game, :version, :songid, :chart, :data)
+            ON DUPLICATE KEY UPDATE data = VALUES(data)
+        """
+        for record in records:
+            self.execute(
+                sql,
+                {
+                    "serverid": serverid,
+                    "game": game.value,
+                    "version": version,
+                    "songid": int(record["song"]),
+                    "chart": int(record["chart"]),
+                    "data": self.serialize(record),
+                },
+            )
+        self.__put_remote_sync(serverid, game, version, "records", timestamp)
+
+    def get_remote_records(self, serverids: List[int], game: GameConstants, version: int) -> List[Dict[str, Any]]:
+        """
+        Look up all mirrored records for a game/version from a set of servers.
+
+        Parameters:
+            serverids - List of integers specifying which servers to return records for.
+            game - Enum value identifying a game series.
+            version - Integer identifying the version of the game in the series.
+
+        Returns:
+            A list of records in the same format they would have come over BEMAPI.
+        """
+        if len(serverids) == 0:
+            return []
+
+        sql = """
+            SELECT data FROM remote_record
+            WHERE serverid IN :serverids AND game = :game AND version = :version
+        """
+        cursor = self.execute(sql, {"serverids": serverids, "game": game.value, "version": version})
+        return [self.deserialize(result["data"]) for result in cursor.mappings()]
+
+    def put_remote_statistics(
+        self,
+        serverid: int,
+        game: GameConstants,
+        version: int,
+        statistics: List[Dict[str, Any]],
+        timestamp: int,
+    ) -> None:
+        """
+        Given a list of statistics fetched from a remote server, replace the mirrored
+        statistics for that server and game/version.
+
+        Parameters:
+            serverid - Integer specifying the server the statistics came from.
+            game - Enum value identifying a game series.
+            version - Integer identifying the version of the game in the series.
+            statistics - A list of statistics as returned by the remote server over BEMAPI.
+            timestamp - The Unix timestamp that the statistics are up to date as of.
+        """
+        sql = "DELETE FROM remote_statistics WHERE serverid = :serverid AND game = :game AND version = :version"
+        self.execute(sql, {"serverid": serverid, "game": game.value, "version": version})
+
+        sql = """
+            INSERT INTO remote_statistics (serverid, game, version, songid, chart, plays, clears, combos)
+            VALUES (:serverid, :game, :version, :songid, :chart, :plays, :clears, :combos)
+            ON DUPLICATE KEY UPDATE plays = VALUES(plays), clears = VALUES(clears), combos = VALUES(combos)
+        """
+        for stat in statistics:
+            if stat.get("song") is None or stat.get("chart") is None:
+                continue
+            self.execute(
+                sql,
+                {
+                    "serverid": serverid,
+                    "game": game.value,
+                    "version": version,
+                    "songid": int(stat["song"]),
+                    "chart": int(stat["chart"]),
+                    "plays": max(int(stat.get("plays", 0)), 0),
+                    "clears": max(int(stat.get("clears", 0)), 0),
+                    "combos": max(int(stat.get("combos", 0)), 0),
+                },
+            )
+        self.__put_remote_sync(serverid, game, version, "statistics", timestamp)
+
+    def get_remote_statistics(
+        self,
+        serverids: List[int],
+        game: GameConstants,
+        version: int,
+        songid: Optional[int] = None,
+        songchart: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Look up mirrored statistics for a game/version from a set of servers, optionally
+        limited to a single song or a single song/chart.
+
+        Parameters:
+            serverids - List of integers specifying which servers to return statistics for.
+            game - Enum value identifying a game series.
+            version - Integer identifying the version of the game in the series.
+            songid - Optional integer identifying a song.
+            songchart - Optional integer identifying a chart of the song.
+
+        Returns:
+            A list of statistics in the same format they would have come over BEMAPI.
+        """
+        if len(serverids) == 0:
+            return []
+
+        sql = """
+            SELECT songid, chart, plays, clears, combos FROM remote_statistics
+            WHERE serverid IN :serverids AND game = :game AND version = :version
+        """
+        if songid is not None:
+            sql = sql + " AND songid = :songid"
+        if songchart is not None:
+            sql = sql + " AND chart = :chart"
+        cursor = self.execute(
+            sql,
+            {
+                "serverids": serverids,
+                "game": game.value,
+                "version": version,
+                "songid": songid,
+                "chart": songchart,
+            },
+        )
+        return [
+            {
+                "song": result["songid"],
+                "chart": result["chart"],
+                "plays": result["plays"],
+                "clears": result["clears"],
+                "combos": result["combos"],
+            }
+            for result in cursor.mappings()
+        ]
+
+    def destroy_remote_data(self, serverid: int) -> None:
+        """
+        Given a server ID, remove everything we've mirrored from that server.
+
+        Parameters:
+            serverid - Integer specifying server ID.
+        """
+        for table in ["remote_record", "remote_statistics", "remote_sync"]:
+            sql = f"DELETE FROM {table} WHERE serverid = :serverid"
+            self.execute(sql, {"serverid": serverid})
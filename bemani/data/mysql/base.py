@@ -1,17 +1,29 @@
 import json
 import random
-from typing import Dict, Any, Optional
+import re
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Iterator, List, Optional, Pattern, Sequence, Set, Tuple
 from typing_extensions import Final
 
-from bemani.common import Time
+from bemani.common import Parallel, Time, ValidatedDict
 from bemani.data.config import Config
 
 from sqlalchemy.engine import CursorResult
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import scoped_session
 from sqlalchemy.sql import text
 from sqlalchemy.types import String, Integer
 from sqlalchemy import Table, Column, MetaData
 
+# Attempt to use the faster JSON library if it's available
+try:
+    import orjson as orjson
+except ImportError:
+    orjson = None
+
 metadata = MetaData()
 
 """
@@ -29,18 +41,383 @@ session = Table(
 )
 
 
+def _bytes_default(obj: Any) -> Any:
+    if isinstance(obj, bytes):
+        # We're abusing lists here, we have a mixed type
+        return ["__bytes__", *obj]
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
 class _BytesEncoder(json.JSONEncoder):
     def default(self, obj: Any) -> Any:
-        if isinstance(obj, bytes):
-            # We're abusing lists here, we have a mixed type
-            return ["__bytes__"] + [b for b in obj]
-        return json.JSONEncoder.default(self, obj)
+        return _bytes_default(obj)
+
+
+@contextmanager
+def transaction(conn: scoped_session) -> Iterator[None]:
+    """
+    Run every statement executed inside this block as part of one transaction, which is
+    committed when the block finishes and rolled back if it raises. Statements executed
+    outside of any block are committed one at a time as they always have been.
+
+    Blocks can be nested, in which case the inner block becomes a savepoint. Rolling back
+    an inner block only undoes what was executed inside it, and committing it doesn't
+    make anything visible until the outermost block commits.
+
+    Writes deferred with write-behind while inside a block are thrown away if it rolls
+    back, and only queued for writing once the outermost block commits.
+
+    Since other threads have their own sessions and can't see anything this block
+    has written, any Parallel calls made inside of it are run on this thread instead,
+    except for work marked as offloadable such as requests to remote servers.
+
+    Parameters:
+        conn - The DB session to run the transaction on.
+    """
+    depth = conn.info.get("transaction_depth", 0)
+    conn.info["transaction_depth"] = depth + 1
+    try:
+        if depth > 0:
+            savepoint = conn.begin_nested()
+            try:
+                yield
+            except BaseException:
+                savepoint.rollback()
+                _end_transaction(conn, depth + 1, False)
+                raise
+            savepoint.commit()
+        else:
+            try:
+                with Parallel.serial():
+                    yield
+            except BaseException:
+                conn.rollback()
+                _end_transaction(conn, depth + 1, False)
+                raise
+            try:
+                conn.commit()
+            except BaseException:
+                _end_transaction(conn, depth + 1, False)
+                raise
+        _end_transaction(conn, depth + 1, True)
+    finally:
+        conn.info["transaction_depth"] = depth
+
+
+class _PendingRow:
+    """
+    A single queued row, along with any statements that must only run if it is written.
+    The level is how many transactions deep the row was queued in, or zero once the
+    transaction it was queued in has been committed.
+    """
+
+    def __init__(
+        self,
+        params: Dict[str, Any],
+        key: Optional[Tuple[Any, ...]],
+        followups: Sequence[Tuple[str, Dict[str, Any]]],
+        level: int,
+    ) -> None:
+        self.params = params
+        self.key = key
+        self.followups = followups
+        self.level = level
+        self.failures = 0
+
+
+class _PendingWrites:
+    """
+    Rows queued up by a single thread, grouped by the statement that will write them.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.statements: Dict[str, List[_PendingRow]] = {}
+        self.keys: Set[Tuple[Any, ...]] = set()
+        self.tables: Dict[str, Pattern[str]] = {}
+        self.count = 0
+        self.since = 0.0
+
+    def add(self, sql: str, row: _PendingRow) -> None:
+        # Must be called with the lock held.
+        if row.key is not None:
+            self.keys.add(row.key)
+        for statement in [sql, *(followup for followup, _ in row.followups)]:
+            name = _table_name(statement)
+            if name not in self.tables:
+                self.tables[name] = re.compile(rf"\b{name}\b", re.IGNORECASE)
+        if row.level == 0:
+            self.committed(1)
+        self.statements.setdefault(sql, []).append(row)
+
+    def committed(self, count: int) -> None:
+        # Must be called with the lock held.
+        if self.count == 0 and count > 0:
+            self.since = time.monotonic()
+        self.count += count
+
+    def take(self, levels: Callable[[int], bool]) -> Dict[str, List[_PendingRow]]:
+        # Must be called with the lock held. Removes and returns every row queued at a matching level.
+        taken: Dict[str, List[_PendingRow]] = {}
+        for sql, rows in list(self.statements.items()):
+            keep = [row for row in rows if not levels(row.level)]
+            if len(keep) != len(rows):
+                taken[sql] = [row for row in rows if levels(row.level)]
+                if keep:
+                    self.statements[sql] = keep
+                else:
+                    del self.statements[sql]
+        for rows in taken.values():
+            for row in rows:
+                if row.key is not None:
+                    self.keys.discard(row.key)
+                if row.level == 0:
+                    self.count -= 1
+        if not self.statements:
+            self.tables = {}
+        return taken
+
+
+def _table_name(sql: str) -> str:
+    match = re.match(r"\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|UPDATE)\s+`?(\w+)`?", sql, re.IGNORECASE)
+    if match is None:
+        raise Exception("Only INSERT and UPDATE statements can be deferred!")
+    return match.group(1)
+
+
+class WriteBehind:
+    """
+    An opt-in queue for writes that nothing needs to see until the current request is
+    done, such as score history, chart statistics and audit events. Rows are grouped
+    by statement and written with one multi-row INSERT per statement when flushed,
+    instead of a round trip and commit for every row.
+
+    Queued rows live per-thread since DB sessions are per-thread. Rows queued inside a
+    transaction belong to it. They are thrown away if it is rolled back, and are only
+    queued for writing once it commits. A thread's rows are written when Data is
+    released at the end of its request, or if a flush interval is configured, on the
+    first release or deferred write by that same thread after the interval has passed.
+    There is no timer, so an idle thread holds onto its rows until it handles another
+    request or Data is closed or the process exits. They are also written when too many
+    rows pile up. Before any statement by the same thread that touches a table with
+    queued rows, the rows that statement should see are written first. Inside a
+    transaction, that is only the rows queued in that transaction, since rows left over
+    from earlier requests would be lost if it rolled back. Other threads and processes
+    don't see queued rows until they are written. If writing fails for any reason other
+    than a duplicate row, the rows are put back and tried again on the next flush. A
+    hard crash can still lose rows that were queued but not yet written, which is why
+    only non-critical writes should ever be deferred.
+    """
+
+    MAX_PENDING_ROWS: Final[int] = 500
+    MAX_FAILURES: Final[int] = 3
+
+    def __init__(self, interval: float = 0.0) -> None:
+        """
+        Initialize the queue.
+
+        Parameters:
+            interval - Number of seconds rows may wait before being written. If this
+                       is zero, rows are written at the end of every request.
+        """
+        self.__interval = interval
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__pending: List[_PendingWrites] = []
+
+    def __thread_pending(self) -> _PendingWrites:
+        pending = getattr(self.__local, "pending", None)
+        if pending is None:
+            pending = _PendingWrites()
+            self.__local.pending = pending
+            with self.__lock:
+                # Hold onto every thread's rows so they can be written at shutdown.
+                self.__pending.append(pending)
+        return pending
+
+    def defer(
+        self,
+        sql: str,
+        params: Dict[str, Any],
+        unique: Sequence[str] = (),
+        followups: Sequence[Tuple[str, Dict[str, Any]]] = (),
+        level: int = 0,
+    ) -> bool:
+        """
+        Queue a single row to be written later.
+
+        Parameters:
+            sql - An INSERT statement for a single row.
+            params - Dictionary of parameters which will be substituted into the sql string.
+            unique - Optional list of parameters which together must be unique amongst
+                     queued rows for this statement.
+            followups - Optional list of INSERT or UPDATE statements and their parameters
+                        which are only written if this row is, such as bumping a counter.
+            level - How many transactions deep the caller is, so that the row can be thrown
+                    away if one of them is rolled back.
+
+        Returns:
+            True if the row was queued, or False if it collides with an already queued row.
+        """
+        if not re.match(r"\s*INSERT\s", sql, re.IGNORECASE):
+            raise Exception("Only INSERT statements can be deferred!")
+        for statement in [sql, *(followup for followup, _ in followups)]:
+            _table_name(statement)
+
+        pending = self.__thread_pending()
+        with pending.lock:
+            key = (sql, *(params[name] for name in unique)) if unique else None
+            if key is not None and key in pending.keys:
+                return False
+            pending.add(
+                sql,
+                _PendingRow(dict(params), key, [(followup, dict(values)) for followup, values in followups], level),
+            )
+        return True
+
+    def end_transaction(self, level: int, committed: bool) -> None:
+        """
+        Called when a transaction ends, so that rows queued inside it can be handed to the
+        enclosing transaction or queued for writing if it committed, or thrown away if not.
+
+        Parameters:
+            level - How many transactions deep the transaction that ended was.
+            committed - Whether it was committed.
+        """
+        pending = self.__thread_pending()
+        with pending.lock:
+            if not committed:
+                pending.take(lambda rowlevel: rowlevel >= level)
+                return
+
+            released = 0
+            for rows in pending.statements.values():
+                for row in rows:
+                    if row.level >= level:
+                        row.level = level - 1
+                        if row.level == 0:
+                            released += 1
+            pending.committed(released)
+
+    def references(self, sql: str) -> bool:
+        """
+        Returns whether a statement touches any table with rows queued by this thread.
+        """
+        pending = self.__thread_pending()
+        return any(pattern.search(sql) is not None for pattern in pending.tables.values())
+
+    def due(self, end_of_request: bool = False) -> bool:
+        """
+        Returns whether this thread's queued rows should be written now.
+
+        Parameters:
+            end_of_request - Whether the request that queued these rows is finished.
+        """
+        pending = self.__thread_pending()
+        if pending.count == 0:
+            return False
+        if pending.count >= self.MAX_PENDING_ROWS:
+            return True
+        if self.__interval <= 0:
+            return end_of_request
+        return (time.monotonic() - pending.since) >= self.__interval
+
+    def flush(self, conn: scoped_session) -> None:
+        """
+        Write every row queued by this thread that belongs at the session's current
+        transaction depth. Outside of a transaction, that is every committed row. Inside
+        of one, that is every row queued inside it, which then commits or rolls back
+        along with it. This never raises, rows that couldn't be written are put back to
+        be tried again later.
+        """
+        if conn.info.get("transaction_depth", 0) > 0:
+            self.__flush(self.__thread_pending(), conn, lambda level: level > 0)
+        else:
+            self.__flush(self.__thread_pending(), conn, lambda level: level == 0)
+
+    def flush_all(self, conn: scoped_session) -> None:
+        """
+        Write every committed row queued by any thread. Used when shutting down.
+        """
+        with self.__lock:
+            everything = list(self.__pending)
+        for pending in everything:
+            self.__flush(pending, conn, lambda level: level == 0)
+
+    def __execute(self, conn: scoped_session, sql: str, rows: List[_PendingRow], written: List[_PendingRow]) -> None:
+        # Rows are moved from rows to written as they make it to the DB, so that if
+        # something goes wrong part way, we know exactly what still needs writing.
+        try:
+            # The driver rewrites this into a single multi-row INSERT.
+            with transaction(conn):
+                conn.execute(text(sql), [row.params for row in rows])
+            written.extend(rows)
+            rows.clear()
+        except IntegrityError:
+            # A row collided with one written by an earlier flush. Don't lose the
+            # rest of the batch over it, write them one at a time and skip the bad one.
+            while rows:
+                try:
+                    with transaction(conn):
+                        conn.execute(text(sql), rows[0].params)
+                    written.append(rows[0])
+                except IntegrityError:
+                    pass
+                rows.pop(0)
+
+    def __flush(self, pending: _PendingWrites, conn: scoped_session, levels: Callable[[int], bool]) -> None:
+        with pending.lock:
+            statements = pending.take(levels)
+
+        remaining = list(statements.items())
+        try:
+            while remaining:
+                sql, rows = remaining[0]
+                written: List[_PendingRow] = []
+                try:
+                    self.__execute(conn, sql, rows, written)
+                finally:
+                    # Write each row's followups grouped by statement, but only for rows that made it.
+                    followups: Dict[str, List[_PendingRow]] = {}
+                    for row in written:
+                        for followup, params in row.followups:
+                            followups.setdefault(followup, []).append(_PendingRow(params, None, [], row.level))
+                    remaining[1:1] = list(followups.items())
+                remaining.pop(0)
+        except Exception:
+            # Something other than a duplicate row went wrong, such as losing the connection.
+            # Put everything we didn't get to back so it can be tried again, unless it keeps failing.
+            print(traceback.format_exc())
+            with pending.lock:
+                for sql, rows in remaining:
+                    for row in rows:
+                        row.failures += 1
+                        if row.failures >= self.MAX_FAILURES:
+                            print(f"Giving up on deferred write to {_table_name(sql)} after {row.failures} attempts")
+                            continue
+                        pending.add(sql, row)
+
+
+def _end_transaction(conn: scoped_session, level: int, committed: bool) -> None:
+    write_behind = conn.info.get("write_behind")
+    if isinstance(write_behind, WriteBehind):
+        write_behind.end_transaction(level, committed)
 
 
 class BaseData:
     SESSION_LENGTH: Final[int] = 32
 
-    def __init__(self, config: Config, conn: scoped_session) -> None:
+    # Counts of how JSON blobs were saved by put_changes() callers, keyed by table, so that
+    # the savings from only writing what changed can be measured.
+    __write_lock = threading.Lock()
+    __write_counts: Dict[str, Dict[str, int]] = {}
+
+    def __init__(
+        self,
+        config: Config,
+        conn: scoped_session,
+        write_behind: Optional[WriteBehind] = None,
+    ) -> None:
         """
         Initialize any DB singleton.
 
@@ -51,9 +428,25 @@ class BaseData:
                      needs to look up configuration.
             conn - An established connection to the DB which will be used for all
                    queries.
+            write_behind - An optional queue shared by all DB singletons which
+                           deferred writes are placed on.
         """
         self.__config = config
         self.__conn = conn
+        self.__write_behind = write_behind
+
+    def __check_read_only(self, sql: str, safe_write_operation: bool) -> None:
+        if self.__config.database.read_only:
+            # See if this is an insert/update/delete
+            lowered = sql.lower()
+            for write_statement_group in [
+                ["insert into"],
+                ["update", "set"],
+                ["delete from"],
+            ]:
+                includes = all(s in lowered for s in write_statement_group)
+                if includes and not safe_write_operation:
+                    raise Exception("Read-only mode is active!")
 
     def execute(
         self,
@@ -71,28 +464,72 @@ class BaseData:
         Returns:
             A SQLAlchemy CursorResult object.
         """
-        if self.__config.database.read_only:
-            # See if this is an insert/update/delete
-            lowered = sql.lower()
-            for write_statement_group in [
-                ["insert into"],
-                ["update", "set"],
-                ["delete from"],
-            ]:
-                includes = all(s in lowered for s in write_statement_group)
-                if includes and not safe_write_operation:
-                    raise Exception("Read-only mode is active!")
+        self.__check_read_only(sql, safe_write_operation)
+        if self.__write_behind is not None and self.__write_behind.references(sql):
+            # Make sure anything we queued up is visible to this statement.
+            self.__write_behind.flush(self.__conn)
         result = self.__conn.execute(
             text(sql),
             params if params is not None else {},
         )
-        self.__conn.commit()
+        if not self.__conn.info.get("transaction_depth", 0):
+            # Not part of a larger transaction, so nothing else will commit this.
+            self.__conn.commit()
         return result
 
+    def execute_deferred(
+        self,
+        sql: str,
+        params: Dict[str, Any],
+        unique: Sequence[str] = (),
+        followups: Sequence[Tuple[str, Dict[str, Any]]] = (),
+    ) -> bool:
+        """
+        Given a single row INSERT statement and some parameters, execute it. If write-behind
+        is enabled, the row is instead queued up and written along with other rows for the
+        same statement later. Only use this for writes that nothing needs to see before the
+        end of the current request.
+
+        Parameters:
+            sql - The SQL statement to execute.
+            params - Dictionary of parameters which will be substituted into the sql string.
+            unique - Optional list of parameters which together must be unique amongst
+                     queued rows. Collisions with rows that were already written are only
+                     caught when writing immediately.
+            followups - Optional list of INSERT or UPDATE statements and their parameters
+                        which are written along with this row, and only if this row is written.
+
+        Returns:
+            True if the row was written or queued, False if it collides with a queued row.
+        """
+        if self.__write_behind is None:
+            self.execute(sql, params)
+            for followup, values in followups:
+                self.execute(followup, values)
+            return True
+
+        self.__check_read_only(sql, False)
+        for followup, _ in followups:
+            self.__check_read_only(followup, False)
+        # Rows queued inside a transaction have to go away if it is rolled back.
+        depth = self.__conn.info.get("transaction_depth", 0)
+        self.__conn.info["write_behind"] = self.__write_behind
+        if not self.__write_behind.defer(sql, params, unique, followups, depth):
+            return False
+        if depth == 0 and self.__write_behind.due():
+            self.__write_behind.flush(self.__conn)
+        return True
+
     def serialize(self, data: Dict[str, Any]) -> str:
         """
         Given an arbitrary dict, serialize it to JSON.
         """
+        if orjson is not None:
+            try:
+                return orjson.dumps(data, default=_bytes_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+            except TypeError:
+                # Something orjson refuses to handle, such as an integer wider than 64 bits.
+                pass
         return json.dumps(data, cls=_BytesEncoder)
 
     def deserialize(self, data: Optional[str]) -> Dict[str, Any]:
@@ -103,27 +540,186 @@ class BaseData:
             return {}
 
         def fix(jd: Any) -> Any:
-            if type(jd) == dict:
+            if type(jd) is dict:
                 # Fix each element in the dictionary.
-                for key in jd:
-                    jd[key] = fix(jd[key])
+                for key, value in jd.items():
+                    if type(value) is dict or type(value) is list:
+                        jd[key] = fix(value)
                 return jd
 
-            if type(jd) == list:
-                # Could be serialized by us, could be a normal list.
-                if len(jd) >= 1 and jd[0] == "__bytes__":
-                    # This is a serialized bytestring
-                    return bytes(jd[1:])
-
-                # Possibly one of these is a dictionary/list/serialized.
-                for i in range(len(jd)):
-                    jd[i] = fix(jd[i])
-                return jd
+            # Could be serialized by us, could be a normal list.
+            if len(jd) >= 1 and jd[0] == "__bytes__":
+                # This is a serialized bytestring
+                return bytes(jd[1:])
 
-            # Normal value, its deserialized version is itself.
+            # Possibly one of these is a dictionary/list/serialized.
+            for i, value in enumerate(jd):
+                if type(value) is dict or type(value) is list:
+                    jd[i] = fix(value)
             return jd
 
-        return fix(json.loads(data))
+        if orjson is not None:
+            # Note that orjson decodes integers wider than 64 bits as floats, but MySQL
+            # already stores those as doubles in JSON columns so nothing is lost here.
+            try:
+                result = orjson.loads(data)
+            except orjson.JSONDecodeError:
+                # Let the standard library decide, it is more lenient about things like NaN.
+                result = json.loads(data)
+        else:
+            result = json.loads(data)
+
+        if "__bytes__" not in data:
+            # Nothing in here was serialized from bytes, so there is nothing to fix.
+            return result
+        return fix(result)
+
+    @staticmethod
+    def json_path(key: str) -> str:
+        """
+        Given a top-level key in a JSON column, return a path suitable for JSON_EXTRACT()
+        and friends. Only simple keys are supported, so that nothing needs escaping.
+        """
+        if type(key) is not str or not re.fullmatch(r"[A-Za-z0-9_]+", key):
+            raise Exception(f"Invalid JSON key {key}!")
+        return f'$."{key}"'
+
+    @staticmethod
+    def write_statistics() -> Dict[str, Dict[str, int]]:
+        """
+        Return counts of how JSON blobs were saved in this process.
+
+        Returns:
+            A dictionary keyed by table, each containing the number of writes that were
+            elided because nothing changed, that only wrote the changed keys, and that
+            wrote the whole blob.
+        """
+        with BaseData.__write_lock:
+            return {table: dict(counts) for table, counts in BaseData.__write_counts.items()}
+
+    def __count_write(self, table: str, kind: str) -> None:
+        with BaseData.__write_lock:
+            counts = BaseData.__write_counts.setdefault(table, {"elided": 0, "partial": 0, "full": 0})
+            counts[kind] += 1
+
+    def track(self, data: ValidatedDict, table: str, where: Dict[str, Any], original: str) -> None:
+        """
+        Remember which row a dictionary was loaded from and the JSON it was loaded as, so
+        that put_changes() can later save only what changed.
+
+        Parameters:
+            data - The dictionary that was loaded.
+            table - The table it was loaded from.
+            where - Column values identifying the row it was loaded from.
+            original - The JSON that it was deserialized from.
+        """
+        data.origin = (table, tuple(sorted(where.items())))
+        data.original = original
+
+    def put_changes(self, table: str, column: str, where: Dict[str, Any], data: Dict[str, Any]) -> bool:
+        """
+        Given a dictionary to save to a JSON column in an existing row, save only what changed
+        since it was loaded from that same row, or nothing at all if nothing changed.
+
+        Parameters:
+            table - The table to save to.
+            column - The JSON column to save to.
+            where - Column values identifying the row to save to.
+            data - The dictionary to save.
+
+        Returns:
+            True if the row is now up to date. False if the dictionary wasn't loaded from this
+            row, or the changes can't be applied in place, in which case the caller should write
+            the whole thing and then call track() with what it wrote.
+        """
+        if not isinstance(data, ValidatedDict) or data.origin != (table, tuple(sorted(where.items()))):
+            self.__count_write(table, "full")
+            return False
+        changes = self.changes(data)
+        if changes is not None:
+            changed, removed = changes
+            if not changed and not removed:
+                self.__count_write(table, "elided")
+                return True
+
+            params = dict(where)
+            expression = self.json_update(column, changed, removed, params)
+            if expression is not None:
+                conditions = " AND ".join(f"{name} = :{name}" for name in where)
+                cursor = self.execute(f"UPDATE {table} SET {column} = {expression} WHERE {conditions}", params)
+                # If the row was deleted out from under us, the caller will need to write it all.
+                if cursor.rowcount == 1:
+                    data.original = self.serialize(data)
+                    self.__count_write(table, "partial")
+                    return True
+
+        self.__count_write(table, "full")
+        return False
+
+    def changes(self, data: ValidatedDict) -> Optional[Tuple[Dict[str, str], List[str]]]:
+        """
+        Given a dictionary that was loaded from the DB, work out which top-level keys have
+        changed since it was loaded by comparing against the JSON it was loaded from.
+
+        Parameters:
+            data - A dictionary whose original was set when it was loaded.
+
+        Returns:
+            None if the dictionary wasn't loaded from the DB. Otherwise, a tuple of a dictionary
+            mapping each new or changed key to its serialized value and a list of removed keys.
+            Both are empty if nothing changed.
+        """
+        if data.original is None:
+            return None
+        original = self.deserialize(data.original)
+        if self.serialize(data) == self.serialize(original):
+            # Most of the time nothing changed, so don't bother going key by key.
+            return ({}, [])
+
+        changed: Dict[str, str] = {}
+        for key, value in data.items():
+            serialized = self.serialize(value)
+            if key not in original or self.serialize(original[key]) != serialized:
+                changed[key] = serialized
+        return (changed, [key for key in original if key not in data])
+
+    def json_update(
+        self,
+        column: str,
+        changed: Dict[str, str],
+        removed: List[str],
+        params: Dict[str, Any],
+    ) -> Optional[str]:
+        """
+        Given changes to a JSON column as returned by changes(), build an expression that
+        applies just those changes to the column. Any parameters that the expression needs
+        are added to params.
+
+        Returns:
+            An SQL expression evaluating to the updated JSON, or None if one of the keys can't
+            be used in a JSON path, in which case the whole column should be written instead.
+        """
+        try:
+            removepaths = [self.json_path(key) for key in removed]
+            setpaths = [self.json_path(key) for key in changed]
+        except Exception:
+            return None
+
+        expression = column
+        if removepaths:
+            for i, path in enumerate(removepaths):
+                params[f"removepath{i}"] = path
+            expression = f"JSON_REMOVE({expression}, {', '.join(f':removepath{i}' for i in range(len(removepaths)))})"
+        if setpaths:
+            for i, (path, value) in enumerate(zip(setpaths, changed.values())):
+                params[f"setpath{i}"] = path
+                params[f"setvalue{i}"] = value
+            expression = (
+                f"JSON_SET({expression}, "
+                + ", ".join(f":setpath{i}, CAST(:setvalue{i} AS JSON)" for i in range(len(setpaths)))
+                + ")"
+            )
+        return expression
 
     def _from_session(self, session: str, sesstype: str) -> Optional[int]:
         """
@@ -97,7 +97,9 @@ class GameData(BaseData):
             return None
 
         result = cursor.mappings().fetchone()  # type: ignore
-        return ValidatedDict(self.deserialize(result["data"]))
+        settings = ValidatedDict(self.deserialize(result["data"]))
+        self.track(settings, "game_settings", {"game": game.value, "userid": userid}, result["data"])
+        return settings
 
     def put_settings(self, game: GameConstants, userid: UserID, settings: Dict[str, Any]) -> None:
         """
@@ -108,16 +110,20 @@ class GameData(BaseData):
             userid - Integer identifying a user.
             settings - A dictionary of settings that a game wishes to retrieve later.
         """
+        where = {"game": game.value, "userid": userid}
+        if self.put_changes("game_settings", "data", where, settings):
+            return
+
         # Add settings json to game settings
         sql = """
             INSERT INTO game_settings (game, userid, data)
             VALUES (:game, :userid, :data)
             ON DUPLICATE KEY UPDATE data=VALUES(data)
         """
-        self.execute(
-            sql,
-            {"game": game.value, "userid": userid, "data": self.serialize(settings)},
-        )
+        data = self.serialize(settings)
+        self.execute(sql, {**where, "data": data})
+        if isinstance(settings, ValidatedDict):
+            self.track(settings, "game_settings", where, data)
 
     def get_achievement(
         self,
@@ -159,7 +165,14 @@ class GameData(BaseData):
             return None
 
         result = cursor.mappings().fetchone()  # type: ignore
-        return ValidatedDict(self.deserialize(result["data"]))
+        achievement = ValidatedDict(self.deserialize(result["data"]))
+        self.track(
+            achievement,
+            "series_achievement",
+            {"game": game.value, "userid": userid, "id": achievementid, "type": achievementtype},
+            result["data"],
+        )
+        return achievement
 
     def get_achievements(self, game: GameConstants, userid: UserID) -> List[Achievement]:
         """
@@ -175,15 +188,22 @@ class GameData(BaseData):
         sql = "SELECT id, type, data FROM series_achievement WHERE game = :game AND userid = :userid"
         cursor = self.execute(sql, {"game": game.value, "userid": userid})
 
-        return [
-            Achievement(
+        achievements = []
+        for result in cursor.mappings():
+            achievement = Achievement(
                 result["id"],
                 result["type"],
                 None,
                 self.deserialize(result["data"]),
             )
-            for result in cursor.mappings()
-        ]
+            self.track(
+                achievement.data,
+                "series_achievement",
+                {"game": game.value, "userid": userid, "id": result["id"], "type": result["type"]},
+                result["data"],
+            )
+            achievements.append(achievement)
+        return achievements
 
     def put_achievement(
         self,
@@ -203,22 +223,20 @@ class GameData(BaseData):
             achievementtype - The type of achievement.
             data - A dictionary of data that the game wishes to retrieve later.
         """
+        where = {"game": game.value, "userid": userid, "id": achievementid, "type": achievementtype}
+        if self.put_changes("series_achievement", "data", where, data):
+            return
+
         # Add achievement JSON to achievements
         sql = """
             INSERT INTO series_achievement (game, userid, id, type, data)
             VALUES (:game, :userid, :id, :type, :data)
             ON DUPLICATE KEY UPDATE data=VALUES(data)
         """
-        self.execute(
-            sql,
-            {
-                "game": game.value,
-                "userid": userid,
-                "id": achievementid,
-                "type": achievementtype,
-                "data": self.serialize(data),
-            },
-        )
+        serialized = self.serialize(data)
+        self.execute(sql, {**where, "data": serialized})
+        if isinstance(data, ValidatedDict):
+            self.track(data, "series_achievement", where, serialized)
 
     def get_time_sensitive_settings(self, game: GameConstants, version: int, name: str) -> Optional[ValidatedDict]:
         """
@@ -1,10 +1,15 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from sqlalchemy import Table, Column, UniqueConstraint
 from sqlalchemy.types import String, Integer, JSON
 from sqlalchemy.dialects.mysql import BIGINT as BigInteger
 from typing import Optional, Dict, List, Tuple, Any
 from typing_extensions import Final
 
-from bemani.common import GameConstants, ValidatedDict
+from bemani.common import GameConstants, ValidatedDict, cache
 from bemani.data.mysql.base import BaseData, metadata
 from bemani.data.types import Machine, Arcade, UserID, ArcadeID
 
@@ -80,11 +85,134 @@ class ArcadeCreationException(Exception):
     pass
 
 
+class LookupCache:
+    """
+    A small, thread-safe, per-process cache of recently looked up objects. Every packet
+    that a game sends needs its machine and often its arcade, so keeping these around for
+    a short while saves a few DB round-trips per request. Entries are dropped whenever
+    the version passed to sync() changes, which is how edits made in another process
+    (such as the frontend) are picked up. They also expire after a fixed TTL in case the
+    shared cache holding that version is unavailable or gets emptied.
+
+    A cached value of None means that we looked and the object did not exist. These
+    expire much sooner, so that a machine being registered isn't turned away for long
+    even if the version is missed.
+    """
+
+    def __init__(self, ttl: float, size: int, negative_ttl: Optional[float] = None) -> None:
+        """
+        Initialize the cache.
+
+        Parameters:
+            ttl - Number of seconds an entry is valid for after being looked up.
+            size - Maximum number of entries to keep before evicting the oldest.
+            negative_ttl - Number of seconds a cached None is valid for. Defaults to ttl.
+        """
+        self.__ttl = ttl
+        self.__negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.__size = size
+        self.__entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self.__version: Optional[str] = None
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Any) -> Tuple[bool, Any]:
+        """
+        Look up a key in the cache.
+
+        Returns:
+            A tuple of whether the key was found and a copy of the cached value.
+        """
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry[0] <= now:
+                self.misses += 1
+                return (False, None)
+            self.hits += 1
+            value = entry[1]
+        # Hand out copies so that callers modifying what they get back can't
+        # affect anyone else.
+        return (True, copy.deepcopy(value))
+
+    def put(self, key: Any, value: Any) -> None:
+        """
+        Store a value for a key, replacing any existing value.
+        """
+        value = copy.deepcopy(value)
+        ttl = self.__negative_ttl if value is None else self.__ttl
+        with self.__lock:
+            self.__entries.pop(key, None)
+            self.__entries[key] = (time.monotonic() + ttl, value)
+            while len(self.__entries) > self.__size:
+                self.__entries.popitem(last=False)
+
+    def invalidate(self, key: Any = None) -> None:
+        """
+        Drop a single key from the cache, or every key if key is None.
+        """
+        with self.__lock:
+            self.invalidations += 1
+            if key is None:
+                self.__entries.clear()
+            else:
+                self.__entries.pop(key, None)
+
+    def sync(self, version: Optional[str]) -> None:
+        """
+        Drop every key if the given version differs from the one last seen. A version
+        of None means there is nothing to compare against, so entries are kept until
+        they expire.
+        """
+        if version is None:
+            return
+        with self.__lock:
+            if version == self.__version:
+                return
+            if self.__version is not None:
+                self.invalidations += 1
+            self.__entries.clear()
+            self.__version = version
+
+    def statistics(self) -> Dict[str, int]:
+        with self.__lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "size": len(self.__entries),
+            }
+
+
 class MachineData(BaseData):
     # This relies on the fact that arcadeid in the arcade_settings table is auto-increment
     # and thus will start at 1.
     DEFAULT_SETTINGS_ARCADE: Final[ArcadeID] = ArcadeID(-1)
 
+    # How long a cached machine or arcade lookup is trusted for. Edits made through this
+    # class, in any process, bump the version in the shared cache which empties every
+    # process's lookup cache. These only matter if that version can't be looked up.
+    LOOKUP_CACHE_TTL: Final[int] = 30
+    LOOKUP_CACHE_NEGATIVE_TTL: Final[int] = 5
+    LOOKUP_CACHE_SIZE: Final[int] = 4096
+    LOOKUP_CACHE_VERSION_KEY: Final[str] = "machine-lookup-version"
+
+    machine_cache: LookupCache = LookupCache(LOOKUP_CACHE_TTL, LOOKUP_CACHE_SIZE, LOOKUP_CACHE_NEGATIVE_TTL)
+    arcade_cache: LookupCache = LookupCache(LOOKUP_CACHE_TTL, LOOKUP_CACHE_SIZE, LOOKUP_CACHE_NEGATIVE_TTL)
+
+    def __lookup_version(self) -> Optional[str]:
+        version = cache.get(self.LOOKUP_CACHE_VERSION_KEY)
+        if version is None:
+            # Nobody has looked this up since the cache was emptied, so start a new version.
+            cache.add(self.LOOKUP_CACHE_VERSION_KEY, uuid.uuid4().hex, timeout=0)
+            version = cache.get(self.LOOKUP_CACHE_VERSION_KEY)
+        return version
+
+    def __invalidate_lookups(self) -> None:
+        cache.set(self.LOOKUP_CACHE_VERSION_KEY, uuid.uuid4().hex, timeout=0)
+
     def from_port(self, port: int) -> Optional[str]:
         """
         Given a port, look up the PCBID attached to that port.
@@ -186,6 +314,25 @@ class MachineData(BaseData):
             self.deserialize(result["data"]),
         )
 
+    def get_cached_machine(self, pcbid: str) -> Optional[Machine]:
+        """
+        Given a PCBID, look up a machine, using the per-process lookup cache. This
+        is meant for the packet dispatch path which only needs to read the machine.
+        Anything that modifies and saves a machine should use get_machine instead.
+
+        Parameters:
+            pcbid - The PCBID as returned from a game.
+
+        Returns:
+            A Machine object representing a machine, or None if not found.
+        """
+        MachineData.machine_cache.sync(self.__lookup_version())
+        found, machine = MachineData.machine_cache.get(pcbid)
+        if not found:
+            machine = self.get_machine(pcbid)
+            MachineData.machine_cache.put(pcbid, machine)
+        return machine
+
     def get_all_machines(self, arcade: Optional[ArcadeID] = None) -> List[Machine]:
         """
         Look up all machines on the network.
@@ -248,6 +395,8 @@ class MachineData(BaseData):
                 "data": self.serialize(machine.data),
             },
         )
+        MachineData.machine_cache.invalidate(machine.pcbid)
+        self.__invalidate_lookups()
 
     def create_machine(
         self,
@@ -307,6 +456,8 @@ class MachineData(BaseData):
                 # Failed to add machine, try with new port
                 continue
 
+            MachineData.machine_cache.invalidate(pcbid)
+            self.__invalidate_lookups()
             machine = self.get_machine(pcbid)
             if machine is not None:
                 return machine
@@ -320,6 +471,8 @@ class MachineData(BaseData):
         """
         sql = "DELETE FROM `machine` WHERE pcbid = :pcbid LIMIT 1"
         self.execute(sql, {"pcbid": pcbid})
+        MachineData.machine_cache.invalidate(pcbid)
+        self.__invalidate_lookups()
 
     def create_arcade(
         self,
@@ -399,6 +552,39 @@ class MachineData(BaseData):
             [owner["userid"] for owner in cursor.mappings()],
         )
 
+    def get_cached_arcade(self, arcadeid: ArcadeID) -> Optional[Arcade]:
+        """
+        Given an arcade ID, look up the arcade, using the per-process lookup cache.
+        This is meant for the packet dispatch path which only needs to read the arcade.
+        Anything that modifies and saves an arcade should use get_arcade instead.
+
+        Parameters:
+            arcadeid - The integer arcade ID, most likely returned from a get_machine query.
+
+        Returns:
+            An Arcade object if this arcade was found, or None otherwise.
+        """
+        MachineData.arcade_cache.sync(self.__lookup_version())
+        found, arcade = MachineData.arcade_cache.get(arcadeid)
+        if not found:
+            arcade = self.get_arcade(arcadeid)
+            MachineData.arcade_cache.put(arcadeid, arcade)
+        return arcade
+
+    @staticmethod
+    def lookup_cache_statistics() -> Dict[str, Dict[str, int]]:
+        """
+        Return hit/miss statistics for the per-process machine and arcade lookup caches.
+
+        Returns:
+            A dictionary keyed by 'machine' and 'arcade', each containing the number
+            of hits, misses and invalidations as well as the current number of entries.
+        """
+        return {
+            "machine": MachineData.machine_cache.statistics(),
+            "arcade": MachineData.arcade_cache.statistics(),
+        }
+
     def put_arcade(self, arcade: Arcade) -> None:
         """
         Given an arcade, update the DB to match the new values
@@ -438,6 +624,8 @@ class MachineData(BaseData):
                 VALUES (:userid, :arcadeid)
             """
             self.execute(sql, {"userid": owner, "arcadeid": arcade.id})
+        MachineData.arcade_cache.invalidate(arcade.id)
+        self.__invalidate_lookups()
 
     def destroy_arcade(self, arcadeid: ArcadeID) -> None:
         """
@@ -453,6 +641,10 @@ class MachineData(BaseData):
         self.execute(sql, {"arcadeid": arcadeid})
         sql = "UPDATE `machine` SET arcadeid = NULL WHERE arcadeid = :arcadeid"
         self.execute(sql, {"arcadeid": arcadeid})
+        MachineData.arcade_cache.invalidate(arcadeid)
+        # Any number of machines could have pointed at this arcade.
+        MachineData.machine_cache.invalidate()
+        self.__invalidate_lookups()
 
     def get_all_arcades(self) -> List[Arcade]:
         """
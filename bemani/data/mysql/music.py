@@ -1,19 +1,27 @@
+import os
+import pickle
+import threading
+import time
+import uuid
 from sqlalchemy import Table, Column, UniqueConstraint
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.types import String, Integer, JSON
 from sqlalchemy.dialects.mysql import BIGINT as BigInteger
 from typing import Optional, Dict, List, Tuple, Any
+from typing_extensions import Final
 
-from bemani.common import GameConstants, Time
+from bemani.common import GameConstants, Time, ValidatedDict, cache
 from bemani.data.exceptions import ScoreSaveException
 from bemani.data.mysql.base import BaseData, metadata
+from bemani.data.statistics import AttemptStatistics
 from bemani.data.types import Score, Attempt, Song, UserID
 
 """
 Table for storing a score for a particular game. This is keyed by userid and
 musicid, as a user can only have one score for a particular song/chart combo.
 This has a JSON blob for any data the game wishes to store, such as points, medals,
-ghost, etc.
+ghost, etc. The number of times the user has played the chart is kept alongside the
+score so that it doesn't need to be counted from score_history every time it is looked up.
 
 Note that this is NOT keyed by game song id and chart, but by an internal musicid
 managed by the music table. This is so we can support keeping the same score across
@@ -29,6 +37,7 @@ score = Table(
     Column("timestamp", Integer, nullable=False, index=True),
     Column("update", Integer, nullable=False, index=True),
     Column("lid", Integer, nullable=False, index=True),
+    Column("plays", Integer, nullable=False),
     Column("data", JSON, nullable=False),
     UniqueConstraint("userid", "musicid", name="userid_musicid"),
     mysql_charset="utf8mb4",
@@ -54,6 +63,24 @@ score_history = Table(
     mysql_charset="utf8mb4",
 )
 
+"""
+Table for storing running totals of attempts for a particular song/chart. Every attempt
+written to score_history also bumps the counters here, so that clear rates can be looked
+up without scanning the entire score history. Like score and score_history, this is keyed
+by the internal musicid which already identifies a single chart of a song.
+"""
+score_stats = Table(
+    "score_stats",
+    metadata,
+    Column("musicid", Integer, nullable=False, primary_key=True, autoincrement=False),
+    Column("attempts", Integer, nullable=False),
+    Column("plays", Integer, nullable=False),
+    Column("clears", Integer, nullable=False),
+    Column("combos", Integer, nullable=False),
+    Column("points", BigInteger(unsigned=True), nullable=False),
+    mysql_charset="utf8mb4",
+)
+
 """
 Table for storing the mapping between game songid/chart and musicid for the score
 and score_history table. To find scores, you will want to join this table with
@@ -80,7 +107,174 @@ music = Table(
 )
 
 
+class SongCatalog:
+    """
+    An immutable, in-memory index of every song and chart for a single game series, so
+    that looking up songs doesn't need a trip to the DB and a round of deserializing song
+    data every time. The songs handed out are shared by everything in the process, so
+    callers must not modify them.
+    """
+
+    def __init__(self, game: GameConstants, version: Optional[str], songs: List[Song]) -> None:
+        """
+        Initialize the catalog.
+
+        Parameters:
+            game - The game series this catalog is for.
+            version - The catalog version these songs were loaded at, or None if unknown.
+            songs - Every song/chart combo for the game series, newest version first.
+        """
+        self.game = game
+        self.version = version
+        self.__songs = tuple(songs)
+        self.__versions: Dict[int, List[Song]] = {}
+        self.__index: Dict[Tuple[int, int, int], Song] = {}
+        for song in self.__songs:
+            self.__versions.setdefault(song.version, []).append(song)
+            self.__index[(song.version, song.id, song.chart)] = song
+
+    def get_song(self, version: int, songid: int, songchart: int) -> Optional[Song]:
+        return self.__index.get((version, songid, songchart))
+
+    def get_all_songs(self, version: Optional[int] = None) -> List[Song]:
+        if version is None:
+            return list(self.__songs)
+        return list(self.__versions.get(version, []))
+
+
 class MusicData(BaseData):
+    # How often a worker checks whether "read" has published new songs, and how long a song
+    # catalog is trusted for when the cache can't tell us, such as when it isn't shared.
+    CATALOG_CHECK_INTERVAL: Final[int] = 5
+    CATALOG_REFRESH_INTERVAL: Final[int] = Time.SECONDS_IN_MINUTE * 10
+    CATALOG_VERSION_KEY: Final[str] = "music.catalog_version"
+
+    # Song catalogs are shared by everything in the process, and are kept as a tuple of
+    # when they were loaded, when they were last checked and the catalog itself.
+    __catalog_lock = threading.Lock()
+    __catalogs: Dict[GameConstants, Tuple[float, float, SongCatalog]] = {}
+    __snapshot: Optional[str] = None
+
+    @staticmethod
+    def _reset() -> None:
+        # Another thread might have been holding the lock when we forked. Catalogs loaded
+        # before forking are still good, so keep them around.
+        MusicData.__catalog_lock = threading.Lock()
+
+    @staticmethod
+    def load_catalog_snapshot(filename: str) -> None:
+        """
+        Load song catalogs from a snapshot written by "read", so that a freshly started
+        worker doesn't need to go to the DB for them. Only catalogs matching the current
+        catalog version are used, and the snapshot is consulted again whenever a newer
+        version is published. Games missing from the snapshot are loaded from the DB.
+
+        Parameters:
+            filename - Path to the snapshot file.
+        """
+        MusicData.__snapshot = filename
+        version = MusicData.get_catalog_version()
+        now = time.monotonic()
+        for game in GameConstants:
+            catalog = MusicData.__load_snapshot(game, version)
+            if catalog is not None:
+                with MusicData.__catalog_lock:
+                    MusicData.__catalogs[game] = (now, now, catalog)
+
+    @staticmethod
+    def __load_snapshot(game: GameConstants, version: Optional[str]) -> Optional[SongCatalog]:
+        if MusicData.__snapshot is None or version is None:
+            # Without a version we can't tell if the snapshot is current.
+            return None
+        try:
+            with open(MusicData.__snapshot, "rb") as fp:
+                catalogs: Dict[GameConstants, SongCatalog] = pickle.load(fp)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        catalog = catalogs.get(game)
+        if catalog is None or catalog.version != version:
+            return None
+        return catalog
+
+    @staticmethod
+    def get_catalog_version() -> Optional[str]:
+        """
+        Look up the current song catalog version, which changes every time "read" imports songs.
+
+        Returns:
+            A string identifying the current catalog version, or None if not known.
+        """
+        return cache.get(MusicData.CATALOG_VERSION_KEY)
+
+    def publish_catalog(self, filename: Optional[str] = None) -> None:
+        """
+        Start a new song catalog version, so that every process reloads its song catalogs.
+        Should be called after songs are imported. If a filename is given, a snapshot of
+        every game's songs is also written there for workers to load instead of the DB.
+
+        Parameters:
+            filename - Optional path to write a catalog snapshot to.
+        """
+        version = uuid.uuid4().hex
+        if filename is not None:
+            catalogs = {game: self.__build_catalog(game, version) for game in GameConstants}
+            # Write it out somewhere else first so that workers never see half of a snapshot.
+            tmpname = f"{filename}.{os.getpid()}.tmp"
+            with open(tmpname, "wb") as fp:
+                pickle.dump(catalogs, fp, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpname, filename)
+        cache.set(self.CATALOG_VERSION_KEY, version, timeout=0)
+        with MusicData.__catalog_lock:
+            MusicData.__catalogs.clear()
+
+    def __build_catalog(self, game: GameConstants, version: Optional[str]) -> SongCatalog:
+        sql = """
+            SELECT version, songid, chart, name, artist, genre, data
+            FROM music WHERE music.game = :game
+            ORDER BY music.version DESC, music.songid, music.chart
+        """
+        cursor = self.execute(sql, {"game": game.value})
+        return SongCatalog(
+            game,
+            version,
+            [
+                Song(
+                    game,
+                    result["version"],
+                    result["songid"],
+                    result["chart"],
+                    result["name"],
+                    result["artist"],
+                    result["genre"],
+                    self.deserialize(result["data"]),
+                )
+                for result in cursor.mappings()
+            ],
+        )
+
+    def __catalog(self, game: GameConstants) -> SongCatalog:
+        now = time.monotonic()
+        with MusicData.__catalog_lock:
+            entry = MusicData.__catalogs.get(game)
+        if entry is not None:
+            loaded, checked, catalog = entry
+            if now - checked < self.CATALOG_CHECK_INTERVAL:
+                return catalog
+
+            # If the cache can't tell us about new songs, reload every so often instead.
+            version = self.get_catalog_version()
+            if version == catalog.version and (version is not None or now - loaded < self.CATALOG_REFRESH_INTERVAL):
+                with MusicData.__catalog_lock:
+                    MusicData.__catalogs[game] = (loaded, now, catalog)
+                return catalog
+        else:
+            version = self.get_catalog_version()
+
+        catalog = MusicData.__load_snapshot(game, version) or self.__build_catalog(game, version)
+        with MusicData.__catalog_lock:
+            MusicData.__catalogs[game] = (now, now, catalog)
+        return catalog
+
     def __get_musicid(self, game: GameConstants, version: int, songid: int, songchart: int) -> int:
         """
         Given a game/version/songid/chart, look up the unique music ID for this song.
@@ -142,12 +336,16 @@ class MusicData(BaseData):
         musicid = self.__get_musicid(game, version, songid, songchart)
         ts = timestamp if timestamp is not None else Time.now()
 
-        # Add to user score
+        # Add to user score. The play count is only computed when the score is first
+        # created, after that it is kept up to date by put_attempt.
         if new_record:
             # We want to update the timestamp/location to now if its a new record.
             sql = """
-                INSERT INTO `score` (`userid`, `musicid`, `points`, `data`, `timestamp`, `update`, `lid`)
-                VALUES (:userid, :musicid, :points, :data, :timestamp, :update, :location)
+                INSERT INTO `score` (`userid`, `musicid`, `points`, `data`, `timestamp`, `update`, `lid`, `plays`)
+                VALUES (
+                    :userid, :musicid, :points, :data, :timestamp, :update, :location,
+                    (SELECT COUNT(timestamp) FROM score_history WHERE userid = :userid AND musicid = :musicid)
+                )
                 ON DUPLICATE KEY UPDATE
                     data = VALUES(data),
                     points = VALUES(points),
@@ -159,8 +357,11 @@ class MusicData(BaseData):
             # We don't want to add the timestamp of the record since it wasn't a new high score.
             # We also don't want to update thet location since this wasn't a new record.
             sql = """
-                INSERT INTO `score` (`userid`, `musicid`, `points`, `data`, `timestamp`, `update`, `lid`)
-                VALUES (:userid, :musicid, :points, :data, :timestamp, :update, :location)
+                INSERT INTO `score` (`userid`, `musicid`, `points`, `data`, `timestamp`, `update`, `lid`, `plays`)
+                VALUES (
+                    :userid, :musicid, :points, :data, :timestamp, :update, :location,
+                    (SELECT COUNT(timestamp) FROM score_history WHERE userid = :userid AND musicid = :musicid)
+                )
                 ON DUPLICATE KEY UPDATE
                     data = VALUES(data),
                     points = VALUES(points),
@@ -219,8 +420,20 @@ class MusicData(BaseData):
             INSERT INTO `score_history` (userid, musicid, timestamp, lid, new_record, points, data)
             VALUES (:userid, :musicid, :timestamp, :location, :new_record, :points, :data)
         """
+        # Keep the running totals for this chart and the play count for this user's score
+        # in sync, but only if this attempt is saved. If there is no score yet, put_score
+        # will count this attempt when it creates one.
+        followups = [self.__stats_update(game, musicid, points, ValidatedDict(data))]
+        if userid is not None:
+            followups.append(
+                (
+                    "UPDATE score SET plays = plays + 1 WHERE userid = :userid AND musicid = :musicid",
+                    {"userid": userid, "musicid": musicid},
+                )
+            )
+
         try:
-            self.execute(
+            saved = self.execute_deferred(
                 sql,
                 {
                     "userid": userid if userid is not None else 0,
@@ -231,12 +444,53 @@ class MusicData(BaseData):
                     "points": points,
                     "data": self.serialize(data),
                 },
+                unique=("userid", "musicid", "timestamp"),
+                followups=followups,
             )
         except IntegrityError:
+            saved = False
+        if not saved:
             raise ScoreSaveException(
                 f"There is already an attempt by {userid if userid is not None else 0} for music id {musicid} at {ts}"
             )
 
+    def __stats_update(
+        self, game: GameConstants, musicid: int, points: int, data: ValidatedDict
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Given an attempt being saved, build the statement which bumps the running totals
+        for the chart it was played on.
+
+        Parameters:
+            game - Enum value representing a game series.
+            musicid - The internal music ID this attempt was saved against.
+            points - Points obtained on this attempt.
+            data - Data that the game recorded along with the attempt.
+
+        Returns:
+            A tuple of the SQL statement and its parameters.
+        """
+        sql = """
+            INSERT INTO `score_stats` (`musicid`, `attempts`, `plays`, `clears`, `combos`, `points`)
+            VALUES (:musicid, 1, :plays, :clears, :combos, :points)
+            ON DUPLICATE KEY UPDATE
+                attempts = attempts + VALUES(attempts),
+                plays = plays + VALUES(plays),
+                clears = clears + VALUES(clears),
+                combos = combos + VALUES(combos),
+                points = points + VALUES(points)
+        """
+        return (
+            sql,
+            {
+                "musicid": musicid,
+                "plays": 1 if AttemptStatistics.is_play(game, data) else 0,
+                "clears": 1 if AttemptStatistics.is_clear(game, data) else 0,
+                "combos": 1 if AttemptStatistics.is_combo(game, data) else 0,
+                "points": max(points, 0),
+            },
+        )
+
     def get_score(
         self,
         game: GameConstants,
@@ -266,11 +520,7 @@ class MusicData(BaseData):
                 score.timestamp AS timestamp,
                 score.update AS `update`,
                 score.lid AS lid,
-                (
-                    SELECT COUNT(score_history.timestamp)
-                    FROM score_history
-                    WHERE score_history.musicid = music.id AND score_history.userid = :userid
-                ) AS plays,
+                score.plays AS plays,
                 score.points AS points,
                 score.data AS data
             FROM score, music
@@ -330,11 +580,7 @@ class MusicData(BaseData):
                 score.update AS `update`,
                 score.userid AS userid,
                 score.lid AS lid,
-                (
-                    SELECT COUNT(score_history.timestamp)
-                    FROM score_history
-                    WHERE score_history.musicid = music.id AND score_history.userid = score.userid
-                ) AS plays,
+                score.plays AS plays,
                 score.points AS points,
                 score.data AS data
             FROM score, music
@@ -399,10 +645,7 @@ class MusicData(BaseData):
                 score.timestamp AS timestamp,
                 score.update AS `update`,
                 score.lid AS lid,
-                (
-                    select COUNT(score_history.timestamp) FROM score_history
-                    WHERE score_history.musicid = music.id AND score_history.userid = :userid
-                ) AS plays,
+                score.plays AS plays,
                 score.points AS points,
                 score.data AS data
             FROM score, music
@@ -562,6 +805,7 @@ class MusicData(BaseData):
     ) -> Optional[Song]:
         """
         Given a game/version/songid/chart, look up the name, artist and genre of that song.
+        This is served from the song catalog, so the returned song must not be modified.
 
         Parameters:
             game - Enum value representing a game series.
@@ -572,42 +816,7 @@ class MusicData(BaseData):
         Returns:
             A Song object representing the song details
         """
-        sql = """
-            SELECT
-                music.name AS name,
-                music.artist AS artist,
-                music.genre AS genre,
-                music.data AS data
-            FROM music
-            WHERE
-                music.game = :game AND
-                music.version = :version AND
-                music.songid = :songid AND
-                music.chart = :songchart
-        """
-        cursor = self.execute(
-            sql,
-            {
-                "game": game.value,
-                "version": version,
-                "songid": songid,
-                "songchart": songchart,
-            },
-        )
-        if cursor.rowcount != 1:
-            # music doesn't exist
-            return None
-        result = cursor.mappings().fetchone()  # type: ignore
-        return Song(
-            game,
-            version,
-            songid,
-            songchart,
-            result["name"],
-            result["artist"],
-            result["genre"],
-            self.deserialize(result["data"]),
-        )
+        return self.__catalog(game).get_song(version, songid, songchart)
 
     def get_all_songs(
         self,
@@ -616,6 +825,7 @@ class MusicData(BaseData):
     ) -> List[Song]:
         """
         Given a game and a version, look up all song/chart combos associated with that game.
+        This is served from the song catalog, so the returned songs must not be modified.
 
         Parameters:
             game - Enum value representing a game series.
@@ -624,31 +834,35 @@ class MusicData(BaseData):
         Returns:
             A list of Song objects detailing the song information for each song.
         """
-        sql = """
-            SELECT version, songid, chart, name, artist, genre, data
-            FROM music WHERE music.game = :game
+        return self.__catalog(game).get_all_songs(version)
+
+    def get_all_versions(self, game: GameConstants) -> List[int]:
         """
-        params: Dict[str, Any] = {"game": game.value}
-        if version is not None:
-            sql += " AND music.version = :version"
-            params["version"] = version
-        else:
-            sql += " ORDER BY music.version DESC"
-        cursor = self.execute(sql, params)
+        Given a game, look up every version that we have songs for.
 
-        return [
-            Song(
-                game,
-                result["version"],
-                result["songid"],
-                result["chart"],
-                result["name"],
-                result["artist"],
-                result["genre"],
-                self.deserialize(result["data"]),
-            )
-            for result in cursor.mappings()
-        ]
+        Parameters:
+            game - Enum value representing a game series.
+
+        Returns:
+            A list of integers representing each version of the game found in the music table.
+        """
+        sql = "SELECT DISTINCT version FROM music WHERE game = :game"
+        cursor = self.execute(sql, {"game": game.value})
+        return sorted(result["version"] for result in cursor.mappings())
+
+    def __songselect(self, version: Optional[int]) -> str:
+        """
+        Given an optional version, return a select statement mapping music IDs for a game
+        to songid/chart, suitable for joining scores against. If no version is given, the
+        songid/chart for the newest version that a music ID appears in is used.
+        """
+        if version is not None:
+            return "SELECT id, songid, chart FROM music WHERE game = :game AND version = :version"
+        return """
+            SELECT music.id AS id, music.songid AS songid, music.chart AS chart
+            FROM music, (SELECT id, MAX(version) AS version FROM music WHERE game = :game GROUP BY id) latest
+            WHERE music.id = latest.id AND music.version = latest.version AND music.game = :game
+        """
 
     def get_all_scores(
         self,
@@ -670,24 +884,8 @@ class MusicData(BaseData):
         Returns:
             A list of UserID, Score objects representing all high scores for a game.
         """
-        # First, construct the queries for grabbing the songid/chart
-        if version is not None:
-            songidquery = (
-                "SELECT songid FROM music WHERE music.id = score.musicid AND game = :game AND version = :version"
-            )
-            chartquery = (
-                "SELECT chart FROM music WHERE music.id = score.musicid AND game = :game AND version = :version"
-            )
-        else:
-            songidquery = (
-                "SELECT songid FROM music WHERE music.id = score.musicid AND game = :game ORDER BY version DESC LIMIT 1"
-            )
-            chartquery = (
-                "SELECT chart FROM music WHERE music.id = score.musicid AND game = :game ORDER BY version DESC LIMIT 1"
-            )
-
-        # Select statement for getting play count
-        playselect = "SELECT COUNT(timestamp) FROM score_history WHERE score_history.musicid = score.musicid AND score_history.userid = score.userid"
+        # First, construct the table we join against for grabbing the songid/chart
+        songselect = self.__songselect(version)
 
         # Now, construct the inner select statement so we can choose which scores we care about
         innerselect = "SELECT DISTINCT(id) FROM music WHERE game = :game"
@@ -701,22 +899,23 @@ class MusicData(BaseData):
         # Finally, construct the full query
         sql = f"""
             SELECT
-                ({songidquery}) AS songid,
-                ({chartquery}) AS chart,
-                id AS scorekey,
-                points,
-                timestamp,
-                `update`,
-                lid,
-                data,
-                userid,
-                ({playselect}) AS plays
-            FROM score WHERE musicid IN ({innerselect})
+                songs.songid AS songid,
+                songs.chart AS chart,
+                score.id AS scorekey,
+                score.points AS points,
+                score.timestamp AS timestamp,
+                score.update AS `update`,
+                score.lid AS lid,
+                score.data AS data,
+                score.userid AS userid,
+                score.plays AS plays
+            FROM score, ({songselect}) songs
+            WHERE score.musicid = songs.id AND score.musicid IN ({innerselect})
         """
 
         # Now, limit the query
         if userid is not None:
-            sql = sql + " AND userid = :userid"
+            sql = sql + " AND score.userid = :userid"
         if since is not None:
             sql = sql + " AND score.update >= :since"
         if until is not None:
@@ -778,21 +977,8 @@ class MusicData(BaseData):
         Returns:
             A list of UserID, Score objects representing all high scores for a game.
         """
-        # First, construct the queries for grabbing the songid/chart
-        if version is not None:
-            songidquery = (
-                "SELECT songid FROM music WHERE music.id = score.musicid AND game = :game AND version = :version"
-            )
-            chartquery = (
-                "SELECT chart FROM music WHERE music.id = score.musicid AND game = :game AND version = :version"
-            )
-        else:
-            songidquery = (
-                "SELECT songid FROM music WHERE music.id = score.musicid AND game = :game ORDER BY version DESC LIMIT 1"
-            )
-            chartquery = (
-                "SELECT chart FROM music WHERE music.id = score.musicid AND game = :game ORDER BY version DESC LIMIT 1"
-            )
+        # First, construct the table we join against for grabbing the songid/chart
+        songselect = self.__songselect(version)
 
         # Next, get a list of all songs that were played given the input criteria
         musicid_sql = (
@@ -827,11 +1013,12 @@ class MusicData(BaseData):
             FROM ({musicid_sql}) played
         """
 
-        # Now, join it up against the score and music table to grab the info we need
+        # Now, join it up against the score and music table to grab the info we need. The play
+        # count for a record is every attempt on the chart, which the chart statistics already track.
         sql = f"""
             SELECT
-                ({songidquery}) AS songid,
-                ({chartquery}) AS chart,
+                songs.songid AS songid,
+                songs.chart AS chart,
                 score.points AS points,
                 score.userid AS userid,
                 score.id AS scorekey,
@@ -839,12 +1026,11 @@ class MusicData(BaseData):
                 score.timestamp AS timestamp,
                 score.update AS `update`,
                 score.lid AS lid,
-                (
-                    SELECT COUNT(score_history.timestamp) FROM score_history
-                    WHERE score_history.musicid = score.musicid
-                ) AS plays
-            FROM score, ({records_sql}) records
-            WHERE records.userid = score.userid AND records.musicid = score.musicid
+                COALESCE(score_stats.attempts, 0) AS plays
+            FROM score
+            JOIN ({records_sql}) records ON records.userid = score.userid AND records.musicid = score.musicid
+            JOIN ({songselect}) songs ON songs.id = score.musicid
+            LEFT JOIN score_stats ON score_stats.musicid = score.musicid
         """
         cursor = self.execute(sql, params)
 
@@ -1021,3 +1207,142 @@ class MusicData(BaseData):
             )
             for result in cursor.mappings()
         ]
+
+    def get_clear_statistics(
+        self,
+        game: GameConstants,
+        version: int,
+        songid: Optional[int] = None,
+        songchart: Optional[int] = None,
+    ) -> Dict[int, Dict[int, Dict[str, int]]]:
+        """
+        Look up the running totals of all attempts for a particular game, optionally limited
+        to a single song or a single song/chart.
+
+        Parameters:
+            game - Enum value representing a game series.
+            version - Integer representing which version of the game.
+            songid - Optional ID of the song according to the game.
+            songchart - Optional chart number according to the game.
+
+        Returns:
+            A dictionary keyed by songid, whos values are a dictionary keyed by chart, whos
+            values are a dictionary containing integer counts keyed by 'attempts', 'plays',
+            'clears', 'combos' and 'points'. Note that 'points' is the sum of points earned
+            across all attempts, suitable for computing an average.
+        """
+        sql = """
+            SELECT
+                music.songid AS songid,
+                music.chart AS chart,
+                score_stats.attempts AS attempts,
+                score_stats.plays AS plays,
+                score_stats.clears AS clears,
+                score_stats.combos AS combos,
+                score_stats.points AS points
+            FROM score_stats, music
+            WHERE
+                score_stats.musicid = music.id AND
+                music.game = :game AND
+                music.version = :version
+        """
+        if songid is not None:
+            sql = sql + " AND music.songid = :songid"
+        if songchart is not None:
+            sql = sql + " AND music.chart = :songchart"
+        cursor = self.execute(
+            sql,
+            {
+                "game": game.value,
+                "version": version,
+                "songid": songid,
+                "songchart": songchart,
+            },
+        )
+
+        retval: Dict[int, Dict[int, Dict[str, int]]] = {}
+        for result in cursor.mappings():
+            if result["songid"] not in retval:
+                retval[result["songid"]] = {}
+            retval[result["songid"]][result["chart"]] = {
+                "attempts": result["attempts"],
+                "plays": result["plays"],
+                "clears": result["clears"],
+                "combos": result["combos"],
+                "points": int(result["points"]),
+            }
+        return retval
+
+    def rebuild_clear_statistics(self, batch: int = 10000) -> int:
+        """
+        Throw away and recompute the running totals for every chart from the score history.
+        This is meant to be run once when the statistics table is first created, or if it ever
+        drifts out of sync with score history. Attempts saved while this is running may be
+        lost from the totals, so this is best done while services is stopped.
+
+        Parameters:
+            batch - Number of attempts to pull out of the DB at once.
+
+        Returns:
+            The number of attempts that were tallied.
+        """
+        # First, figure out which game each music ID belongs to so we know which rules to apply.
+        cursor = self.execute("SELECT DISTINCT id, game FROM music")
+        games: Dict[int, GameConstants] = {}
+        for result in cursor.mappings():
+            try:
+                games[result["id"]] = GameConstants(result["game"])
+            except ValueError:
+                # Leftover music from a game we no longer support.
+                continue
+
+        # Now, tally up every attempt, a batch at a time so we don't hold the entire history in memory.
+        stats: Dict[int, Dict[str, int]] = {}
+        lastid = 0
+        tallied = 0
+        while True:
+            sql = """
+                SELECT id, musicid, points, data FROM score_history
+                WHERE id > :lastid ORDER BY id ASC LIMIT :batch
+            """
+            cursor = self.execute(sql, {"lastid": lastid, "batch": batch})
+            if cursor.rowcount == 0:
+                break
+
+            for result in cursor.mappings():
+                lastid = result["id"]
+                game = games.get(result["musicid"])
+                if game is None:
+                    continue
+                data = ValidatedDict(self.deserialize(result["data"]))
+
+                if result["musicid"] not in stats:
+                    stats[result["musicid"]] = {
+                        "attempts": 0,
+                        "plays": 0,
+                        "clears": 0,
+                        "combos": 0,
+                        "points": 0,
+                    }
+                stat = stats[result["musicid"]]
+                stat["attempts"] += 1
+                stat["plays"] += 1 if AttemptStatistics.is_play(game, data) else 0
+                stat["clears"] += 1 if AttemptStatistics.is_clear(game, data) else 0
+                stat["combos"] += 1 if AttemptStatistics.is_combo(game, data) else 0
+                stat["points"] += max(result["points"], 0)
+                tallied += 1
+
+        # Finally, replace the existing totals with what we just computed.
+        self.execute("DELETE FROM score_stats")
+        for musicid, stat in stats.items():
+            sql = """
+                INSERT INTO `score_stats` (`musicid`, `attempts`, `plays`, `clears`, `combos`, `points`)
+                VALUES (:musicid, :attempts, :plays, :clears, :combos, :points)
+            """
+            self.execute(sql, {"musicid": musicid, **stat})
+
+        return tallied
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=MusicData._reset)
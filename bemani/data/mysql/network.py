@@ -254,7 +254,7 @@ class NetworkData(BaseData):
         if timestamp is None:
             timestamp = Time.now()
         sql = "INSERT INTO audit (timestamp, userid, arcadeid, type, data) VALUES (:ts, :uid, :aid, :type, :data)"
-        self.execute(
+        self.execute_deferred(
             sql,
             {
                 "ts": timestamp,
@@ -518,13 +518,15 @@ class UserData(BaseData):
             return None
 
         result = cursor.mappings().fetchone()  # type: ignore
-        return Profile(
+        profile = Profile(
             game,
             version,
             result["refid"],
             result["extid"],
             self.deserialize(result["data"]),
         )
+        self.track(profile, "profile", {"refid": result["refid"]}, result["data"])
+        return profile
 
     def get_any_profile(self, game: GameConstants, version: int, userid: UserID) -> Optional[Profile]:
         """
@@ -551,16 +553,24 @@ class UserData(BaseData):
             return None
 
     def get_any_profiles(
-        self, game: GameConstants, version: int, userids: List[UserID]
+        self,
+        game: GameConstants,
+        version: int,
+        userids: List[UserID],
+        keys: Optional[List[str]] = None,
     ) -> List[Tuple[UserID, Optional[Profile]]]:
         """
         Does the exact same thing as get_any_profile but across a list of users instead of one.
-        Provided purely as a convenience function.
+        All of the profiles are looked up in a single query, so this should be preferred over
+        calling get_any_profile in a loop.
 
         Parameters:
             game - Enum value identifier of the game looking up the user.
             version - Integer version of the game looking up the user.
             userids - List of Integer user IDs, as looked up by one of the above functions.
+            keys - Optional list of top-level profile keys to look up. If provided, only those
+                   keys are pulled out of each profile, which is much cheaper than loading the
+                   whole thing when all that's needed is something like a name or a rank.
 
         Returns:
             A List of tuples containing a userid and a dictionary previously stored by a game class if found,
@@ -568,39 +578,52 @@ class UserData(BaseData):
         """
         if not userids:
             return []
-        sql = """
-            SELECT refid.version AS version, refid.userid AS userid
+
+        params: Dict[str, Any] = {"game": game.value, "version": version, "userids": userids}
+        if keys is None:
+            data = "profile.data"
+        else:
+            fields = []
+            for i, key in enumerate(keys):
+                fields.append(f":key{i}, JSON_EXTRACT(profile.data, :path{i})")
+                params[f"key{i}"] = key
+                params[f"path{i}"] = self.json_path(key)
+            data = f"JSON_OBJECT({', '.join(fields)})"
+
+        # Use the profile for the requested version if it exists, falling back to the newest profile
+        # for this game if it doesn't.
+        sql = f"""
+            SELECT refid.userid AS userid, refid.version AS version, refid.refid AS refid, extid.extid AS extid, {data} AS data
             FROM refid
-            INNER JOIN profile ON refid.refid = profile.refid
-            WHERE refid.game = :game AND refid.userid IN :userids
+            INNER JOIN profile ON profile.refid = refid.refid
+            INNER JOIN extid ON extid.userid = refid.userid AND extid.game = refid.game
+            INNER JOIN (
+                SELECT refid.userid AS userid, IF(SUM(refid.version = :version) > 0, :version, MAX(refid.version)) AS version
+                FROM refid
+                INNER JOIN profile ON profile.refid = refid.refid
+                WHERE refid.game = :game AND refid.userid IN :userids
+                GROUP BY refid.userid
+            ) chosen ON chosen.userid = refid.userid AND chosen.version = refid.version
+            WHERE refid.game = :game
         """
-        cursor = self.execute(sql, {"game": game.value, "userids": userids})
-        profilever: Dict[UserID, int] = {}
+        cursor = self.execute(sql, params)
 
+        profiles: Dict[UserID, Profile] = {}
         for result in cursor.mappings():
-            tuid = UserID(result["userid"])
-            tver = result["version"]
-
-            if tuid not in profilever:
-                # Just assign it the first profile we find
-                profilever[tuid] = tver
-            else:
-                # If the profile for this version exists, prioritize it
-                if tver == version:
-                    profilever[tuid] = tver
-
-                # Only update the profile version with the newest game profile if the game
-                # profile for this version doesn't exist.
-                elif profilever[tuid] != version:
-                    profilever[tuid] = max(profilever[tuid], tver)
-
-        return [
-            (
-                uid,
-                self.get_profile(game, profilever[uid], uid) if uid in profilever else None,
+            profiledata = self.deserialize(result["data"])
+            if keys is not None:
+                # Keys that the profile doesn't have come back as null, drop them so that
+                # defaults work the same way as they would on the full profile.
+                profiledata = {key: value for key, value in profiledata.items() if value is not None}
+            profiles[UserID(result["userid"])] = Profile(
+                game,
+                result["version"],
+                result["refid"],
+                result["extid"],
+                profiledata,
             )
-            for uid in userids
-        ]
+
+        return [(uid, profiles.get(uid)) for uid in userids]
 
     def get_games_played(self, userid: UserID, game: Optional[GameConstants] = None) -> List[Tuple[GameConstants, int]]:
         """
@@ -747,13 +770,16 @@ class UserData(BaseData):
         """
         refid = self.get_refid(game, version, userid)
 
-        # Add profile json to game profile
-        sql = """
-            INSERT INTO profile (refid, data)
-            VALUES (:refid, :json)
-            ON DUPLICATE KEY UPDATE data=VALUES(data)
-        """
-        self.execute(sql, {"refid": refid, "json": self.serialize(profile)})
+        if not self.put_changes("profile", "data", {"refid": refid}, profile):
+            # Add profile json to game profile
+            sql = """
+                INSERT INTO profile (refid, data)
+                VALUES (:refid, :json)
+                ON DUPLICATE KEY UPDATE data=VALUES(data)
+            """
+            data = self.serialize(profile)
+            self.execute(sql, {"refid": refid, "json": data})
+            self.track(profile, "profile", {"refid": refid}, data)
 
         # Update profile details just in case this was a new profile that was just saved.
         profile.game = game
@@ -809,7 +835,11 @@ class UserData(BaseData):
             return None
 
         result = cursor.mappings().fetchone()  # type: ignore
-        return ValidatedDict(self.deserialize(result["data"]))
+        achievement = ValidatedDict(self.deserialize(result["data"]))
+        self.track(
+            achievement, "achievement", {"refid": refid, "id": achievementid, "type": achievementtype}, result["data"]
+        )
+        return achievement
 
     def get_achievements(self, game: GameConstants, version: int, userid: UserID) -> List[Achievement]:
         """
@@ -827,15 +857,22 @@ class UserData(BaseData):
         sql = "SELECT id, type, data FROM achievement WHERE refid = :refid"
         cursor = self.execute(sql, {"refid": refid})
 
-        return [
-            Achievement(
+        achievements = []
+        for result in cursor.mappings():
+            achievement = Achievement(
                 result["id"],
                 result["type"],
                 None,
                 self.deserialize(result["data"]),
             )
-            for result in cursor.mappings()
-        ]
+            self.track(
+                achievement.data,
+                "achievement",
+                {"refid": refid, "id": result["id"], "type": result["type"]},
+                result["data"],
+            )
+            achievements.append(achievement)
+        return achievements
 
     def put_achievement(
         self,
@@ -858,6 +895,9 @@ class UserData(BaseData):
             data - A dictionary of data that the game wishes to retrieve later.
         """
         refid = self.get_refid(game, version, userid)
+        where = {"refid": refid, "id": achievementid, "type": achievementtype}
+        if self.put_changes("achievement", "data", where, data):
+            return
 
         # Add achievement JSON to achievements
         sql = """
@@ -865,15 +905,10 @@ class UserData(BaseData):
             VALUES (:refid, :id, :type, :data)
             ON DUPLICATE KEY UPDATE data=VALUES(data)
         """
-        self.execute(
-            sql,
-            {
-                "refid": refid,
-                "id": achievementid,
-                "type": achievementtype,
-                "data": self.serialize(data),
-            },
-        )
+        serialized = self.serialize(data)
+        self.execute(sql, {**where, "data": serialized})
+        if isinstance(data, ValidatedDict):
+            self.track(data, "achievement", where, serialized)
 
     def destroy_achievement(
         self,
@@ -1281,6 +1316,39 @@ class UserData(BaseData):
             else:
                 raise AccountCreationException("Failed to cteate a new refid/extid pair!")
 
+    def get_refids_and_extids(
+        self, game: GameConstants, version: int, userids: List[UserID]
+    ) -> Dict[UserID, Tuple[str, int]]:
+        """
+        Does the same thing as calling get_refid and get_extid for each user in a list, but
+        looks up users that already have both in a single query.
+
+        Parameters:
+            game - Enum value identifier of the game looking up the users.
+            version - Integer version of the game looking up the users.
+            userids - List of Integer user IDs, as looked up by one of the above functions.
+
+        Returns:
+            A dictionary mapping each user ID to a tuple of its RefID and ExtID, creating them
+            for any user that doesn't have them yet.
+        """
+        if not userids:
+            return {}
+
+        sql = """
+            SELECT refid.userid AS userid, refid.refid AS refid, extid.extid AS extid
+            FROM refid
+            INNER JOIN extid ON extid.userid = refid.userid AND extid.game = refid.game
+            WHERE refid.game = :game AND refid.version = :version AND refid.userid IN :userids
+        """
+        cursor = self.execute(sql, {"game": game.value, "version": version, "userids": userids})
+        ids = {UserID(result["userid"]): (result["refid"], result["extid"]) for result in cursor.mappings()}
+
+        for userid in userids:
+            if userid not in ids:
+                ids[userid] = (self.get_refid(game, version, userid), self.get_extid(game, version, userid))
+        return ids
+
     def create_session(self, userid: UserID, expiration: int = (30 * 86400)) -> str:
         """
         Given a user ID, create a session string.
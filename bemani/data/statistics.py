@@ -0,0 +1,103 @@
+from bemani.common import DBConstants, GameConstants, ValidatedDict
+
+
+class AttemptStatistics:
+    """
+    Rules for deciding whether a single score attempt counts as a play, a clear or
+    a full combo for a given game series. These are shared between the running
+    totals kept by MusicData when an attempt is saved and the statistics that we
+    serve to other networks over BEMAPI, so that the two never disagree.
+    """
+
+    @staticmethod
+    def is_play(game: GameConstants, data: ValidatedDict) -> bool:
+        if game in {
+            GameConstants.DDR,
+            GameConstants.JUBEAT,
+            GameConstants.MUSECA,
+            GameConstants.POPN_MUSIC,
+            GameConstants.DANCE_EVOLUTION,
+        }:
+            return True
+        if game == GameConstants.IIDX:
+            return data.get_int("clear_status") != DBConstants.IIDX_CLEAR_STATUS_NO_PLAY
+        if game == GameConstants.REFLEC_BEAT:
+            return data.get_int("clear_type") != DBConstants.REFLEC_BEAT_CLEAR_TYPE_NO_PLAY
+        if game == GameConstants.SDVX:
+            return data.get_int("clear_type") != DBConstants.SDVX_CLEAR_TYPE_NO_PLAY
+
+        return False
+
+    @staticmethod
+    def is_clear(game: GameConstants, data: ValidatedDict) -> bool:
+        if not AttemptStatistics.is_play(game, data):
+            return False
+
+        if game == GameConstants.DDR:
+            return data.get_int("rank") != DBConstants.DDR_RANK_E
+        if game == GameConstants.IIDX:
+            # Attempts saved without a clear status are failures, not clears.
+            return (
+                data.get_int("clear_status", DBConstants.IIDX_CLEAR_STATUS_FAILED)
+                != DBConstants.IIDX_CLEAR_STATUS_FAILED
+            )
+        if game == GameConstants.JUBEAT:
+            return data.get_int("medal") != DBConstants.JUBEAT_PLAY_MEDAL_FAILED
+        if game == GameConstants.MUSECA:
+            return data.get_int("clear_type") != DBConstants.MUSECA_CLEAR_TYPE_FAILED
+        if game == GameConstants.POPN_MUSIC:
+            return data.get_int("medal") not in [
+                DBConstants.POPN_MUSIC_PLAY_MEDAL_CIRCLE_FAILED,
+                DBConstants.POPN_MUSIC_PLAY_MEDAL_DIAMOND_FAILED,
+                DBConstants.POPN_MUSIC_PLAY_MEDAL_STAR_FAILED,
+            ]
+        if game == GameConstants.REFLEC_BEAT:
+            return data.get_int("clear_type") != DBConstants.REFLEC_BEAT_CLEAR_TYPE_FAILED
+        if game == GameConstants.SDVX:
+            return data.get_int("grade") != DBConstants.SDVX_GRADE_NO_PLAY and data.get_int("clear_type") not in [
+                DBConstants.SDVX_CLEAR_TYPE_NO_PLAY,
+                DBConstants.SDVX_CLEAR_TYPE_FAILED,
+            ]
+        if game == GameConstants.DANCE_EVOLUTION:
+            return data.get_int("grade") != DBConstants.DANEVO_GRADE_FAILED
+
+        return False
+
+    @staticmethod
+    def is_combo(game: GameConstants, data: ValidatedDict) -> bool:
+        if not AttemptStatistics.is_play(game, data):
+            return False
+
+        if game == GameConstants.DDR:
+            return data.get_int("halo") != DBConstants.DDR_HALO_NONE
+        if game == GameConstants.IIDX:
+            return data.get_int("clear_status") == DBConstants.IIDX_CLEAR_STATUS_FULL_COMBO
+        if game == GameConstants.JUBEAT:
+            return data.get_int("medal") in [
+                DBConstants.JUBEAT_PLAY_MEDAL_FULL_COMBO,
+                DBConstants.JUBEAT_PLAY_MEDAL_NEARLY_EXCELLENT,
+                DBConstants.JUBEAT_PLAY_MEDAL_EXCELLENT,
+            ]
+        if game == GameConstants.MUSECA:
+            return data.get_int("clear_type") == DBConstants.MUSECA_CLEAR_TYPE_FULL_COMBO
+        if game == GameConstants.POPN_MUSIC:
+            return data.get_int("medal") in [
+                DBConstants.POPN_MUSIC_PLAY_MEDAL_CIRCLE_FULL_COMBO,
+                DBConstants.POPN_MUSIC_PLAY_MEDAL_DIAMOND_FULL_COMBO,
+                DBConstants.POPN_MUSIC_PLAY_MEDAL_STAR_FULL_COMBO,
+                DBConstants.POPN_MUSIC_PLAY_MEDAL_PERFECT,
+            ]
+        if game == GameConstants.REFLEC_BEAT:
+            return data.get_int("combo_type") in [
+                DBConstants.REFLEC_BEAT_COMBO_TYPE_FULL_COMBO,
+                DBConstants.REFLEC_BEAT_COMBO_TYPE_FULL_COMBO_ALL_JUST,
+            ]
+        if game == GameConstants.SDVX:
+            return data.get_int("clear_type") in [
+                DBConstants.SDVX_CLEAR_TYPE_ULTIMATE_CHAIN,
+                DBConstants.SDVX_CLEAR_TYPE_PERFECT_ULTIMATE_CHAIN,
+            ]
+        if game == GameConstants.DANCE_EVOLUTION:
+            return data.get_bool("full_combo")
+
+        return False
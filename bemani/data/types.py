@@ -192,6 +192,8 @@ class Song:
     An object representing a single song in the DB.
     """
 
+    __slots__ = ("game", "version", "id", "chart", "name", "artist", "genre", "data")
+
     def __init__(
         self,
         game: GameConstants,
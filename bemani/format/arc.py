@@ -50,4 +50,7 @@ class ARC:
         else:
             # Compressed
             lz77 = Lz77()
-            return lz77.decompress(self.__data[fileoffset : (fileoffset + compressedsize)])
+            return lz77.decompress(
+                self.__data[fileoffset : (fileoffset + compressedsize)],
+                size=uncompressedsize,
+            )
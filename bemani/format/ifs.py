@@ -1,9 +1,10 @@
 import hashlib
 import io
+import mmap
 import os
 import struct
 from PIL import Image
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple, Union
 
 from bemani.format.dxt import DXTBuffer
 from bemani.protocol.binary import BinaryEncoding
@@ -17,17 +18,25 @@ class IFS:
     Best-effort utility for decoding the `.ifs` file format. There are better tools out
     there, but this was developed before their existence. This should work with most of
     the games out there including non-rhythm games that use this format.
+
+    Only the header is parsed up front. Each file is remembered as an offset and size
+    into the archive (or as a name in a referenced archive) and read and decompressed
+    when it is asked for, so archives opened with IFS.open() are never read into memory
+    as a whole.
     """
 
     def __init__(
         self,
-        data: bytes,
+        data: Union[bytes, mmap.mmap],
         decode_binxml: bool = False,
         decode_textures: bool = False,
         keep_hex_names: bool = False,
         reference_loader: Optional[Callable[[str], Optional["IFS"]]] = None,
     ) -> None:
-        self.__files: Dict[str, bytes] = {}
+        self.__data = data
+        # Either the offset and size of a file in this archive, or the archive and
+        # name of a file stored in a different IFS.
+        self.__files: Dict[str, Union[Tuple[int, int], Tuple["IFS", str]]] = {}
         self.__formats: Dict[str, str] = {}
         self.__compressed: Dict[str, bool] = {}
         self.__imgsize: Dict[str, Tuple[int, int, int, int]] = {}
@@ -36,7 +45,55 @@ class IFS:
         self.__keep_hex_names = keep_hex_names
         self.__decode_textures = decode_textures
         self.__loader = reference_loader
-        self.__parse_file(data)
+        # Archives opened through the reference loader belong to us and are closed along with us.
+        self.__references: List["IFS"] = []
+        try:
+            self.__parse_file(data)
+        except Exception:
+            self.close()
+            raise
+
+    @classmethod
+    def open(
+        cls,
+        filename: str,
+        decode_binxml: bool = False,
+        decode_textures: bool = False,
+        keep_hex_names: bool = False,
+        reference_loader: Optional[Callable[[str], Optional["IFS"]]] = None,
+    ) -> "IFS":
+        """
+        Open an IFS file on disk by memory-mapping it, so that only the parts that are
+        actually read are ever brought into memory. The archive should be closed with
+        close(), or used as a context manager, once it is no longer needed. Any archives
+        opened by reference_loader are closed along with it.
+        """
+        with open(filename, "rb") as fp:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(
+                data,
+                decode_binxml=decode_binxml,
+                decode_textures=decode_textures,
+                keep_hex_names=keep_hex_names,
+                reference_loader=reference_loader,
+            )
+        except Exception:
+            data.close()
+            raise
+
+    def close(self) -> None:
+        for reference in self.__references:
+            reference.close()
+        self.__references = []
+        if isinstance(self.__data, mmap.mmap):
+            self.__data.close()
+
+    def __enter__(self) -> "IFS":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
 
     def __fix_name(self, filename: str) -> str:
         if filename[0] == "_" and filename[1].isdigit():
@@ -45,7 +102,7 @@ class IFS:
         filename = filename.replace("__", "_")
         return filename
 
-    def __parse_file(self, data: bytes) -> None:
+    def __parse_file(self, data: Union[bytes, mmap.mmap]) -> None:
         # Grab the magic values and make sure this is an IFS
         (
             signature,
@@ -145,16 +202,16 @@ class IFS:
                         raise Exception(f"Couldn't extract file data for {fn} referencing IFS file {external_file}!")
                     else:
                         otherdata[external_file] = ifsdata
+                        self.__references.append(ifsdata)
 
                 if fn in otherdata[external_file].filenames:
-                    filedata = otherdata[external_file].read_file(fn)
+                    self.__files[fn] = (otherdata[external_file], fn)
                 else:
                     raise Exception(f"{fn} not found in {external_file} IFS!")
             else:
-                filedata = data[start : (start + size)]
-                if len(filedata) != size:
+                if start + size > len(data):
                     raise Exception(f"Couldn't extract file data for {fn}!")
-            self.__files[fn] = filedata
+                self.__files[fn] = (start, size)
 
         # Now, find all of the index files that are available.
         for filename in list(self.__files.keys()):
@@ -165,13 +222,13 @@ class IFS:
                 texdir = os.path.dirname(filename)
 
                 benc = BinaryEncoding()
-                texdata = benc.decode(self.__files[filename])
+                texdata = benc.decode(self.__read_raw(filename))
 
                 if texdata is None:
                     # Now, try as XML
                     xenc = XmlEncoding()
                     encoding = "ascii"
-                    texdata = xenc.decode(b'<?xml encoding="ascii"?>' + self.__files[filename])
+                    texdata = xenc.decode(b'<?xml encoding="ascii"?>' + self.__read_raw(filename))
 
                     if texdata is None:
                         continue
@@ -254,13 +311,13 @@ class IFS:
                 geodir = os.path.join(os.path.dirname(afpdir), "geo")
 
                 benc = BinaryEncoding()
-                afpdata = benc.decode(self.__files[filename])
+                afpdata = benc.decode(self.__read_raw(filename))
 
                 if afpdata is None:
                     # Now, try as XML
                     xenc = XmlEncoding()
                     encoding = "ascii"
-                    afpdata = xenc.decode(b'<?xml encoding="ascii"?>' + self.__files[filename])
+                    afpdata = xenc.decode(b'<?xml encoding="ascii"?>' + self.__read_raw(filename))
 
                     if afpdata is None:
                         continue
@@ -312,16 +369,36 @@ class IFS:
     def filenames(self) -> List[str]:
         return [f for f in self.__files]
 
+    def __read_raw(self, filename: str) -> bytes:
+        entry = self.__files[filename]
+        if isinstance(entry[0], IFS):
+            return entry[0].read_file(entry[1])
+        start, size = entry
+        return self.__data[start : (start + size)]
+
+    def read_files(self, filenames: Optional[List[str]] = None) -> Generator[Tuple[str, bytes], None, None]:
+        """
+        Read files one at a time, so that only one file needs to be in memory at once.
+
+        Parameters:
+            filenames - The files to read, in order. Defaults to every file in the archive.
+
+        Returns:
+            A generator yielding the filename and data for each file.
+        """
+        for filename in filenames if filenames is not None else self.filenames:
+            yield filename, self.read_file(filename)
+
     def read_file(self, filename: str) -> bytes:
         # First, figure out if this file is stored compressed or not. If it is, decompress
         # it so that we have the raw data available to us.
         decompress = self.__compressed.get(filename, False)
-        filedata = self.__files[filename]
+        filedata = self.__read_raw(filename)
         if decompress:
             uncompressed_size, compressed_size = struct.unpack(">II", filedata[0:8])
             if len(filedata) == compressed_size + 8:
                 lz77 = Lz77()
-                filedata = lz77.decompress(filedata[8:])
+                filedata = lz77.decompress(filedata[8:], size=uncompressed_size)
             else:
                 filedata = filedata[8:] + filedata[0:8]
 
@@ -424,6 +424,14 @@ class TDXT:
                 )
                 for pixel in imgdata.getdata()  # type: ignore
             )
+        elif self.fmt == 0x16:
+            # DXT1 format, see _rawToImg for why we might need to swap bytes.
+            dxt = DXTBuffer(width, height)
+            raw = dxt.DXT1Compress(imgdata.convert("RGBA").tobytes(), swap=self.endian != "<")
+        elif self.fmt == 0x1A:
+            # DXT5 format, see _rawToImg for why we might need to swap bytes.
+            dxt = DXTBuffer(width, height)
+            raw = dxt.DXT5Compress(imgdata.convert("RGBA").tobytes(), swap=self.endian != "<")
         else:
             raise Exception(f"Unsupported format {hex(self.fmt)} for TDXT file!")
 
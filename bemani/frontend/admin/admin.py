@@ -615,6 +615,8 @@ def queryserver(serverid: int) -> Dict[str, Any]:
             "status": "error",
         }
 
+    # Let the admin know if we've stopped talking to this server because it keeps failing.
+    info["health"] = client.get_health()
     return info
 
 
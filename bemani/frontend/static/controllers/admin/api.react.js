@@ -362,6 +362,23 @@ var api_management = createReactClass({
         return a.token.localeCompare(b.token);
     },
 
+    renderServerHealth: function(server) {
+        var health = this.state.info[server.id].health;
+        if (!health || health.state == 'closed') {
+            return null;
+        }
+
+        return (
+            <div className='placeholder'>
+                { health.state == 'open' ?
+                    'Requests to this server are paused after ' + health.failures + ' failures in a row since' :
+                    'Checking whether this server has recovered since'
+                }
+                <Timestamp timestamp={health.since} />
+            </div>
+        );
+    },
+
     renderServerInfo: function(server) {
         if (!this.state.info[server.id]) {
             return <span className='placeholder'>No info!</span>;
@@ -381,7 +398,10 @@ var api_management = createReactClass({
         }
         if (this.state.info[server.id].status == 'error') {
             return (
-                <span>Error requesting server info!</span>
+                <>
+                    <span>Error requesting server info!</span>
+                    { this.renderServerHealth(server) }
+                </>
             );
         }
 
@@ -395,6 +415,7 @@ var api_management = createReactClass({
                 { this.state.info[server.id].status == 'badversion' ?
                     <span className='placeholder'>This server supports an incompatible version of the API!</span> : null
                 }
+                { this.renderServerHealth(server) }
             </>
         );
     },
@@ -5,6 +5,12 @@ from typing_extensions import Final
 from bemani.protocol.stream import InputStream, OutputStream
 from bemani.protocol.node import Node
 
+# Attempt to use the faster compiled codec if it's available
+try:
+    from bemani.protocol import binarycpp as binarycpp
+except ImportError:
+    binarycpp = None
+
 
 class BinaryEncodingException(Exception):
     """
@@ -218,8 +224,8 @@ class PackedOrdering:
             if alignment is None:
                 # Take care of string types
                 alignment = 4
-            if alignment > 4:
-                # Take care of 64 bit integers that are 32 bit aligned
+            if alignment > 2:
+                # Take care of 3-byte composites and 64 bit integers that are 32 bit aligned
                 alignment = 4
 
             ordering.append(
@@ -789,6 +795,30 @@ class BinaryEncoding:
         self.encoding: Optional[str] = None
         self.compressed: bool = True
 
+    @staticmethod
+    def is_binary(data: bytes) -> bool:
+        """
+        Given a data blob, cheaply determine whether it looks like a binary packet. This
+        only looks at the 4 byte header, so a packet that passes this check can still fail
+        to decode. XML packets can never pass this check since they must start with text.
+
+        Parameters:
+            data - Binary blob representing the data to check
+
+        Returns:
+            True if the header matches a binary packet, False otherwise.
+        """
+        if len(data) < 4 or data[0] != BinaryEncoding.MAGIC:
+            return False
+        if ((~data[2]) & 0xFF) != data[3]:
+            return False
+        return data[1] in {
+            BinaryEncoding.COMPRESSED_WITH_DATA,
+            BinaryEncoding.COMPRESSED_WITHOUT_DATA,
+            BinaryEncoding.DECOMPRESSED_WITH_DATA,
+            BinaryEncoding.DECOMPRESSED_WITHOUT_DATA,
+        }
+
     def __sanitize_encoding(self, enc: str) -> str:
         """
         Convert an internal encoding value from an externally acceptible value.
@@ -842,6 +872,12 @@ class BinaryEncoding:
         if encoding is not None:
             self.encoding = encoding
             try:
+                if binarycpp is not None:
+                    try:
+                        return binarycpp.decode(data[4:], self.__sanitize_encoding(encoding), self.compressed)
+                    except binarycpp.BinaryCodecException as e:
+                        raise BinaryEncodingException(str(e)) from e
+
                 decoder = BinaryDecoder(data[4:], self.__sanitize_encoding(encoding), self.compressed)
                 return decoder.get_tree()
             except BinaryEncodingException:
@@ -878,8 +914,14 @@ class BinaryEncoding:
         if encoding_magic is None:
             raise BinaryEncodingException(f"Invalid text encoding {encoding}")
 
-        encoder = BinaryEncoder(tree, self.__sanitize_encoding(encoding), compressed)
-        data = encoder.get_data()
+        if binarycpp is not None:
+            try:
+                data = binarycpp.encode(tree, self.__sanitize_encoding(encoding), compressed)
+            except binarycpp.BinaryCodecException as e:
+                raise BinaryEncodingException(str(e)) from e
+        else:
+            encoder = BinaryEncoder(tree, self.__sanitize_encoding(encoding), compressed)
+            data = encoder.get_data()
         return (
             struct.pack(
                 ">BBBB",
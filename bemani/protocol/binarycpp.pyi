@@ -0,0 +1,13 @@
+from .node import Node
+
+
+class BinaryCodecException(Exception):
+    ...
+
+
+def decode(data: bytes, encoding: str, compressed: bool) -> Node:
+    ...
+
+
+def encode(tree: Node, encoding: str, compressed: bool) -> bytes:
+    ...
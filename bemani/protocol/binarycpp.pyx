@@ -0,0 +1,864 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+from cpython.bytes cimport PyBytes_FromStringAndSize
+from cpython.unicode cimport PyUnicode_Decode
+from libc.math cimport isinf
+from libc.stdint cimport int8_t, int16_t, int32_t, int64_t, uint8_t, uint16_t, uint32_t, uint64_t
+from libc.string cimport memcpy
+from libcpp.vector cimport vector
+
+from .node import Node
+
+
+class BinaryCodecException(Exception):
+    """
+    An exception thrown when the compiled codec encounters an issue encoding or decoding
+    a binary stream. The wrapper in BinaryEncoding converts this to a BinaryEncodingException.
+    """
+
+
+cdef enum:
+    KIND_VOID = 0
+    KIND_NUMBER = 1
+    KIND_BOOL = 2
+    KIND_IP4 = 3
+    KIND_STR = 4
+    KIND_BIN = 5
+
+cdef enum:
+    ARRAY_BIT = 0x40
+    ATTR_TYPE = 0x2E
+    END_OF_NODE = 0xFE
+    END_OF_DOCUMENT = 0xFF
+    NAME_MAX_COMPRESSED = 0x24
+    NAME_MAX_DECOMPRESSED = 0x1000
+
+# Lookup tables for every node type, indexed by the type with the array bit masked off.
+# These are built from Node.NODE_TYPES when the module is loaded so that they can never
+# disagree with the pure python implementation.
+cdef bint type_valid[256]
+cdef int type_kind[256]
+cdef int type_count[256]
+cdef int type_size[256]
+cdef char type_elem[256]
+
+# Lookup tables for converting between node name characters and 6-bit packed values.
+cdef char name_chars[64]
+cdef int name_lut[256]
+
+
+cdef int element_size(char elem):
+    if elem == c'b' or elem == c'B':
+        return 1
+    if elem == c'h' or elem == c'H':
+        return 2
+    if elem == c'i' or elem == c'I' or elem == c'f':
+        return 4
+    if elem == c'q' or elem == c'Q' or elem == c'd':
+        return 8
+    return 0
+
+
+cdef void load_tables():
+    cdef int i
+
+    for i in range(256):
+        type_valid[i] = False
+        type_kind[i] = KIND_VOID
+        type_count[i] = 0
+        type_size[i] = 0
+        type_elem[i] = 0
+        name_lut[i] = -1
+
+    for nodetype, info in Node.NODE_TYPES.items():
+        enc = info["enc"].encode("ascii")
+        type_valid[nodetype] = True
+        if info["name"] == "void":
+            type_kind[nodetype] = KIND_VOID
+        elif info["name"] == "str":
+            type_kind[nodetype] = KIND_STR
+        elif info["name"] == "bin":
+            type_kind[nodetype] = KIND_BIN
+        elif info["name"] == "ip4":
+            type_kind[nodetype] = KIND_IP4
+            type_count[nodetype] = 1
+            type_size[nodetype] = 4
+        else:
+            type_kind[nodetype] = KIND_BOOL if info["name"] == "bool" else KIND_NUMBER
+            type_count[nodetype] = len(enc)
+            type_elem[nodetype] = enc[0]
+            type_size[nodetype] = element_size(enc[0]) * len(enc)
+
+    for i, ch in enumerate(Node.NODE_NAME_CHARS.encode("ascii")):
+        name_chars[i] = ch
+        name_lut[ch] = i
+
+
+load_tables()
+
+
+cdef inline uint16_t read_be16(const uint8_t *p):
+    return (<uint16_t>p[0] << 8) | <uint16_t>p[1]
+
+
+cdef inline uint32_t read_be32(const uint8_t *p):
+    return (<uint32_t>p[0] << 24) | (<uint32_t>p[1] << 16) | (<uint32_t>p[2] << 8) | <uint32_t>p[3]
+
+
+cdef inline uint64_t read_be64(const uint8_t *p):
+    return (<uint64_t>read_be32(p) << 32) | <uint64_t>read_be32(p + 4)
+
+
+cdef inline void write_be16(uint8_t *p, uint16_t val):
+    p[0] = (val >> 8) & 0xFF
+    p[1] = val & 0xFF
+
+
+cdef inline void write_be32(uint8_t *p, uint32_t val):
+    p[0] = (val >> 24) & 0xFF
+    p[1] = (val >> 16) & 0xFF
+    p[2] = (val >> 8) & 0xFF
+    p[3] = val & 0xFF
+
+
+cdef inline void write_be64(uint8_t *p, uint64_t val):
+    write_be32(p, <uint32_t>(val >> 32))
+    write_be32(p + 4, <uint32_t>(val & 0xFFFFFFFF))
+
+
+cdef object read_element(const uint8_t *p, char elem):
+    """
+    Unpack a single big-endian element, identical to what struct.unpack would give us.
+    """
+    cdef uint32_t u32
+    cdef uint64_t u64
+    cdef float f
+    cdef double d
+
+    if elem == c'b':
+        return <int8_t>p[0]
+    if elem == c'B':
+        return p[0]
+    if elem == c'h':
+        return <int16_t>read_be16(p)
+    if elem == c'H':
+        return read_be16(p)
+    if elem == c'i':
+        return <int32_t>read_be32(p)
+    if elem == c'I':
+        return read_be32(p)
+    if elem == c'q':
+        return <int64_t>read_be64(p)
+    if elem == c'Q':
+        return read_be64(p)
+    if elem == c'f':
+        u32 = read_be32(p)
+        memcpy(&f, &u32, 4)
+        return <double>f
+    if elem == c'd':
+        u64 = read_be64(p)
+        memcpy(&d, &u64, 8)
+        return d
+    raise Exception(f"Logic error, unknown element encoding {chr(elem)}!")
+
+
+cdef int write_element(uint8_t *p, char elem, object val) except -1:
+    """
+    Pack a single big-endian element, enforcing the same ranges that struct.pack would.
+    """
+    cdef int64_t s64
+    cdef uint64_t u64
+    cdef uint32_t u32
+    cdef float f
+    cdef double d
+
+    if elem == c'b' or elem == c'h' or elem == c'i' or elem == c'q':
+        s64 = val
+        if elem == c'b':
+            if s64 < -0x80 or s64 > 0x7F:
+                raise OverflowError("byte format requires -128 <= number <= 127")
+            p[0] = <uint8_t>s64
+        elif elem == c'h':
+            if s64 < -0x8000 or s64 > 0x7FFF:
+                raise OverflowError("short format requires -32768 <= number <= 32767")
+            write_be16(p, <uint16_t>s64)
+        elif elem == c'i':
+            if s64 < -0x80000000 or s64 > 0x7FFFFFFF:
+                raise OverflowError("int format requires -2147483648 <= number <= 2147483647")
+            write_be32(p, <uint32_t>s64)
+        else:
+            write_be64(p, <uint64_t>s64)
+        return 0
+    if elem == c'B' or elem == c'H' or elem == c'I' or elem == c'Q':
+        u64 = val
+        if elem == c'B':
+            if u64 > 0xFF:
+                raise OverflowError("ubyte format requires 0 <= number <= 255")
+            p[0] = <uint8_t>u64
+        elif elem == c'H':
+            if u64 > 0xFFFF:
+                raise OverflowError("ushort format requires 0 <= number <= 65535")
+            write_be16(p, <uint16_t>u64)
+        elif elem == c'I':
+            if u64 > 0xFFFFFFFF:
+                raise OverflowError("uint format requires 0 <= number <= 4294967295")
+            write_be32(p, <uint32_t>u64)
+        else:
+            write_be64(p, u64)
+        return 0
+    if elem == c'f':
+        d = val
+        f = <float>d
+        if isinf(f) and not isinf(d):
+            raise OverflowError("float too large to pack with f format")
+        memcpy(&u32, &f, 4)
+        write_be32(p, u32)
+        return 0
+    if elem == c'd':
+        d = val
+        memcpy(&u64, &d, 8)
+        write_be64(p, u64)
+        return 0
+    raise Exception(f"Logic error, unknown element encoding {chr(elem)}!")
+
+
+cdef int write_ip4(uint8_t *p, object val) except -1:
+    cdef bytes raw = val
+    cdef Py_ssize_t length = min(len(raw), 4)
+    cdef const uint8_t *src = raw
+
+    p[0] = p[1] = p[2] = p[3] = 0
+    memcpy(p, src, length)
+    return 0
+
+
+cdef class PackedOrdering:
+    """
+    A direct port of PackedOrdering from binary.py to typed C loops. Holes are tracked
+    as a vector of rounded sizes, with zero standing in for an unused location.
+    """
+
+    cdef vector[uint32_t] order
+    cdef bint expand
+    cdef Py_ssize_t lastbyte
+    cdef Py_ssize_t lastshort
+    cdef Py_ssize_t lastint
+
+    def __cinit__(self, Py_ssize_t size, bint allow_expansion = False):
+        self.order.assign(size, 0)
+        self.expand = allow_expansion
+        self.lastbyte = 0
+        self.lastshort = 0
+        self.lastint = 0
+
+    cdef inline void pad(self):
+        while (self.order.size() & 3) != 0:
+            self.order.push_back(0)
+
+    cdef inline uint32_t at(self, Py_ssize_t loc):
+        # Treat locations off the end of a fixed-size ordering as occupied, so that
+        # truncated data can never hand back a location outside the buffer.
+        if loc >= <Py_ssize_t>self.order.size():
+            return 0xFFFFFFFF
+        return self.order[loc]
+
+    cdef int mark_used(self, Py_ssize_t size, Py_ssize_t offset, int round_to) except -1:
+        cdef Py_ssize_t i
+
+        while (size & (round_to - 1)) != 0:
+            size += 1
+
+        if <Py_ssize_t>self.order.size() < size + offset:
+            if not self.expand:
+                raise BinaryCodecException("Ran out of data when attempting to read node data!")
+            while <Py_ssize_t>self.order.size() < size + offset:
+                self.order.push_back(0)
+
+        for i in range(size):
+            self.order[offset + i] = <uint32_t>size
+        return 0
+
+    cdef Py_ssize_t get_next_byte(self):
+        cdef Py_ssize_t i, j
+        cdef Py_ssize_t length
+
+        if self.expand:
+            self.pad()
+        length = self.order.size()
+
+        for i in range(self.lastbyte, length, 4):
+            if self.order[i] != 0:
+                for j in range(4):
+                    if self.at(i + j) == 1:
+                        continue
+                    elif self.at(i + j) == 0:
+                        self.lastbyte = i
+                        return i + j
+                    else:
+                        break
+            else:
+                self.lastbyte = i
+                return i
+
+        if self.expand:
+            self.lastbyte = length
+            return length
+        return -1
+
+    cdef Py_ssize_t get_next_short(self):
+        cdef Py_ssize_t i, j
+        cdef Py_ssize_t length
+
+        if self.expand:
+            self.pad()
+        length = self.order.size()
+
+        for i in range(self.lastshort, length, 4):
+            if self.order[i] != 0:
+                for j in range(0, 4, 2):
+                    if self.at(i + j) == 2 and self.at(i + j + 1) == 2:
+                        continue
+                    elif self.at(i + j) == 0 and self.at(i + j + 1) == 0:
+                        self.lastshort = i
+                        return i + j
+                    else:
+                        break
+            else:
+                self.lastshort = i
+                return i
+
+        if self.expand:
+            self.lastshort = length
+            return length
+        return -1
+
+    cdef Py_ssize_t get_next_int(self):
+        cdef Py_ssize_t i
+        cdef Py_ssize_t length
+
+        if self.expand:
+            self.pad()
+        length = self.order.size()
+
+        for i in range(self.lastint, length, 4):
+            if self.at(i) != 0 or self.at(i + 1) != 0 or self.at(i + 2) != 0 or self.at(i + 3) != 0:
+                continue
+            self.lastint = i
+            return i
+
+        if self.expand:
+            self.lastint = length
+            return length
+        return -1
+
+    cdef Py_ssize_t get_next(self, int alignment):
+        if alignment == 1:
+            return self.get_next_byte()
+        if alignment == 2:
+            return self.get_next_short()
+        return self.get_next_int()
+
+
+cdef inline int value_alignment(int nodetype):
+    cdef int kind = type_kind[nodetype]
+
+    if kind == KIND_STR or kind == KIND_BIN:
+        return 4
+    return min(type_size[nodetype], 4)
+
+
+cdef class BinaryDecoder:
+    """
+    Compiled equivalent of BinaryDecoder in binary.py. Reads straight out of the underlying
+    buffer instead of going through an InputStream and builds Node objects as it goes.
+    """
+
+    cdef object data
+    cdef const uint8_t *ptr
+    cdef Py_ssize_t length
+    cdef Py_ssize_t pos
+    cdef bytes encoding
+    cdef bint compressed
+    cdef list nodes
+    cdef vector[int] types
+
+    def __cinit__(self, data, str encoding, bint compressed):
+        cdef const uint8_t[::1] view = memoryview(data).cast("B")
+
+        self.data = view
+        self.length = view.shape[0]
+        self.ptr = &view[0] if self.length > 0 else NULL
+        self.pos = 0
+        self.encoding = encoding.encode("ascii")
+        self.compressed = compressed
+        self.nodes = []
+
+    cdef int read_byte(self):
+        if self.pos >= self.length:
+            return -1
+        self.pos += 1
+        return self.ptr[self.pos - 1]
+
+    cdef str read_node_name(self):
+        cdef int length = self.read_byte()
+        cdef int length_ex
+        cdef Py_ssize_t binary_length
+        cdef Py_ssize_t i
+        cdef uint32_t bits = 0
+        cdef int bitcount = 0
+        cdef char chars[NAME_MAX_COMPRESSED + 2]
+        cdef Py_ssize_t charcount = 0
+
+        if length < 0:
+            raise BinaryCodecException("Ran out of data when attempting to read node name length!")
+
+        if not self.compressed:
+            if length < 0x40:
+                raise BinaryCodecException("Node name length under decompressed minimum")
+            elif length < 0x80:
+                length -= 0x3F
+            else:
+                length_ex = self.read_byte()
+                if length_ex < 0:
+                    raise BinaryCodecException("Ran out of data when attempting to read node name length!")
+                length = ((length << 8) | length_ex) - 0x7FBF
+
+            if length > NAME_MAX_DECOMPRESSED:
+                raise BinaryCodecException("Node name length over decompressed limit")
+            if self.pos + length > self.length:
+                raise BinaryCodecException("Ran out of data when attempting to read node name!")
+
+            self.pos += length
+            return PyUnicode_Decode(<const char *>(self.ptr + self.pos - length), length, self.encoding, NULL)
+
+        if length > NAME_MAX_COMPRESSED:
+            raise BinaryCodecException("Node name length over compressed limit")
+
+        binary_length = ((length * 6) + 7) // 8
+        if self.pos + binary_length > self.length:
+            raise BinaryCodecException("Ran out of data when attempting to read node name!")
+
+        for i in range(binary_length):
+            bits = ((bits << 8) | self.ptr[self.pos + i]) & 0xFFFF
+            bitcount += 8
+            while bitcount >= 6 and charcount < length:
+                bitcount -= 6
+                chars[charcount] = name_chars[(bits >> bitcount) & 0x3F]
+                charcount += 1
+        self.pos += binary_length
+
+        return chars[:charcount].decode("ascii")
+
+    cdef object read_node(self, int node_type):
+        cdef int child_type
+
+        name = self.read_node_name()
+        node = Node(name=name, type=node_type)
+        self.nodes.append(node)
+        self.types.push_back(node_type)
+
+        while True:
+            child_type = self.read_byte()
+            if child_type < 0:
+                raise BinaryCodecException("Ran out of data when attempting to read node type!")
+
+            if child_type == END_OF_NODE:
+                return node
+            elif child_type == ATTR_TYPE:
+                node.set_attribute(self.read_node_name())
+            else:
+                node.add_child(self.read_node(child_type))
+
+    cdef str read_string(self, const uint8_t *body, Py_ssize_t loc, Py_ssize_t size):
+        # Lob off the trailing null, exactly like the python version does.
+        if size > 0:
+            size -= 1
+        return PyUnicode_Decode(<const char *>(body + loc), size, self.encoding, "replace")
+
+    cdef int read_body(self, const uint8_t *body, Py_ssize_t body_length) except -1:
+        cdef PackedOrdering ordering = PackedOrdering(body_length)
+        cdef Py_ssize_t idx
+        cdef Py_ssize_t loc
+        cdef Py_ssize_t size
+        cdef Py_ssize_t elems
+        cdef Py_ssize_t i
+        cdef int nodetype
+        cdef int kind
+        cdef int count
+        cdef int elemsize
+        cdef char elem
+
+        for idx in range(len(self.nodes)):
+            node = self.nodes[idx]
+            nodetype = self.types[idx] & (~ARRAY_BIT) & 0xFF
+            kind = type_kind[nodetype]
+
+            if kind != KIND_VOID and (self.types[idx] & ARRAY_BIT) == 0:
+                # Scalar value
+                loc = ordering.get_next(value_alignment(nodetype))
+                if loc < 0:
+                    raise BinaryCodecException("Ran out of data when attempting to read node data location!")
+
+                if kind == KIND_STR or kind == KIND_BIN:
+                    # The size should be read from the first 4 bytes
+                    if loc + 4 > body_length:
+                        raise BinaryCodecException("Ran out of data when attempting to read node data length!")
+                    size = read_be32(body + loc)
+                    ordering.mark_used(size + 4, loc, 4)
+                    if kind == KIND_STR:
+                        node.set_value(self.read_string(body, loc + 4, size))
+                    else:
+                        node.set_value(PyBytes_FromStringAndSize(<const char *>(body + loc + 4), size))
+                else:
+                    # The size is built-in
+                    size = type_size[nodetype]
+                    ordering.mark_used(size, loc, 1)
+
+                    if kind == KIND_IP4:
+                        node.set_value(PyBytes_FromStringAndSize(<const char *>(body + loc), 4))
+                    elif type_count[nodetype] > 1:
+                        count = type_count[nodetype]
+                        elem = type_elem[nodetype]
+                        elemsize = size // count
+                        node.set_value([read_element(body + loc + (i * elemsize), elem) for i in range(count)])
+                    else:
+                        node.set_value(read_element(body + loc, type_elem[nodetype]))
+            elif kind != KIND_VOID:
+                # Array value
+                if kind == KIND_STR or kind == KIND_BIN or type_count[nodetype] > 1:
+                    raise Exception("Logic error, no support for composite or variable length arrays!")
+
+                loc = ordering.get_next_int()
+                if loc < 0:
+                    raise BinaryCodecException("Ran out of data when attempting to read array length location!")
+                if loc + 4 > body_length:
+                    raise BinaryCodecException("Ran out of data when attempting to read array length!")
+
+                # The raw size in bytes
+                size = read_be32(body + loc)
+                elemsize = type_size[nodetype]
+                if (size % elemsize) != 0:
+                    raise BinaryCodecException("Array length is not a multiple of the element size!")
+                elems = size // elemsize
+
+                ordering.mark_used(size + 4, loc, 4)
+                loc = loc + 4
+
+                if kind == KIND_IP4:
+                    node.set_value(
+                        [PyBytes_FromStringAndSize(<const char *>(body + loc + (i * 4)), 4) for i in range(elems)]
+                    )
+                else:
+                    elem = type_elem[nodetype]
+                    node.set_value([read_element(body + loc + (i * elemsize), elem) for i in range(elems)])
+
+            # Attributes come after the node value, sorted by name
+            attributes = node.attributes
+            if attributes:
+                for name in sorted(attributes.keys()):
+                    loc = ordering.get_next_int()
+                    if loc < 0:
+                        raise BinaryCodecException("Ran out of data when attempting to read node data location!")
+                    if loc + 4 > body_length:
+                        raise BinaryCodecException("Ran out of data when attempting to read node data length!")
+                    size = read_be32(body + loc)
+                    ordering.mark_used(size + 4, loc, 4)
+                    node.set_attribute(name, self.read_string(body, loc + 4, size))
+
+        return 0
+
+    def get_tree(self) -> Node:
+        cdef Py_ssize_t header_length
+        cdef Py_ssize_t body_length
+        cdef int node_type
+        cdef int eod
+
+        # Read the header first
+        if self.length < 4:
+            raise BinaryCodecException("Ran out of data when attempting to read header length!")
+        header_length = read_be32(self.ptr)
+        self.pos = 4
+
+        node_type = self.read_byte()
+        if node_type < 0:
+            raise BinaryCodecException("Ran out of data when attempting to read root node type!")
+        root = self.read_node(node_type)
+
+        eod = self.read_byte()
+        if eod != END_OF_DOCUMENT:
+            raise BinaryCodecException(f"Unknown node type {eod if eod >= 0 else None} at end of document")
+
+        # Skip by any padding
+        if self.pos < header_length + 4:
+            if header_length + 4 > self.length:
+                raise BinaryCodecException("Header has insufficient data")
+            self.pos = header_length + 4
+
+        # Read the body next
+        if self.pos + 4 > self.length:
+            return root
+        body_length = read_be32(self.ptr + self.pos)
+        self.pos += 4
+
+        if body_length > 0:
+            if self.pos + body_length > self.length:
+                raise BinaryCodecException("Body has insufficient data")
+            self.read_body(self.ptr + self.pos, body_length)
+
+        return root
+
+
+cdef class BinaryEncoder:
+    """
+    Compiled equivalent of BinaryEncoder in binary.py. Writes the header and body into
+    growable native buffers and only builds a bytes object once at the end.
+    """
+
+    cdef object tree
+    cdef str encoding
+    cdef bint compressed
+    cdef vector[uint8_t] header
+    cdef vector[uint8_t] body
+    cdef list nodes
+    cdef list attributes
+    cdef vector[int] types
+
+    def __cinit__(self, tree: Node, str encoding, bint compressed = True):
+        self.tree = tree
+        self.encoding = encoding
+        self.compressed = compressed
+        self.nodes = []
+        self.attributes = []
+
+    cdef int write_node_name(self, str name) except -1:
+        cdef bytes encoded
+        cdef Py_ssize_t length
+        cdef Py_ssize_t i
+        cdef Py_UCS4 ch
+        cdef uint32_t bits = 0
+        cdef int bitcount = 0
+        cdef int index
+
+        if not self.compressed:
+            encoded = name.encode(self.encoding)
+            length = len(encoded)
+
+            if length > NAME_MAX_DECOMPRESSED:
+                raise BinaryCodecException("Node name length over decompressed limit")
+
+            if length < 64:
+                self.header.push_back(<uint8_t>(length + 0x3F))
+            else:
+                length += 0x7FBF
+                self.header.push_back((length >> 8) & 0xFF)
+                self.header.push_back(length & 0xFF)
+                length -= 0x7FBF
+            for i in range(length):
+                self.header.push_back(encoded[i])
+            return 0
+
+        length = len(name)
+        if length > 0xFF:
+            raise BinaryCodecException("Node name length over compressed limit")
+        self.header.push_back(<uint8_t>length)
+
+        # Convert to six bit bytes, padding the last byte out with zeros
+        for ch in name:
+            index = name_lut[ch] if ch < 256 else -1
+            if index < 0:
+                raise BinaryCodecException(f"Invalid character {ch} in node name {name}")
+            bits = ((bits << 6) | <uint32_t>index) & 0xFFFF
+            bitcount += 6
+            if bitcount >= 8:
+                bitcount -= 8
+                self.header.push_back((bits >> bitcount) & 0xFF)
+        if bitcount > 0:
+            self.header.push_back((bits << (8 - bitcount)) & 0xFF)
+        return 0
+
+    cdef int write_node(self, object node) except -1:
+        cdef int node_type = node.type
+
+        self.header.push_back(<uint8_t>node_type)
+        self.write_node_name(node.name)
+
+        names = sorted(node.attributes.keys())
+        for name in names:
+            self.header.push_back(ATTR_TYPE)
+            self.write_node_name(name)
+
+        self.nodes.append(node)
+        self.attributes.append(names)
+        self.types.push_back(node_type)
+
+        for child in node.children:
+            self.write_node(child)
+
+        self.header.push_back(END_OF_NODE)
+        return 0
+
+    cdef uint8_t *add_data(self, Py_ssize_t length, Py_ssize_t offset):
+        """
+        Grow the body to fit length bytes at offset, keeping it padded to a 4 byte boundary,
+        and return a pointer to where the data should be written.
+        """
+        while <Py_ssize_t>self.body.size() < (length + offset):
+            self.body.push_back(0)
+        while (self.body.size() & 0x3) != 0:
+            self.body.push_back(0)
+        return self.body.data() + offset
+
+    cdef int write_blob(self, PackedOrdering ordering, Py_ssize_t loc, bytes data) except -1:
+        cdef Py_ssize_t size = len(data)
+        cdef const uint8_t *src = data
+        cdef uint8_t *dst = self.add_data(size + 4, loc)
+
+        write_be32(dst, <uint32_t>size)
+        memcpy(dst + 4, src, size)
+        ordering.mark_used(size + 4, loc, 4)
+        return 0
+
+    cdef int write_string(self, PackedOrdering ordering, Py_ssize_t loc, str name, object val) except -1:
+        if not isinstance(val, str):
+            raise BinaryCodecException(f"Node '{name}' has non-string value!")
+        try:
+            valbytes = (<str>val).encode(self.encoding) + b"\0"
+        except UnicodeEncodeError:
+            raise BinaryCodecException(f"Node '{name}' has un-encodable string value '{val}'")
+        return self.write_blob(ordering, loc, valbytes)
+
+    cdef int write_body(self) except -1:
+        cdef PackedOrdering ordering = PackedOrdering(0, True)
+        cdef Py_ssize_t idx
+        cdef Py_ssize_t loc
+        cdef Py_ssize_t size
+        cdef Py_ssize_t elems
+        cdef Py_ssize_t i
+        cdef int nodetype
+        cdef int kind
+        cdef int count
+        cdef int elemsize
+        cdef char elem
+        cdef uint8_t *dst
+
+        for idx in range(len(self.nodes)):
+            node = self.nodes[idx]
+            nodetype = self.types[idx] & (~ARRAY_BIT) & 0xFF
+            kind = type_kind[nodetype]
+
+            if kind != KIND_VOID:
+                val = node.value
+                if val is None:
+                    raise BinaryCodecException(f"Node '{node.name}' has invalid value None")
+
+                if (self.types[idx] & ARRAY_BIT) == 0:
+                    # Scalar value
+                    loc = ordering.get_next(value_alignment(nodetype))
+
+                    if kind == KIND_STR:
+                        self.write_string(ordering, loc, node.name, val)
+                    elif kind == KIND_BIN:
+                        self.write_blob(ordering, loc, bytes(val))
+                    else:
+                        size = type_size[nodetype]
+                        dst = self.add_data(size, loc)
+
+                        if kind == KIND_IP4:
+                            write_ip4(dst, val)
+                        elif kind == KIND_BOOL:
+                            write_element(dst, type_elem[nodetype], 1 if val else 0)
+                        elif type_count[nodetype] > 1:
+                            # Array, but not, somewhat silly
+                            count = type_count[nodetype]
+                            if len(val) != count:
+                                raise BinaryCodecException(
+                                    f"Node '{node.name}' expected {count} elements for composite value!"
+                                )
+                            elem = type_elem[nodetype]
+                            elemsize = size // count
+                            for i in range(count):
+                                write_element(dst + (i * elemsize), elem, val[i])
+                        else:
+                            write_element(dst, type_elem[nodetype], val)
+                        ordering.mark_used(size, loc, 1)
+                else:
+                    # Array value
+                    if kind == KIND_STR or kind == KIND_BIN:
+                        raise Exception("Logic error, no support for variable length arrays!")
+                    loc = ordering.get_next_int()
+
+                    # The raw size in bytes
+                    elemsize = type_size[nodetype]
+                    elems = len(val)
+                    size = elems * elemsize
+
+                    dst = self.add_data(size + 4, loc)
+                    write_be32(dst, <uint32_t>size)
+                    dst += 4
+
+                    elem = type_elem[nodetype]
+                    for i in range(elems):
+                        if kind == KIND_IP4:
+                            write_ip4(dst + (i * elemsize), val[i])
+                        elif kind == KIND_BOOL:
+                            write_element(dst + (i * elemsize), elem, 1 if val[i] else 0)
+                        else:
+                            write_element(dst + (i * elemsize), elem, val[i])
+                    ordering.mark_used(size + 4, loc, 4)
+
+            for name in self.attributes[idx]:
+                loc = ordering.get_next_int()
+                self.write_string(ordering, loc, name, node.attribute(name))
+
+        return 0
+
+    def get_data(self) -> bytes:
+        cdef uint8_t lengthbytes[4]
+
+        # Generate the header first
+        self.write_node(self.tree)
+        self.header.push_back(END_OF_DOCUMENT)
+        while (self.header.size() & 0x3) != 0:
+            self.header.push_back(0)
+
+        # Generate the body
+        self.write_body()
+
+        out = bytearray()
+        write_be32(lengthbytes, <uint32_t>self.header.size())
+        out += lengthbytes[:4]
+        out += self.header.data()[:self.header.size()]
+        write_be32(lengthbytes, <uint32_t>self.body.size())
+        out += lengthbytes[:4]
+        if self.body.size() > 0:
+            out += self.body.data()[:self.body.size()]
+        return bytes(out)
+
+
+def decode(data: bytes, encoding: str, compressed: bool) -> Node:
+    """
+    Given a binary blob with the 4 byte magic already stripped, decode it to a Node tree.
+
+    Parameters:
+        data - A binary blob of data to be decoded
+        encoding - A string representing the text encoding for string elements
+        compressed - Whether node names are 6-bit packed or stored as text
+
+    Returns:
+        Node object representing the root of the decoded tree.
+    """
+    return BinaryDecoder(data, encoding, compressed).get_tree()
+
+
+def encode(tree: Node, encoding: str, compressed: bool) -> bytes:
+    """
+    Given a Node tree, encode it to a binary blob without the 4 byte magic.
+
+    Parameters:
+        tree - Node tree representing the data to encode
+        encoding - A string representing the text encoding for string elements
+        compressed - Whether node names should be 6-bit packed or stored as text
+
+    Returns:
+        Binary blob representing encoded data.
+    """
+    return BinaryEncoder(tree, encoding, compressed).get_data()
@@ -1,12 +1,10 @@
 import ctypes
 import os
-from collections import defaultdict
-from typing import Generator, List, MutableMapping, Optional, Set, Tuple
+from typing import Dict, Generator, List, Optional, Tuple, Union
 from typing_extensions import Final
 
 from .. import package_root
 
-
 # Attempt to use the faster C++ libraries if they're available
 try:
     clib = None
@@ -21,11 +19,21 @@ try:
             ctypes.c_int,
         )
         clib.decompress.restype = ctypes.c_int
+        clib.decompress_into.argtypes = (
+            ctypes.c_char_p,
+            ctypes.c_uint,
+            ctypes.POINTER(ctypes.c_uint),
+            ctypes.c_char_p,
+            ctypes.c_uint,
+            ctypes.POINTER(ctypes.c_uint),
+        )
+        clib.decompress_into.restype = ctypes.c_int
         clib.compress.argtypes = (
             ctypes.c_char_p,
             ctypes.c_int,
             ctypes.c_char_p,
             ctypes.c_int,
+            ctypes.c_int,
         )
         clib.compress.restype = ctypes.c_int
 except Exception:
@@ -44,10 +52,18 @@ class Lz77Decompress:
     variant to the Lz77 found in firebeat executables and BIOS. This is used for
     over-the-wire compression of XML data, as well as compression inside a decent
     amount of file formats found in various Konami games.
+
+    Rather than keeping a separate backref ring, this decompresses straight into an
+    output buffer and resolves backrefs against what it already wrote there, so runs
+    of copies and non-overlapping backrefs are done with a single slice copy each.
+    Decompression can be stopped and resumed at any flag byte, which is what allows
+    both decompress_into() and decompress_bytes() to hand out data as they go.
     """
 
     RING_LENGTH: Final[int] = 0x1000
 
+    CHUNK_LENGTH: Final[int] = 0x10000
+
     FLAG_COPY: Final[int] = 1
     FLAG_BACKREF: Final[int] = 0
 
@@ -61,167 +77,157 @@ class Lz77Decompress:
         self.eof: bool = False
         self.data: bytes = data
         self.read_pos: int = 0
-        self.left: int = len(self.data)
         self.flags: int = 1
-        self.write_pos: int = 0
-        self.pending_copy_amount: int = 0
-        self.pending_copy_pos: int = 0
-        self.pending_copy_max: int = 0
         self.ringlength: int = backref or self.RING_LENGTH
-        self.ring: bytes = b"\x00" * self.ringlength
 
-    def _ring_read(self, copy_pos: int, copy_len: int) -> Generator[bytes, None, None]:
+    def _decompress(
+        self,
+        out: Union[bytearray, memoryview],
+        start: int,
+        write_pos: int,
+        stop: Optional[int] = None,
+    ) -> int:
         """
-        Read the next bytes from the backref ring at the current copy position.
+        Decompress into an output buffer, resolving backrefs against the data already
+        written to it. Backrefs that reach back before the start of the stream are
+        treated as if they were preceded by zeros. If the output is a bytearray it
+        grows when we write past its end, otherwise we raise if we run out of room.
+
+        Parameters:
+            out - The buffer to write into.
+            start - The offset in the buffer of the first byte of the stream. This
+                    can be negative if earlier output was dropped from the buffer.
+            write_pos - The offset in the buffer to write the next byte to.
+            stop - If given, stop at the next flag byte once write_pos reaches this.
 
         Returns:
-            a generator which yields bytes.
+            The offset in the buffer after the last byte written.
         """
-        while copy_len > 0:
-            if copy_pos + copy_len > self.ringlength:
-                # Copy first chunk, let subsequent loop handle the next chunks
-                amount = self.ringlength - copy_pos
-            else:
-                # Copy the whole thing out, we have enough space to do so
-                amount = copy_len
+        data = self.data
+        length = len(data)
+        read_pos = self.read_pos
+        flags = self.flags
+        limit = None if isinstance(out, bytearray) else len(out)
 
-            ret = self.ring[copy_pos : (copy_pos + amount)]
-            self._ring_write(ret)
-            yield ret
+        while not self.eof:
+            if flags == 1:
+                if stop is not None and write_pos >= stop:
+                    break
+                if read_pos >= length:
+                    # We have nothing left to read.
+                    self.eof = True
+                    break
+
+                # Load the next byte for processing
+                flags = 0x100 | data[read_pos]
+                read_pos += 1
+
+            if (flags & 1) == self.FLAG_COPY:
+                # Figure out how much to pull at once
+                flags >>= 1
+                amount = 1
+                while flags != 1 and (flags & 1) == self.FLAG_COPY:
+                    flags >>= 1
+                    amount += 1
+
+                if read_pos + amount > length:
+                    raise LzException("Unexpected EOF during decompression!")
+                if limit is not None and write_pos + amount > limit:
+                    raise LzException("Not enough room in output buffer!")
+
+                # Grab chunk right out of the data source
+                out[write_pos : (write_pos + amount)] = data[read_pos : (read_pos + amount)]
+                read_pos += amount
+                write_pos += amount
+            else:
+                flags >>= 1
+                if read_pos >= length:
+                    self.eof = True
+                    break
+                if read_pos + 1 >= length:
+                    raise LzException("Unexpected EOF mid-backref")
+
+                hi = data[read_pos]
+                lo = data[read_pos + 1]
+                read_pos += 2
+
+                copy_len = (lo & 0xF) + 3
+                copy_pos = (hi << 4) | (lo >> 4)
+                if copy_pos == 0:
+                    # This is the end of the stream.
+                    self.eof = True
+                    break
+
+                if limit is not None and write_pos + copy_len > limit:
+                    raise LzException("Not enough room in output buffer!")
+
+                copy_start = write_pos - copy_pos
+                if copy_start < start:
+                    # Reaching back before the stream started, which reads as zeros.
+                    for _ in range(copy_len):
+                        out[write_pos : (write_pos + 1)] = (
+                            b"\0" if copy_start < start else out[copy_start : (copy_start + 1)]
+                        )
+                        write_pos += 1
+                        copy_start += 1
+                elif copy_len <= copy_pos:
+                    out[write_pos : (write_pos + copy_len)] = out[copy_start : (copy_start + copy_len)]
+                    write_pos += copy_len
+                else:
+                    # The backref overlaps what it is writing, which repeats the
+                    # referenced bytes until we've copied enough.
+                    chunk = bytes(out[copy_start:write_pos]) * ((copy_len + copy_pos - 1) // copy_pos)
+                    out[write_pos : (write_pos + copy_len)] = chunk[:copy_len]
+                    write_pos += copy_len
 
-            copy_pos = (copy_pos + amount) % self.ringlength
-            copy_len -= amount
+        self.read_pos = read_pos
+        self.flags = flags
+        return write_pos
 
-    def _ring_write(self, bytedata: bytes) -> None:
+    def decompress_into(self, out: Union[bytearray, memoryview], offset: Optional[int] = None) -> int:
         """
-        Write bytes into the backref ring.
+        Decompress the rest of the stream into a buffer. A bytearray grows as needed
+        to hold the output and has anything after the output trimmed off afterwards.
+        Any other writable buffer, such as a memoryview over a preallocated buffer,
+        must be large enough to hold the output.
 
         Parameters:
-            byte - A byte to be written at the current write offset
-        """
-        while True:
-            amount = len(bytedata)
-            if amount == 0:
-                return
-            if amount > (self.ringlength - self.write_pos):
-                amount = self.ringlength - self.write_pos
+            out - The buffer to write into.
+            offset - Where in the buffer to start writing. Defaults to the end of a
+                     bytearray, or the start of any other buffer.
 
-            self.ring = self.ring[: self.write_pos] + bytedata[:amount] + self.ring[(self.write_pos + amount) :]
-            bytedata = bytedata[amount:]
-            self.write_pos = (self.write_pos + amount) % self.ringlength
+        Returns:
+            The number of bytes written.
+        """
+        if offset is None:
+            offset = len(out) if isinstance(out, bytearray) else 0
+        end = self._decompress(out, offset, offset)
+        if isinstance(out, bytearray):
+            del out[end:]
+        return end - offset
 
     def decompress_bytes(self) -> Generator[bytes, None, None]:
         """
-        Yield the next byte from the decompressed output. If we are
-        in a backref copy, read the next byte from the backref. If
-        we aren't, read the next flag to see if we should decode
-        a byte directly or if we should start another backref read.
-        If we don't have any flags, exit reporting EOF (None). If
-        we hit the end of the stream, stop yielding to signify EOF.
-        In all cases, whatever byte we read should be added back to
-        the backref buffer.
+        Decompress the stream a chunk at a time, yielding each chunk as it is done.
+        Only as much output as a backref could reach is held onto between chunks,
+        so arbitrarily large streams can be decompressed in constant memory.
 
         Returns:
             a generator that yields bytes.
         """
+        window = bytearray()
+        start = 0
         while not self.eof:
-            if self.pending_copy_amount > 0:
-                # We had a backref that would have copied more data than we had available
-                # in the ringbuffer (because every read, even a backref, adds to the
-                # ringbuffer). So, since we read that last time and wrote it to the backbuffer
-                # we are safe to read again.
-                amount = min(self.pending_copy_amount, self.pending_copy_max)
-                yield from self._ring_read(self.pending_copy_pos, amount)
-
-                # We read this many bytes and are about to write them to the ringbuffer,
-                # so bookkeep that.
-                self.pending_copy_amount -= amount
-                self.pending_copy_max = amount
-            else:
-                if self.flags == 1:
-                    # Load the next byte for processing
-                    if self.left == 0:
-                        # We have nothing left to read, so skip the
-                        # ringbuffer write below and exit early.
-                        return
-                    else:
-                        self.flags = 0x100 | self.data[self.read_pos]
-                        self.read_pos += 1
-                        self.left -= 1
-
-                # Shift the lowest bit out to be retrieved as a flag
-                flag = self.flags & 1
-                self.flags >>= 1
-
-                if flag == self.FLAG_COPY:
-                    # Figure out how much to pull at once
-                    amount = 1
-                    while self.flags != 1 and (self.flags & 1) == self.FLAG_COPY:
-                        # We would do a copy next time, so pop that flag and just add to our read amount
-                        self.flags >>= 1
-                        amount += 1
-
-                    # Grab chunk right out of the data source
-                    b = self.data[self.read_pos : (self.read_pos + amount)]
-                    self._ring_write(b)
-                    yield b
-
-                    self.read_pos += amount
-                    self.left -= amount
-                elif flag == self.FLAG_BACKREF:
-                    yield from self._read_backref()
-                else:
-                    raise Exception("Logic error!")
-
-    def _read_backref(self) -> Generator[bytes, None, None]:
-        """
-        Read a backref chunk. Grab the copy length and copy position
-        from the first two bytes and then read the first byte from
-        the backref. Sets up variables such that Lz77Decompress.__read()
-        can finish copying out of the backref on subsequent calls. Should
-        only be called by Lz77Decompress.__read(). If we discover the end
-        of stream, we don't generate any bytes and instead set the eof
-        flag which terminates the main decompression loop above.
+            pos = len(window)
+            end = self._decompress(window, start, pos, pos + self.CHUNK_LENGTH)
+            if end > pos:
+                yield bytes(window[pos:end])
 
-        Returns:
-            a generator that yields bytes.
-        """
-        if self.left == 0:
-            self.eof = True
-            return
-        if self.left == 1:
-            raise LzException("Unexpected EOF mid-backref")
-
-        hi = self.data[self.read_pos]
-        lo = self.data[self.read_pos + 1]
-        self.read_pos += 2
-        self.left -= 2
-
-        copy_len = lo & 0xF
-        copy_pos = (hi << 4) | (lo >> 4)
-
-        if copy_pos > 0:
-            copy_len += 3
-            if copy_len > copy_pos:
-                # Remember what we have to do left, and the safe
-                # amount to copy next time (which is our length,
-                # since we are about to write that many butes to
-                # the ringbuffer right after reading them).
-                self.pending_copy_amount = copy_len - copy_pos
-                self.pending_copy_pos = self.write_pos
-                self.pending_copy_max = copy_pos
-
-                # Only copy the available bytes
-                copy_len = copy_pos
-
-            copy_pos = self.write_pos - copy_pos
-            while copy_pos < 0:
-                copy_pos += self.ringlength
-            copy_pos = copy_pos % self.ringlength
-            yield from self._ring_read(copy_pos, copy_len)
-        else:
-            self.eof = True
-            return
+            # Drop everything that can no longer be referenced by a backref.
+            drop = len(window) - self.ringlength
+            if drop > 0:
+                del window[:drop]
+                start -= drop
 
 
 class Lz77Compress:
@@ -233,200 +239,144 @@ class Lz77Compress:
     by using Cython to build, netting us another 40% speed-up. This is important
     because for any given packet we are decompressing and compressing at least
     once, and if we use a proxy to direct traffic, possibly a second time.
+
+    Backrefs are found using hash chains. Every position is added to the head of
+    a chain of earlier positions starting with the same three bytes, so finding
+    a backref is a matter of walking that chain from the nearest position back
+    until we leave the window. The level is how many positions we look at before
+    settling for the longest match found so far. Low levels are much faster on
+    repetitive data at the cost of a slightly worse compression ratio.
     """
 
     RING_LENGTH: Final[int] = 0x1000
 
-    LOOSE_COMPRESS_THRESHOLD: Final[int] = 1024 * 512
+    MIN_BACKREF: Final[int] = 3
+    MAX_BACKREF: Final[int] = 18
+
+    LEVEL_FAST: Final[int] = 4
+    LEVEL_DEFAULT: Final[int] = 32
+    LEVEL_MAX: Final[int] = 0x1000
 
     FLAG_COPY: Final[int] = 1
     FLAG_BACKREF: Final[int] = 0
 
-    def __init__(self, data: bytes, backref: Optional[int] = None) -> None:
+    def __init__(self, data: bytes, backref: Optional[int] = None, level: Optional[int] = None) -> None:
         """
         Initialize the object.
 
         Parameters:
-            data - Binary blob representing the data to be decompressed.
+            data - Binary blob representing the data to be compressed.
+            backref - The size of the backref window, defaulting to RING_LENGTH.
+            level - The maximum number of candidate backrefs to look at for each
+                    position, defaulting to LEVEL_DEFAULT.
         """
         self.data: bytes = data
         self.read_pos: int = 0
-        self.left: int = len(self.data)
         self.eof: bool = False
-        self.bytes_written: int = 0
         self.ringlength: int = backref or self.RING_LENGTH
-        self.locations: MutableMapping[int, Set[int]] = defaultdict(set)
-        self.starts: MutableMapping[bytes, Set[int]] = defaultdict(set)
-        self.last_start: Tuple[int, int, int] = (0, 0, 0)
-
-        if len(data) > self.LOOSE_COMPRESS_THRESHOLD:
-            self._ring_write = self._ring_write_starts_only
-        else:
-            self._ring_write = self._ring_write_both
+        self.level: int = max(level or self.LEVEL_DEFAULT, 1)
+        self.heads: Dict[bytes, int] = {}
+        self.chains: List[int] = [-1] * len(data)
 
-    def _ring_write_starts_only(self, bytedata: bytes) -> None:
+    def _insert(self, start: int, end: int) -> None:
         """
-        Write bytes into the backref ring.
+        Add every position in a range of the input to the head of its hash chain.
 
         Parameters:
-            byte - A byte to be written at the current write offset
+            start - The first position to add.
+            end - One past the last position to add.
         """
-        for byte in bytedata:
-            # Update the start locations hashmap if we're past the beginning
-            self.last_start = (self.last_start[1], self.last_start[2], byte)
-            if self.bytes_written >= 2:
-                self.starts[bytes(self.last_start)].add(self.bytes_written - 2)
-
-            # Keep track of the fact that we wrote this byte.
-            self.bytes_written += 1
-
-    def _ring_write_both(self, bytedata: bytes) -> None:
+        data = self.data
+        heads = self.heads
+        chains = self.chains
+        end = min(end, len(data) - (self.MIN_BACKREF - 1))
+        for pos in range(start, end):
+            key = data[pos : (pos + self.MIN_BACKREF)]
+            chains[pos] = heads.get(key, -1)
+            heads[key] = pos
+
+    def _find_backref(self, pos: int) -> Tuple[int, int]:
         """
-        Write bytes into the backref ring.
+        Find the longest backref for the data at a given position.
 
         Parameters:
-            byte - A byte to be written at the current write offset
+            pos - The position in the input to find a backref for.
+
+        Returns:
+            A tuple of the distance back and length of the best backref found, or
+            a length of zero if there isn't one.
         """
-        for byte in bytedata:
-            # Update the start locations hashmap if we're past the beginning
-            self.last_start = (self.last_start[1], self.last_start[2], byte)
-            if self.bytes_written >= 2:
-                self.starts[bytes(self.last_start)].add(self.bytes_written - 2)
+        data = self.data
+        chains = self.chains
+        max_length = min(len(data) - pos, self.MAX_BACKREF)
+        if max_length < self.MIN_BACKREF:
+            return (0, 0)
+
+        # Backrefs are 12 bits, so even with a larger ring we can't reach further.
+        earliest = pos - min(self.ringlength - 1, 0xFFF)
+        best_distance = 0
+        best_length = 0
+        tries = self.level
+        candidate = self.heads.get(data[pos : (pos + self.MIN_BACKREF)], -1)
+        while candidate >= earliest and candidate >= 0 and tries > 0:
+            tries -= 1
+
+            # Everything in this chain matches the first three bytes, and there's no point
+            # in looking closer unless it at least matches where the current best doesn't.
+            if best_length == 0 or data[candidate + best_length] == data[pos + best_length]:
+                length = self.MIN_BACKREF
+                while length < max_length and data[candidate + length] == data[pos + length]:
+                    length += 1
+                if length > best_length:
+                    best_length = length
+                    best_distance = pos - candidate
+                    if length == max_length:
+                        # Can't do any better than this.
+                        break
 
-            # Update the rest of the location hashmaps
-            self.locations[byte].add(self.bytes_written)
+            candidate = chains[candidate]
 
-            # Keep track of the fact that we wrote this byte.
-            self.bytes_written += 1
+        return (best_distance, best_length)
 
     def compress_bytes(self) -> Generator[bytes, None, None]:
         """
         Given the current stream, go through and assemble the next flag byte
         followed by the next chunk of compressed data.
         """
+        data = self.data
+        length = len(data)
         while not self.eof:
-            if self.left == 0:
-                # Output a dummy flag and an end of stream marker.
-                self.eof = True
-                yield b"\x00\x00\x00"
-            else:
-                # Need to assemble and return the next chunk, which is a flag
-                # byte and then 8 instructions.
-                flags = 0x0
-                flagpos = -1
-                data: List[bytes] = [b""] * 8
-
-                for _ in range(8):
-                    # Track what flag we're generating data for
-                    flagpos += 1
-
-                    if self.left == 0:
-                        # Output the end of stream marker, set EOF since we've succeeded
-                        # in outputting all flags.
-                        flags |= self.FLAG_BACKREF << flagpos
-                        data[flagpos] = b"\x00\x00"
-                        self.eof = True
-                        break
-                    elif self.left < 3 or self.bytes_written < 3:
-                        # We either don't have enough data written to backref, or we
-                        # don't have enough data in the stream that could be made into
-                        # a backref.
-                        flags |= self.FLAG_COPY << flagpos
-
-                        chunk = self.data[self.read_pos : (self.read_pos + 1)]
-                        data[flagpos] = chunk
-                        self._ring_write(chunk)
-
-                        self.read_pos += 1
-                        self.left -= 1
-                        continue
-
-                    # Figure out the maximum backref we can attempt to find
-                    backref_amount = min(self.left, 18)
-
-                    # Iterate over all spots where the first byte equals, and is in range.
-                    earliest = max(0, self.bytes_written - (self.ringlength - 1))
-                    index = self.data[self.read_pos : (self.read_pos + 3)]
-                    updated_backref_locations: Set[int] = set(
-                        absolute_pos for absolute_pos in self.starts[index] if absolute_pos >= earliest
-                    )
-                    self.starts[index] = updated_backref_locations
-                    possible_backref_locations: List[int] = list(updated_backref_locations)
-
-                    # Output the data as a copy if we couldn't find a backref
-                    if not possible_backref_locations:
-                        flags |= self.FLAG_COPY << flagpos
-
-                        chunk = self.data[self.read_pos : (self.read_pos + 1)]
-                        data[flagpos] = chunk
-                        self._ring_write(chunk)
-
-                        self.read_pos += 1
-                        self.left -= 1
-                        continue
-
-                    # Now, find the longest actual backref of our possibilities. We know
-                    # we're going to write at least these three bytes, so append it to the
-                    # output buffer.
-                    start_write_size = self.bytes_written
-                    self._ring_write(index)
-                    copy_amount = 3
-                    while copy_amount < backref_amount:
-                        # First, let's see if we have any 3-wide chunks to consume.
-                        index = self.data[(self.read_pos + copy_amount) : (self.read_pos + copy_amount + 3)]
-                        locations = self.starts[index]
-                        new_backref_locations: List[int] = [
-                            absolute_pos
-                            for absolute_pos in possible_backref_locations
-                            if absolute_pos + copy_amount in locations
-                        ]
-
-                        if new_backref_locations:
-                            # Mark that we're copying an extra byte from the backref.
-                            self._ring_write(index)
-                            copy_amount += 3
-                            possible_backref_locations = new_backref_locations
-                        else:
-                            # Check our existing locations to figure out if we still have
-                            # longest prefixes of 1 or 2 left.
-                            while copy_amount < backref_amount:
-                                locations = self.locations[self.data[self.read_pos + copy_amount]]
-                                new_backref_locations = [
-                                    absolute_pos
-                                    for absolute_pos in possible_backref_locations
-                                    if absolute_pos + copy_amount in locations
-                                ]
-
-                                # If we have no longest prefixes, that means that any of the
-                                # previous prefixes are good enough.
-                                if not new_backref_locations:
-                                    break
-
-                                # Mark that we're copying an extra byte from the backref.
-                                self._ring_write(
-                                    self.data[(self.read_pos + copy_amount) : (self.read_pos + copy_amount + 1)]
-                                )
-                                copy_amount += 1
-                                possible_backref_locations = new_backref_locations
-
-                            # Either we looped above in the inner while, or we didn't. Either way,
-                            # we don't have any more to check since there were no more 3-long backref
-                            # locations.
-                            break
-
-                    # Now that we have a list of candidates, arbitrarily pick the
-                    # first one as our candidate and output it.
-                    absolute_pos = possible_backref_locations[0]
-                    backref_pos = start_write_size - absolute_pos
-
-                    lo = (copy_amount - 3) & 0xF | ((backref_pos & 0xF) << 4)
-                    hi = (backref_pos >> 4) & 0xFF
+            # Need to assemble and return the next chunk, which is a flag
+            # byte and then 8 instructions.
+            flags = 0x0
+            chunks: List[bytes] = []
+
+            for flagpos in range(8):
+                pos = self.read_pos
+                if pos >= length:
+                    # Output the end of stream marker, set EOF since we've succeeded
+                    # in outputting all flags.
+                    flags |= self.FLAG_BACKREF << flagpos
+                    chunks.append(b"\x00\x00")
+                    self.eof = True
+                    break
+
+                distance, amount = self._find_backref(pos)
+                if amount == 0:
+                    # Output the data as a copy since we couldn't find a backref.
+                    flags |= self.FLAG_COPY << flagpos
+                    chunks.append(data[pos : (pos + 1)])
+                    amount = 1
+                else:
+                    lo = (amount - self.MIN_BACKREF) & 0xF | ((distance & 0xF) << 4)
+                    hi = (distance >> 4) & 0xFF
                     flags |= self.FLAG_BACKREF << flagpos
-                    data[flagpos] = bytes([hi, lo])
-                    self.read_pos += copy_amount
-                    self.left -= copy_amount
+                    chunks.append(bytes([hi, lo]))
+
+                self._insert(pos, pos + amount)
+                self.read_pos += amount
 
-                yield bytes([flags]) + b"".join(data)
+            yield bytes([flags]) + b"".join(chunks)
 
 
 class Lz77:
@@ -434,42 +384,99 @@ class Lz77:
     A wrapper class encapsulating Lz77 encoding and decoding.
     """
 
-    def __init__(self, backref: Optional[int] = None) -> None:
+    MIN_OUTPUT_LENGTH: Final[int] = 0x1000
+
+    # How hard to look for backrefs when compressing. Fast is meant for data that
+    # is compressed on the fly such as packets, max is meant for data that is
+    # compressed once and kept such as game assets.
+    LEVEL_FAST: Final[int] = Lz77Compress.LEVEL_FAST
+    LEVEL_DEFAULT: Final[int] = Lz77Compress.LEVEL_DEFAULT
+    LEVEL_MAX: Final[int] = Lz77Compress.LEVEL_MAX
+
+    def __init__(self, backref: Optional[int] = None, level: Optional[int] = None) -> None:
         """
         Initialize the object.
+
+        Parameters:
+            backref - The size of the backref window, if not the standard one.
+            level - How hard to look for backrefs when compressing, from LEVEL_FAST
+                    to LEVEL_MAX. Defaults to LEVEL_DEFAULT.
         """
         self.backref = backref
+        self.level = level or self.LEVEL_DEFAULT
 
-    def decompress(self, data: bytes) -> bytes:
+    def decompress(self, data: bytes, size: Optional[int] = None) -> bytes:
         """
         Given a binary blob, return a new binary blob representing the decompressed data.
 
         Parameters:
             data - Lz77-compressed binary data
+            size - The decompressed size if known (for instance, from a file header).
+                   This is only used to size the output buffer up front.
 
         Returns:
             Raw binary data.
         """
+        out = bytearray(size or 0)
+        self.decompress_into(data, out, 0)
+        return bytes(out)
+
+    def decompress_into(
+        self,
+        data: bytes,
+        out: Union[bytearray, memoryview],
+        offset: Optional[int] = None,
+    ) -> int:
+        """
+        Given a binary blob, decompress it into a caller-supplied buffer. If the buffer
+        is a bytearray, it grows as needed to hold the output and anything after the
+        output is trimmed off afterwards. Otherwise, it must be large enough to hold
+        the output.
+
+        Parameters:
+            data - Lz77-compressed binary data
+            out - A bytearray or writable memoryview to write the raw data into.
+            offset - Where in the buffer to start writing. Defaults to the end of a
+                     bytearray, or the start of any other buffer.
+
+        Returns:
+            The number of bytes written.
+        """
+        if offset is None:
+            offset = len(out) if isinstance(out, bytearray) else 0
+
         if clib is not None:
-            # Given a maximum backref length of 18, if we had a file that was
-            # only backrefs of maximum size. We would get a compression of around
-            # (18 * 8) / (2 * 8 + 1), or 8.47. So, allocate 9 times in the output
-            # buffer.
-            outbuf = b"\0" * (len(data) * 9)
-            result = clib.decompress(data, len(data), outbuf, len(outbuf))
-            if result >= 0:
-                return outbuf[:result]
-            elif result == -1:
-                raise LzException("Not enough room in output buffer!")
-            elif result == -2:
-                raise LzException("Unexpected EOF during decompression!")
-            elif result == -3:
-                raise LzException("Not enough room to write output byte!")
-            else:
-                raise LzException("Unknown exception in C++ code!")
+            if isinstance(out, bytearray) and len(out) - offset < self.MIN_OUTPUT_LENGTH:
+                # Most data compresses somewhere around 3-5x, so start there and double as needed.
+                out.extend(bytes(max(len(data) * 4, self.MIN_OUTPUT_LENGTH)))
+
+            inpos = ctypes.c_uint(0)
+            outpos = ctypes.c_uint(0)
+            while True:
+                outbuf = (ctypes.c_char * (len(out) - offset)).from_buffer(out, offset)
+                result = clib.decompress_into(
+                    data, len(data), ctypes.byref(inpos), outbuf, len(outbuf), ctypes.byref(outpos)
+                )
+                # Release our view of the buffer so that it can be resized.
+                del outbuf
+
+                if result == 0:
+                    break
+                elif result == 1:
+                    if not isinstance(out, bytearray):
+                        raise LzException("Not enough room in output buffer!")
+                    out.extend(bytes(len(out) - offset))
+                elif result == -2:
+                    raise LzException("Unexpected EOF during decompression!")
+                else:
+                    raise LzException("Unknown exception in C++ code!")
+
+            if isinstance(out, bytearray):
+                del out[(offset + outpos.value) :]
+            return outpos.value
         else:
             lz = Lz77Decompress(data, backref=self.backref)
-            return b"".join(lz.decompress_bytes())
+            return lz.decompress_into(out, offset)
 
     def compress(self, data: bytes) -> bytes:
         """
@@ -485,10 +492,10 @@ class Lz77:
             # Given a worst case scenario where we end up copying every byte to
             # the output, compression would actually inflate the file by 9/8 size.
             # Leave enough room for a trailing EOF reference.
-            outbuf = b"\0" * (int((len(data) * 9) / 8) + 3)
-            result = clib.compress(data, len(data), outbuf, len(outbuf))
+            outbuf = ctypes.create_string_buffer(int((len(data) * 9) / 8) + 3)
+            result = clib.compress(data, len(data), outbuf, len(outbuf), self.level)
             if result >= 0:
-                return outbuf[:result]
+                return ctypes.string_at(outbuf, result)
             elif result == -1:
                 raise LzException("Not enough room in output buffer!")
             elif result == -2:
@@ -498,5 +505,5 @@ class Lz77:
             else:
                 raise LzException("Unknown exception in C++ code!")
         else:
-            lz = Lz77Compress(data, backref=self.backref)
+            lz = Lz77Compress(data, backref=self.backref, level=self.level)
             return b"".join(lz.compress_bytes())
@@ -1,35 +1,38 @@
 #include <stdio.h>
 #include <stdint.h>
+#include <string.h>
 #include <algorithm>
-#include <unordered_map>
-#include <list>
+#include <vector>
 
 #define FLAG_COPY 1
 #define FLAG_BACKREF 0
 
+#define MIN_BACKREF ((unsigned int)3)
 #define MAX_BACKREF ((unsigned int)18)
 #define RING_LEN 0x1000
 
+#define HASH_BITS 15
+#define HASH_LEN (1 << HASH_BITS)
+#define HASH(data) (((((uint32_t)(data)[0] << 16) | ((uint32_t)(data)[1] << 8) | (data)[2]) * 2654435761u) >> (32 - HASH_BITS))
+
 extern "C"
 {
-    int decompress(uint8_t *indata, unsigned int inlen, uint8_t *outdata, unsigned int outlen)
+    int decompress_into(uint8_t *indata, unsigned int inlen, unsigned int *inpos, uint8_t *outdata, unsigned int outlen, unsigned int *outpos)
     {
-        // First, let's assume a worst case compression which in theory is just a copy.
-        // The math is basically 9 bytes used for every 8 bytes. So, the minimum output
-        // buffer we need is (inlen * 8/9). If we have an outlen smaller than that, we
-        // are hosed.
-        if (outlen < ((inlen * 8) / 9))
-        {
-            // We cannot decompress, we will run out of room!
-            return -1;
-        }
-
-        // Now, let's enter a loop where we read control bytes and act on them.
-        unsigned int inloc = 0;
-        unsigned int outloc = 0;
+        // Decompress starting at the given input and output positions, which must be at
+        // the start of a flag byte. Backrefs are resolved against outdata itself, so the
+        // caller must hand us the same buffer (with everything we wrote previously intact)
+        // on every call. If we run out of output room we rewind to the start of the flag
+        // byte we were on, update the positions and return 1 so that the caller can grow
+        // the buffer and call us again. Otherwise, we return 0 when we hit the end of the
+        // stream, with the positions updated to reflect how much we consumed and wrote.
+        unsigned int inloc = *inpos;
+        unsigned int outloc = *outpos;
         bool eof = false;
         while (inloc < inlen && !eof)
         {
+            unsigned int group_inloc = inloc;
+            unsigned int group_outloc = outloc;
             uint8_t flags = indata[inloc++];
             for (unsigned int flagpos = 0; flagpos < 8; flagpos++)
             {
@@ -43,8 +46,10 @@ extern "C"
                     }
                     if (outloc >= outlen)
                     {
-                        // We overwrote our output buffer, we probably corrupted memory somewhere.
-                        return -3;
+                        // Not enough room, let the caller grow the buffer and retry.
+                        *inpos = group_inloc;
+                        *outpos = group_outloc;
+                        return 1;
                     }
                     outdata[outloc++] = indata[inloc++];
                 }
@@ -70,16 +75,26 @@ extern "C"
                         break;
                     }
 
-                    // Copy backref a byte at a time. This is because a backref can stick
-                    // out into as-of-yet uncopied data in order to reference what we're
-                    // about to write.
                     if (outloc + copy_len > outlen)
                     {
-                        // We overwrote our output buffer, we probably corrupted memory somewhere.
-                        return -3;
+                        // Not enough room, let the caller grow the buffer and retry.
+                        *inpos = group_inloc;
+                        *outpos = group_outloc;
+                        return 1;
                     }
 
                     int backref_start_loc = (int)outloc - (int)copy_pos;
+                    if (backref_start_loc >= 0 && copy_len <= copy_pos)
+                    {
+                        // The whole backref is already written, so copy it in one go.
+                        memcpy(outdata + outloc, outdata + backref_start_loc, copy_len);
+                        outloc += copy_len;
+                        continue;
+                    }
+
+                    // Copy backref a byte at a time. This is because a backref can stick
+                    // out into as-of-yet uncopied data in order to reference what we're
+                    // about to write.
                     for (int backref_copy_pos = backref_start_loc; backref_copy_pos < backref_start_loc + (int)copy_len; backref_copy_pos++)
                     {
                         if (backref_copy_pos < 0)
@@ -95,18 +110,59 @@ extern "C"
             }
         }
 
+        *inpos = inloc;
+        *outpos = outloc;
+        return 0;
+    }
+
+    int decompress(uint8_t *indata, unsigned int inlen, uint8_t *outdata, unsigned int outlen)
+    {
+        // First, let's assume a worst case compression which in theory is just a copy.
+        // The math is basically 9 bytes used for every 8 bytes. So, the minimum output
+        // buffer we need is (inlen * 8/9). If we have an outlen smaller than that, we
+        // are hosed.
+        if (outlen < ((inlen * 8) / 9))
+        {
+            // We cannot decompress, we will run out of room!
+            return -1;
+        }
+
+        unsigned int inloc = 0;
+        unsigned int outloc = 0;
+        int result = decompress_into(indata, inlen, &inloc, outdata, outlen, &outloc);
+        if (result < 0)
+        {
+            return result;
+        }
+        if (result > 0)
+        {
+            // We ran out of output room.
+            return -3;
+        }
+
         // Update the outlen with the actual data length.
         return outloc;
     }
 
-    int compress(uint8_t *indata, unsigned int inlen, uint8_t *outdata, unsigned int outlen)
+    int compress(uint8_t *indata, unsigned int inlen, uint8_t *outdata, unsigned int outlen, unsigned int level)
     {
-        uint32_t key = 0;
-        std::unordered_map<uint32_t, std::list<unsigned int> > starts;
+        // Every position gets added to the head of a chain of earlier positions whose
+        // first three bytes hash the same. Finding a backref means walking that chain
+        // from the nearest position back, looking at no more than level candidates.
+        // Since we never look further back than the ring, we only need to remember the
+        // previous position for the last RING_LEN positions.
+        std::vector<int> heads(HASH_LEN, -1);
+        std::vector<int> chains(RING_LEN, -1);
+        unsigned int inserted = 0;
         bool eof = false;
         unsigned int outloc = 0;
         unsigned int inloc = 0;
 
+        if (level < 1)
+        {
+            level = 1;
+        }
+
         while (!eof)
         {
             if (outloc >= outlen)
@@ -142,129 +198,84 @@ extern "C"
                     eof = true;
                     break;
                 }
-                else if (inloc < 3 || inloc >= (inlen - 3))
-                {
-                    if (outloc >= outlen)
-                    {
-                        // We overwrote our output buffer, we probably corrupted memory somewhere.
-                        return -3;
-                    }
-
-                    // We either don't have enough data written to backref, or we
-                    // don't have enough data in the stream that could be made into
-                    // a backref. Set the particular flag bit to a copy and then
-                    // output that byte to the compressed stream.
-                    outdata[flagsloc] |= (FLAG_COPY << flagpos);
 
-                    // Update our key to reflect this byte coming out as long as we aren't
-                    // in the first two bytes (we wouldn't have a 3 byte prefix in the key yet).
-                    key = ((key << 8) | indata[inloc]) & 0xFFFFFF;
-                    if (inloc >= 2)
-                    {
-                        starts[key].push_back(inloc - 2);
-                    }
-
-                    // Output this byte specifically
-                    outdata[outloc++] = indata[inloc++];
-                }
-                else
+                // Figure out the maximum backref amount we can reference, and look for the
+                // longest one we can find.
+                unsigned int backref_amount = std::min(inlen - inloc, MAX_BACKREF);
+                unsigned int best_length = 0;
+                unsigned int best_backref = 0;
+                if (backref_amount >= MIN_BACKREF)
                 {
-                    // Figure out the maximum backref amount we can reference.
-                    unsigned int backref_amount = std::min(inlen - inloc, MAX_BACKREF);
-                    unsigned int earliest_backref = std::max(0, (int)inloc - (RING_LEN - 1));
-                    uint32_t search_key = (indata[inloc] << 16) | (indata[inloc + 1] << 8) | (indata[inloc + 2]);
-
-                    // Prune anything that we can't backref.
-                    starts[search_key].remove_if([earliest_backref](auto val)
-                    {
-                        return val < earliest_backref;
-                    });
-
-                    if (starts[search_key].size() == 0)
-                    {
-                        if (outloc >= outlen)
+                    int earliest_backref = (int)inloc - (RING_LEN - 1);
+                    unsigned int tries = level;
+                    for (
+                        int possible_backref = heads[HASH(indata + inloc)];
+                        possible_backref >= 0 && possible_backref >= earliest_backref && tries > 0;
+                        possible_backref = chains[possible_backref & (RING_LEN - 1)], tries--
+                    ) {
+                        // If the current best length isn't a match on this chunk, then we shouldn't even consider it
+                        // since the other chunk is already a better match.
+                        if (indata[possible_backref + best_length] != indata[inloc + best_length])
                         {
-                            // We overwrote our output buffer, we probably corrupted memory somewhere.
-                            return -3;
+                            continue;
                         }
 
-                        // We couldn't find a previous data in range of a backref.
-                        outdata[flagsloc] |= (FLAG_COPY << flagpos);
-
-                        // Update our key to reflect this byte coming out.
-                        key = ((key << 8) | indata[inloc]) & 0xFFFFFF;
-                        starts[key].push_back(inloc - 2);
-
-                        // Output this byte specifically
-                        outdata[outloc++] = indata[inloc++];
-                    }
-                    else
-                    {
-                        int best_backref = -1;
-                        unsigned int best_length = 1;
-
-                        for (auto possible_backref = starts[search_key].begin(); possible_backref != starts[search_key].end(); possible_backref++)
+                        // Different prefixes can hash the same, so we can't skip checking the first three.
+                        unsigned int current_length = 0;
+                        while (current_length < backref_amount && indata[possible_backref + current_length] == indata[inloc + current_length])
                         {
-                            // If the current best length isn't a match on this chunk, then we shouldn't even consider it
-                            // since the other chunk is already a better match.
-                            if (indata[(*possible_backref) + (best_length - 1)] != indata[inloc + (best_length - 1)])
-                            {
-                                continue;
-                            }
+                            current_length++;
+                        }
 
-                            // We already know that the first three match so we don't need to check those;
-                            unsigned int current_length;
-                            for (current_length = 3; current_length < backref_amount; current_length++)
-                            {
-                                if (indata[(*possible_backref) + current_length] != indata[inloc + current_length])
-                                {
-                                    // This value doesn't match, so the current length is the longest prefix
-                                    // for this possible backref.
-                                    break;
-                                }
-                            }
+                        // We found a better match
+                        if (current_length >= MIN_BACKREF && current_length > best_length)
+                        {
+                            best_length = current_length;
+                            best_backref = inloc - possible_backref;
 
-                            // We found a better match
-                            if (best_length < current_length)
-                            {
-                                best_length = current_length;
-                                best_backref = (inloc - *possible_backref) & 0xFFF;
-                            }
-                            else if (best_length == backref_amount)
+                            if (best_length == backref_amount)
                             {
                                 // We found an ideal length, no need to keep searching.
                                 break;
                             }
                         }
+                    }
+                }
 
-                        if (best_backref <= 0)
-                        {
-                            // Double check, since we know we should have found a backref.
-                            return -2;
-                        }
-
-                        if (outloc > (outlen - 2))
-                        {
-                            // We overwrote our output buffer, we probably corrupted memory somewhere.
-                            return -3;
-                        }
+                if (best_length == 0)
+                {
+                    if (outloc >= outlen)
+                    {
+                        // We overwrote our output buffer, we probably corrupted memory somewhere.
+                        return -3;
+                    }
 
-                        // We got a valid backref, so let's record it as well as the start positions
-                        // for each of the bytes we compressed.
-                        outdata[flagsloc] |= (FLAG_BACKREF << flagpos);
+                    // We couldn't find a previous data in range of a backref. Set the particular
+                    // flag bit to a copy and then output that byte to the compressed stream.
+                    outdata[flagsloc] |= (FLAG_COPY << flagpos);
+                    outdata[outloc++] = indata[inloc++];
+                }
+                else
+                {
+                    if (outloc > (outlen - 2))
+                    {
+                        // We overwrote our output buffer, we probably corrupted memory somewhere.
+                        return -3;
+                    }
 
-                        // Add the backref itself.
-                        outdata[outloc++] = (best_backref >> 4) & 0xFF;
-                        outdata[outloc++] = ((best_backref & 0xF) << 4) | ((best_length - 3) & 0xF);
+                    // We got a valid backref, so let's record it.
+                    outdata[flagsloc] |= (FLAG_BACKREF << flagpos);
+                    outdata[outloc++] = (best_backref >> 4) & 0xFF;
+                    outdata[outloc++] = ((best_backref & 0xF) << 4) | ((best_length - MIN_BACKREF) & 0xF);
+                    inloc += best_length;
+                }
 
-                        // Record the keys for each byte;
-                        for (unsigned int i = 0; i < best_length; i++)
-                        {
-                            key = ((key << 8) | indata[inloc]) & 0xFFFFFF;
-                            starts[key].push_back(inloc - 2);
-                            inloc++;
-                        }
-                    }
+                // Record the chains for each byte we just compressed.
+                for (; inserted < inloc && inserted + MIN_BACKREF <= inlen; inserted++)
+                {
+                    unsigned int hash = HASH(indata + inserted);
+                    chains[inserted & (RING_LEN - 1)] = heads[hash];
+                    heads[hash] = inserted;
                 }
             }
         }
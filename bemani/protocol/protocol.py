@@ -1,14 +1,40 @@
 import binascii
 import hashlib
-from typing import Optional
+import threading
+from functools import lru_cache
+from typing import Dict, Optional
 from typing_extensions import Final
 
 from bemani.protocol.lz77 import Lz77
+from bemani.protocol.rc4 import RC4
 from bemani.protocol.binary import BinaryEncoding
 from bemani.protocol.xml import XmlEncoding
 from bemani.protocol.node import Node
 
 
+@lru_cache(maxsize=1024)
+def _cipher_for(encryption_key: str) -> RC4:
+    """
+    Given an encryption key as returned from a HTTP request, derive the real RC4 key
+    and run the key schedule for it. A game uses the same key for the request and its
+    response as well as any retries, so we keep recently used schedules around.
+
+    Parameters:
+        encryption_key - A string encryption key in the form 1-xxyyzzww-aabb.
+
+    Returns:
+        An RC4 object ready to encrypt/decrypt data for this key.
+    """
+    # Key is concatenated with the shared secret above
+    version, first, second = encryption_key.split("-")
+    key = binascii.unhexlify((first + second).encode("ascii")) + EAmuseProtocol.SHARED_SECRET
+
+    # Next, key is sent through MD5 to derive the real key
+    m = hashlib.md5()
+    m.update(key)
+    return RC4(m.digest())
+
+
 class EAmuseException(Exception):
     """
     An exception thrown when we encounter an error with E-Amusement encapsulation.
@@ -34,6 +60,16 @@ class EAmuseProtocol:
     UTF_8: Final[str] = "utf-8"
     ASCII: Final[str] = "ascii"
 
+    # Process-wide counts of how many packets were decoded in each format. A new protocol
+    # object is created for every request, so these live on the class instead.
+    __decode_counts: Dict[str, int] = {
+        "binary": 0,
+        "binary_decompressed": 0,
+        "xml": 0,
+        "unknown": 0,
+    }
+    __decode_counts_lock: threading.Lock = threading.Lock()
+
     def __init__(self) -> None:
         """
         Initialize the object.
@@ -41,6 +77,23 @@ class EAmuseProtocol:
         self.last_text_encoding: Optional[str] = None
         self.last_packet_encoding: Optional[int] = None
 
+    @staticmethod
+    def __count_decode(packet_format: str) -> None:
+        with EAmuseProtocol.__decode_counts_lock:
+            EAmuseProtocol.__decode_counts[packet_format] += 1
+
+    @staticmethod
+    def decode_statistics() -> Dict[str, int]:
+        """
+        Return the number of packets decoded by this process in each packet format.
+
+        Returns:
+            A dictionary keyed by 'binary', 'binary_decompressed', 'xml' and 'unknown'
+            whose values are the number of packets decoded in that format.
+        """
+        with EAmuseProtocol.__decode_counts_lock:
+            return dict(EAmuseProtocol.__decode_counts)
+
     def rc4_crypt(self, data: bytes, key: bytes) -> bytes:
         """
         Given a data blob and a key blob, perform RC4 encryption/decryption.
@@ -52,27 +105,7 @@ class EAmuseProtocol:
         Returns:
             binary string representing the encrypted/decrypted data
         """
-        S = list(range(256))
-        j = 0
-        out = []
-
-        # KSA Phase
-        for i in range(256):
-            if key:
-                j = (j + S[i] + key[i % len(key)]) & 0xFF
-            else:
-                j = (j + S[i]) & 0xFF
-            S[i], S[j] = S[j], S[i]
-
-        # PRGA Phase
-        i = j = 0
-        for char in data:
-            i = (i + 1) & 0xFF
-            j = (j + S[i]) & 0xFF
-            S[i], S[j] = S[j], S[i]
-            out.append(char ^ S[(S[i] + S[j]) & 0xFF])
-
-        return bytes(out)
+        return RC4(key).crypt(data)
 
     def __decrypt(self, encryption_key: Optional[str], data: bytes) -> bytes:
         """
@@ -87,20 +120,9 @@ class EAmuseProtocol:
         Returns:
             binary string representing transformed data
         """
-        key: Optional[bytes] = None
         if encryption_key:
-            # Key is concatenated with the shared secret above
-            version, first, second = encryption_key.split("-")
-            key = binascii.unhexlify((first + second).encode("ascii")) + EAmuseProtocol.SHARED_SECRET
-
-            # Next, key is sent through MD5 to derive the real key
-            m = hashlib.md5()
-            m.update(key)
-            key = m.digest()
-
-        if key:
             # This is an encrypted old-style packet
-            return self.rc4_crypt(data, key)
+            return _cipher_for(encryption_key).crypt(data)
 
         # No encryption
         return data
@@ -161,8 +183,9 @@ class EAmuseProtocol:
             # This isn't compressed
             return data
         elif compression == "lz77":
-            # This is a compressed new-style packet
-            lz = Lz77()
+            # This is a compressed new-style packet, so favor speed over size since
+            # we're doing this on every response.
+            lz = Lz77(level=Lz77.LEVEL_FAST)
             return lz.compress(data)
         else:
             raise EAmuseException(f"Unknown compression {compression}")
@@ -177,29 +200,33 @@ class EAmuseProtocol:
         Returns:
             Node tree on success or None on failure.
         """
-        # Assume it's a binary page
-        binary = BinaryEncoding()
-        ret = binary.decode(data, skip_on_exceptions=True)
-
-        if ret is not None:
-            # We got a result, it was binary
-            self.last_text_encoding = binary.encoding
-            self.last_packet_encoding = EAmuseProtocol.BINARY
+        # Pick the decoder based on the header, so that XML packets never pay for a
+        # failed binary parse and vice versa.
+        if BinaryEncoding.is_binary(data):
+            binary = BinaryEncoding()
+            ret = binary.decode(data, skip_on_exceptions=True)
 
-            return ret
+            if ret is not None:
+                # We got a result, it was binary
+                self.__count_decode("binary" if binary.compressed else "binary_decompressed")
+                self.last_text_encoding = binary.encoding
+                self.last_packet_encoding = EAmuseProtocol.BINARY
 
-        # Assume its XML
-        xml = XmlEncoding()
-        ret = xml.decode(data, skip_on_exceptions=True)
+                return ret
+        else:
+            xml = XmlEncoding()
+            ret = xml.decode(data, skip_on_exceptions=True)
 
-        if ret is not None:
-            # We got a result, it was XML
-            self.last_text_encoding = xml.encoding
-            self.last_packet_encoding = EAmuseProtocol.XML
+            if ret is not None:
+                # We got a result, it was XML
+                self.__count_decode("xml")
+                self.last_text_encoding = xml.encoding
+                self.last_packet_encoding = EAmuseProtocol.XML
 
-            return ret
+                return ret
 
         # Couldn't decode
+        self.__count_decode("unknown")
         raise EAmuseException("Unknown packet encoding")
 
     def __encode(self, tree: Node, text_encoding: str, packet_encoding: int) -> bytes:
@@ -0,0 +1,117 @@
+import ctypes
+import os
+from typing import List
+from typing_extensions import Final
+
+from .. import package_root
+
+
+# Attempt to use the faster C++ libraries if they're available
+try:
+    clib = None
+    clib_path = os.path.join(package_root, "protocol")
+    files = [f for f in os.listdir(clib_path) if f.startswith("rc4cpp") and f.endswith(".so")]
+    if len(files) > 0:
+        clib = ctypes.cdll.LoadLibrary(os.path.join(clib_path, files[0]))
+        clib.rc4_schedule.argtypes = (
+            ctypes.c_char_p,
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_int,
+        )
+        clib.rc4_schedule.restype = ctypes.c_int
+        clib.rc4_crypt.argtypes = (
+            ctypes.c_char_p,
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_int,
+        )
+        clib.rc4_crypt.restype = ctypes.c_int
+except Exception:
+    clib = None
+
+
+class RC4Exception(Exception):
+    """
+    An exception thrown when we encounter an error with RC4 encryption/decryption.
+    """
+
+
+class RC4:
+    """
+    A wrapper class encapsulating RC4 encryption and decryption. The key schedule
+    is computed once when the object is created, and every call to crypt starts
+    from a copy of that initial state. This means a single object can be reused
+    for any number of independent messages encrypted with the same key, such as
+    the request and response of a single exchange.
+    """
+
+    SBOX_LENGTH: Final[int] = 256
+
+    def __init__(self, key: bytes) -> None:
+        """
+        Initialize the object, running the key scheduling algorithm.
+
+        Parameters:
+            key - Binary string representing the key to use
+        """
+        if clib is not None:
+            sbox = ctypes.create_string_buffer(self.SBOX_LENGTH)
+            result = clib.rc4_schedule(key, len(key), sbox, len(sbox))
+            if result < 0:
+                raise RC4Exception("Not enough room in S-box buffer!")
+            self.sbox: bytes = sbox.raw
+        else:
+            self.sbox = bytes(self.__schedule(key))
+
+    def __schedule(self, key: bytes) -> List[int]:
+        """
+        Pure python implementation of the KSA phase.
+        """
+        S = list(range(self.SBOX_LENGTH))
+        j = 0
+
+        for i in range(self.SBOX_LENGTH):
+            if key:
+                j = (j + S[i] + key[i % len(key)]) & 0xFF
+            else:
+                j = (j + S[i]) & 0xFF
+            S[i], S[j] = S[j], S[i]
+
+        return S
+
+    def crypt(self, data: bytes) -> bytes:
+        """
+        Given a data blob, perform RC4 encryption/decryption.
+
+        Parameters:
+            data - Binary string representing data to be encrypted/decrypted
+
+        Returns:
+            binary string representing the encrypted/decrypted data
+        """
+        if clib is not None:
+            outbuf = ctypes.create_string_buffer(len(data))
+            result = clib.rc4_crypt(self.sbox, len(self.sbox), data, len(data), outbuf, len(outbuf))
+            if result >= 0:
+                return outbuf.raw[:result]
+            elif result == -1:
+                raise RC4Exception("Invalid S-box state!")
+            elif result == -2:
+                raise RC4Exception("Not enough room in output buffer!")
+            else:
+                raise RC4Exception("Unknown exception in C++ code!")
+
+        # PRGA Phase
+        S = list(self.sbox)
+        out = bytearray(len(data))
+        i = j = 0
+        for pos, char in enumerate(data):
+            i = (i + 1) & 0xFF
+            j = (j + S[i]) & 0xFF
+            S[i], S[j] = S[j], S[i]
+            out[pos] = char ^ S[(S[i] + S[j]) & 0xFF]
+
+        return bytes(out)
@@ -0,0 +1,70 @@
+#include <stdint.h>
+#include <string.h>
+
+#define SBOX_LEN 256
+
+extern "C"
+{
+    int rc4_schedule(uint8_t *key, unsigned int keylen, uint8_t *sbox, unsigned int sboxlen)
+    {
+        // We need a full S-box worth of output space to write the initial state into.
+        if (sboxlen < SBOX_LEN)
+        {
+            return -1;
+        }
+
+        // KSA phase, identical to the python version.
+        for (unsigned int i = 0; i < SBOX_LEN; i++)
+        {
+            sbox[i] = (uint8_t)i;
+        }
+
+        uint8_t j = 0;
+        for (unsigned int i = 0; i < SBOX_LEN; i++)
+        {
+            j = j + sbox[i] + (keylen > 0 ? key[i % keylen] : 0);
+
+            uint8_t tmp = sbox[i];
+            sbox[i] = sbox[j];
+            sbox[j] = tmp;
+        }
+
+        return SBOX_LEN;
+    }
+
+    int rc4_crypt(uint8_t *sbox, unsigned int sboxlen, uint8_t *indata, unsigned int inlen, uint8_t *outdata, unsigned int outlen)
+    {
+        if (sboxlen < SBOX_LEN)
+        {
+            // We weren't given a full initial state, so we can't encrypt.
+            return -1;
+        }
+        if (outlen < inlen)
+        {
+            // We would overrun the output buffer.
+            return -2;
+        }
+
+        // Work on a copy of the initial state so that the same schedule can be
+        // reused for both the request and the response of a single exchange.
+        uint8_t S[SBOX_LEN];
+        memcpy(S, sbox, SBOX_LEN);
+
+        // PRGA phase, identical to the python version.
+        uint8_t i = 0;
+        uint8_t j = 0;
+        for (unsigned int pos = 0; pos < inlen; pos++)
+        {
+            i = i + 1;
+            j = j + S[i];
+
+            uint8_t tmp = S[i];
+            S[i] = S[j];
+            S[j] = tmp;
+
+            outdata[pos] = indata[pos] ^ S[(uint8_t)(S[i] + S[j])];
+        }
+
+        return inlen;
+    }
+}
@@ -1,10 +1,73 @@
 # vim: set fileencoding=utf-8
+import json
+import threading
+import time
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from unittest.mock import patch
 
-from bemani.data.api.client import APIClient
+from bemani.common import APIConstants, GameConstants, Time, VersionConstants
+from bemani.data.api.client import APIClient, APIException, CircuitBreaker, NotAuthorizedAPIException
+
+
+class StubBEMAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    requests: List[Dict[str, Any]] = []
+    failing = False
+
+    def setup(self) -> None:
+        super().setup()
+        StubBEMAPIHandler.connections += 1
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def __respond(self, code: int, data: Dict[str, Any]) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length))
+        StubBEMAPIHandler.requests.append(request)
+
+        if StubBEMAPIHandler.failing:
+            body = b"Bad Gateway"
+            self.send_response(502)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.headers.get("Authorization") != "Token token":
+            self.__respond(401, {"error": "Unauthorized"})
+        elif self.path == "/":
+            self.__respond(200, {"name": "Stub", "email": "stub@example.com", "versions": ["v1"]})
+        elif request["objects"] == ["records"]:
+            self.__respond(200, {"records": [{"request": len(StubBEMAPIHandler.requests)}]})
+        else:
+            self.__respond(200, {"profile": [{"name": f"PLAYER{i}"} for i in range(len(request["ids"]))]})
 
 
 class TestAPIClient(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubBEMAPIHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.uri = f"http://127.0.0.1:{self.server.server_address[1]}"
+        StubBEMAPIHandler.connections = 0
+        StubBEMAPIHandler.requests = []
+        StubBEMAPIHandler.failing = False
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
     def test_content_type(self) -> None:
         client = APIClient("https://127.0.0.1", "token", False, False)
         self.assertFalse(client._content_type_valid("application/text"))
@@ -18,3 +81,77 @@ class TestAPIClient(unittest.TestCase):
         self.assertTrue(client._content_type_valid("application/json;charset=UTF-8"))
         self.assertTrue(client._content_type_valid("application/json;charset = UTF-8"))
         self.assertTrue(client._content_type_valid("application/json; charset = UTF-8"))
+
+    def test_stub_server(self) -> None:
+        # Separate client objects for the same server should share a connection.
+        for _ in range(3):
+            client = APIClient(self.uri, "token", True, True)
+            info = client.get_server_info()
+            self.assertEqual(info.get_str("name"), "Stub")
+        profiles = APIClient(self.uri, "token", True, True).get_profiles(
+            GameConstants.IIDX,
+            VersionConstants.IIDX_PENDUAL,
+            APIConstants.ID_TYPE_CARD,
+            ["E004010000000000", "E004010000000001"],
+        )
+        self.assertEqual(profiles, [{"name": "PLAYER0"}, {"name": "PLAYER1"}])
+        self.assertEqual(StubBEMAPIHandler.requests[-1]["objects"], ["profile"])
+        self.assertEqual(StubBEMAPIHandler.connections, 1)
+
+        # Errors should still be mapped to the right exception.
+        with self.assertRaises(NotAuthorizedAPIException):
+            APIClient(self.uri, "badtoken", True, True).get_server_info()
+
+    def test_circuit_breaker(self) -> None:
+        client = APIClient(self.uri, "token", True, True)
+        StubBEMAPIHandler.failing = True
+        for _ in range(CircuitBreaker.FAILURE_THRESHOLD):
+            with self.assertRaises(APIException):
+                client.get_server_info()
+        self.assertEqual(client.get_health()["state"], CircuitBreaker.OPEN)
+        self.assertEqual(client.get_health()["failures"], CircuitBreaker.FAILURE_THRESHOLD)
+
+        # Now that the breaker is open, we shouldn't even be talking to the server.
+        StubBEMAPIHandler.failing = False
+        sent = len(StubBEMAPIHandler.requests)
+        with self.assertRaises(APIException):
+            client.get_server_info()
+        self.assertEqual(len(StubBEMAPIHandler.requests), sent)
+
+        # Once enough time has passed, a single request should be let through to check.
+        later = time.monotonic() + CircuitBreaker.RESET_TIMEOUT
+        with patch("bemani.data.api.client.time.monotonic", return_value=later):
+            self.assertEqual(client.get_server_info().get_str("name"), "Stub")
+        self.assertEqual(len(StubBEMAPIHandler.requests), sent + 1)
+        self.assertEqual(client.get_health()["state"], CircuitBreaker.CLOSED)
+
+    def test_stale_while_revalidate(self) -> None:
+        client = APIClient(self.uri, "token", True, True)
+
+        def records() -> List[Dict[str, Any]]:
+            return client.get_records(
+                GameConstants.IIDX, VersionConstants.IIDX_PENDUAL, APIConstants.ID_TYPE_SERVER, []
+            )
+
+        # The first lookup has to go to the server, the second should be cached.
+        self.assertEqual(records(), [{"request": 1}])
+        self.assertEqual(records(), [{"request": 1}])
+        self.assertEqual(len(StubBEMAPIHandler.requests), 1)
+
+        # Once the result is old, we should still get it right away and refresh in the background.
+        later = Time.now() + Time.SECONDS_IN_HOUR
+        with patch("bemani.data.api.client.Time.now", return_value=later):
+            self.assertEqual(records(), [{"request": 1}])
+            deadline = time.monotonic() + 5
+            while records() == [{"request": 1}] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(records(), [{"request": 2}])
+
+        # A server that stops answering shouldn't cost us the last good result.
+        StubBEMAPIHandler.failing = True
+        with patch("bemani.data.api.client.Time.now", return_value=later + Time.SECONDS_IN_HOUR):
+            self.assertEqual(records(), [{"request": 2}])
+            deadline = time.monotonic() + 5
+            while len(StubBEMAPIHandler.requests) < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(records(), [{"request": 2}])
@@ -0,0 +1,111 @@
+# vim: set fileencoding=utf-8
+import unittest
+from typing import Any, Dict, List, Tuple
+
+from bemani.common import DBConstants, GameConstants, ValidatedDict
+from bemani.data import AttemptStatistics
+
+
+class TestAttemptStatistics(unittest.TestCase):
+    def __count(self, game: GameConstants, attempts: List[Dict[str, Any]]) -> Tuple[int, int, int]:
+        data = [ValidatedDict(attempt) for attempt in attempts]
+        return (
+            sum(1 for attempt in data if AttemptStatistics.is_play(game, attempt)),
+            sum(1 for attempt in data if AttemptStatistics.is_clear(game, attempt)),
+            sum(1 for attempt in data if AttemptStatistics.is_combo(game, attempt)),
+        )
+
+    def test_iidx(self) -> None:
+        attempts = [
+            {"clear_status": DBConstants.IIDX_CLEAR_STATUS_NO_PLAY},
+            {"clear_status": DBConstants.IIDX_CLEAR_STATUS_FAILED},
+            {"clear_status": DBConstants.IIDX_CLEAR_STATUS_EASY_CLEAR},
+            {"clear_status": DBConstants.IIDX_CLEAR_STATUS_FULL_COMBO},
+        ]
+        self.assertEqual(self.__count(GameConstants.IIDX, attempts), (3, 2, 1))
+
+        # An attempt without a clear status counts as a play, but not as a clear.
+        self.assertEqual(self.__count(GameConstants.IIDX, [{}]), (1, 0, 0))
+
+    def test_sdvx(self) -> None:
+        attempts = [
+            {"clear_type": DBConstants.SDVX_CLEAR_TYPE_NO_PLAY, "grade": DBConstants.SDVX_GRADE_A},
+            {"clear_type": DBConstants.SDVX_CLEAR_TYPE_FAILED, "grade": DBConstants.SDVX_GRADE_D},
+            {"clear_type": DBConstants.SDVX_CLEAR_TYPE_CLEAR, "grade": DBConstants.SDVX_GRADE_A},
+            {"clear_type": DBConstants.SDVX_CLEAR_TYPE_ULTIMATE_CHAIN, "grade": DBConstants.SDVX_GRADE_S},
+            # A clear with no grade is a play, but not a clear.
+            {"clear_type": DBConstants.SDVX_CLEAR_TYPE_CLEAR, "grade": DBConstants.SDVX_GRADE_NO_PLAY},
+        ]
+        self.assertEqual(self.__count(GameConstants.SDVX, attempts), (4, 2, 1))
+
+    def test_museca(self) -> None:
+        attempts = [
+            {"clear_type": DBConstants.MUSECA_CLEAR_TYPE_FAILED},
+            {"clear_type": DBConstants.MUSECA_CLEAR_TYPE_FAILED},
+            {"clear_type": DBConstants.MUSECA_CLEAR_TYPE_CLEARED},
+            {"clear_type": DBConstants.MUSECA_CLEAR_TYPE_FULL_COMBO},
+        ]
+        # Failures are not clears, the old backend had this backwards.
+        self.assertEqual(self.__count(GameConstants.MUSECA, attempts), (4, 2, 1))
+
+    def test_other_games(self) -> None:
+        self.assertEqual(
+            self.__count(
+                GameConstants.DDR,
+                [
+                    {"rank": DBConstants.DDR_RANK_E, "halo": DBConstants.DDR_HALO_NONE},
+                    {"rank": DBConstants.DDR_RANK_A, "halo": DBConstants.DDR_HALO_NONE},
+                    {"rank": DBConstants.DDR_RANK_A, "halo": DBConstants.DDR_HALO_GREAT_FULL_COMBO},
+                ],
+            ),
+            (3, 2, 1),
+        )
+        self.assertEqual(
+            self.__count(
+                GameConstants.JUBEAT,
+                [
+                    {"medal": DBConstants.JUBEAT_PLAY_MEDAL_FAILED},
+                    {"medal": DBConstants.JUBEAT_PLAY_MEDAL_CLEARED},
+                    {"medal": DBConstants.JUBEAT_PLAY_MEDAL_EXCELLENT},
+                ],
+            ),
+            (3, 2, 1),
+        )
+        self.assertEqual(
+            self.__count(
+                GameConstants.POPN_MUSIC,
+                [
+                    {"medal": DBConstants.POPN_MUSIC_PLAY_MEDAL_STAR_FAILED},
+                    {"medal": DBConstants.POPN_MUSIC_PLAY_MEDAL_CIRCLE_CLEARED},
+                    {"medal": DBConstants.POPN_MUSIC_PLAY_MEDAL_PERFECT},
+                ],
+            ),
+            (3, 2, 1),
+        )
+        self.assertEqual(
+            self.__count(
+                GameConstants.REFLEC_BEAT,
+                [
+                    {"clear_type": DBConstants.REFLEC_BEAT_CLEAR_TYPE_NO_PLAY},
+                    {"clear_type": DBConstants.REFLEC_BEAT_CLEAR_TYPE_FAILED},
+                    {"clear_type": DBConstants.REFLEC_BEAT_CLEAR_TYPE_CLEARED},
+                    {
+                        "clear_type": DBConstants.REFLEC_BEAT_CLEAR_TYPE_HARD_CLEARED,
+                        "combo_type": DBConstants.REFLEC_BEAT_COMBO_TYPE_FULL_COMBO,
+                    },
+                ],
+            ),
+            (3, 2, 1),
+        )
+        self.assertEqual(
+            self.__count(
+                GameConstants.DANCE_EVOLUTION,
+                [
+                    {"grade": DBConstants.DANEVO_GRADE_FAILED},
+                    {"grade": DBConstants.DANEVO_GRADE_A},
+                    {"grade": DBConstants.DANEVO_GRADE_A, "full_combo": True},
+                ],
+            ),
+            (3, 2, 1),
+        )
+        self.assertEqual(self.__count(GameConstants.BISHI_BASHI, [{}]), (0, 0, 0))
@@ -1,8 +1,14 @@
 # vim: set fileencoding=utf-8
+import json
+import time
 import unittest
+from typing import Any, Callable, Dict
 from unittest.mock import Mock
 
-from bemani.data.mysql.base import BaseData
+from bemani.data import Config
+from bemani.data.mysql import base
+from bemani.data.mysql.base import BaseData, transaction
+from bemani.tests.helpers import ExtendedTestCase
 
 
 class TestBaseData(unittest.TestCase):
@@ -30,7 +36,7 @@ class TestBaseData(unittest.TestCase):
         }
 
         serialized = data.serialize(testdict)
-        self.assertEqual(serialized, '{"bytes": ["__bytes__", 1, 2, 3, 4, 5]}')
+        self.assertEqual(json.loads(serialized), {"bytes": ["__bytes__", 1, 2, 3, 4, 5]})
         self.assertEqual(data.deserialize(serialized), testdict)
 
     def test_deep_byte_serialize(self) -> None:
@@ -46,3 +52,131 @@ class TestBaseData(unittest.TestCase):
         }
 
         self.assertEqual(data.deserialize(data.serialize(testdict)), testdict)
+
+    def __crash(self) -> None:
+        raise Exception("Handler crashed!")
+
+    def __data(self) -> BaseData:
+        conn = Mock()
+        conn.info = {}
+        return BaseData(Config({"database": {"read_only": False}}), conn)
+
+    def test_commit_per_statement(self) -> None:
+        data = self.__data()
+        conn = data._BaseData__conn  # type: ignore
+        data.execute("SELECT 1")
+        data.execute("SELECT 2")
+        self.assertEqual(conn.commit.call_count, 2)
+
+    def test_transaction(self) -> None:
+        data = self.__data()
+        conn = data._BaseData__conn  # type: ignore
+
+        # Only the end of the transaction should commit.
+        with transaction(conn):
+            data.execute("SELECT 1")
+            data.execute("SELECT 2")
+            self.assertEqual(conn.commit.call_count, 0)
+        self.assertEqual(conn.commit.call_count, 1)
+
+        # Blowing up should roll back everything instead.
+        with self.assertRaises(Exception):
+            with transaction(conn):
+                data.execute("SELECT 1")
+                self.__crash()
+        self.assertEqual(conn.commit.call_count, 1)
+        self.assertEqual(conn.rollback.call_count, 1)
+
+        # Statements after the transaction go back to committing on their own.
+        data.execute("SELECT 1")
+        self.assertEqual(conn.commit.call_count, 2)
+
+    def test_savepoint(self) -> None:
+        data = self.__data()
+        conn = data._BaseData__conn  # type: ignore
+
+        with transaction(conn):
+            with self.assertRaises(Exception):
+                with transaction(conn):
+                    data.execute("SELECT 1")
+                    self.__crash()
+            data.execute("SELECT 2")
+
+        # Only the savepoint should have been rolled back.
+        self.assertEqual(conn.begin_nested.call_count, 1)
+        self.assertEqual(conn.begin_nested.return_value.rollback.call_count, 1)
+        self.assertEqual(conn.rollback.call_count, 0)
+        self.assertEqual(conn.commit.call_count, 1)
+
+    def test_serialize(self) -> None:
+        data = self.__data()
+        blob = {
+            "name": "ソング",
+            "ghost": b"\x00\x01\xff",
+            "nested": {"ghosts": [b"", b"abc"], "plain": [1, 2, 3]},
+            "marker": "__bytes__",
+        }
+        expected = {**blob, "nested": {"ghosts": [b"", b"abc"], "plain": [1, 2, 3]}}
+
+        # Whatever the serializer is, it should round trip, and it should be able to
+        # read rows that were written with the standard library.
+        self.assertEqual(data.deserialize(data.serialize(blob)), expected)
+        self.assertEqual(data.deserialize(json.dumps(blob, cls=base._BytesEncoder)), expected)
+        self.assertEqual(data.deserialize('{"plain": [1, 2, 3]}'), {"plain": [1, 2, 3]})
+        self.assertEqual(data.deserialize(None), {})
+
+        # Integers that are too wide for orjson should still serialize.
+        self.assertEqual(json.loads(data.serialize({"huge": 2**70 + 1})), {"huge": 2**70 + 1})
+
+
+class TestSerializeBenchmark(ExtendedTestCase):
+    def __time(self, func: Callable[[], object]) -> float:
+        start = time.perf_counter()
+        for _ in range(20):
+            func()
+        return (time.perf_counter() - start) / 20
+
+    def __profile(self) -> Dict[str, Any]:
+        # Roughly the shape of a large game profile, with per-song extra data and a few ghosts.
+        return {
+            **{f"option_{i}": i for i in range(100)},
+            "name": "プレイヤー",
+            "achievements": list(range(1000)),
+            "songs": {
+                str(songid): {
+                    "clear": songid % 7,
+                    "rank": [songid % 3] * 10,
+                    "last": 1600000000 + songid,
+                }
+                for songid in range(1000)
+            },
+            "ghosts": [bytes(range(64)) for _ in range(4)],
+        }
+
+    def test_benchmark(self) -> None:
+        data = BaseData(Config({"database": {"read_only": False}}), Mock())
+        profile = self.__profile()
+
+        fast = base.orjson
+        try:
+            base.orjson = None
+            blob = data.serialize(profile)
+            self.assertEqual(data.deserialize(blob), profile)
+            python_serialize = self.__time(lambda: data.serialize(profile))
+            python_deserialize = self.__time(lambda: data.deserialize(blob))
+        finally:
+            base.orjson = fast
+        self.assertEqual(data.deserialize(data.serialize(profile)), profile)
+        default_serialize = self.__time(lambda: data.serialize(profile))
+        default_deserialize = self.__time(lambda: data.deserialize(blob))
+
+        if self.verbose:
+            name = "orjson" if fast is not None else "standard library"
+            print(f"Profile blob, {len(blob)} bytes")
+            print(
+                f"    standard library: serialize {python_serialize * 1000:.2f} ms, "
+                f"deserialize {python_deserialize * 1000:.2f} ms"
+            )
+            print(
+                f"    {name}: serialize {default_serialize * 1000:.2f} ms, deserialize {default_deserialize * 1000:.2f} ms"
+            )
@@ -0,0 +1,69 @@
+# vim: set fileencoding=utf-8
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+from flask_caching import Cache
+from flask_caching.backends.base import BaseCache
+
+from bemani.common.cache import TieredCache
+
+
+class TestCache(unittest.TestCase):
+    def test_tiered_cache(self) -> None:
+        app = Flask(__name__)
+        cache = Cache(
+            app,
+            config={
+                "CACHE_TYPE": "bemani.common.cache.TieredCache",
+                "CACHE_TIERED_REMOTE": "SimpleCache",
+                "CACHE_TIERED_LOCAL_SIZE": 2,
+                "CACHE_TIERED_LOCAL_TIMEOUT": 5,
+            },
+        )
+        with app.app_context():
+            tiered: BaseCache = cache.cache
+            assert isinstance(tiered, TieredCache)
+
+            calls = []
+
+            @cache.memoize(timeout=60)
+            def lookup(value: int) -> list:
+                calls.append(value)
+                return [value]
+
+            # The first call should go all the way through, and once the result has been read
+            # back from the remote tier the rest should be served locally.
+            self.assertEqual(lookup(1), [1])
+            self.assertEqual(lookup(1), [1])
+            remote_before = tiered.statistics()["remote"]
+            self.assertEqual(lookup(1), [1])
+            self.assertEqual(lookup(1), [1])
+            self.assertEqual(calls, [1])
+            self.assertEqual(tiered.statistics()["remote"], remote_before)
+
+            # Modifying what we got back shouldn't modify the cache.
+            lookup(1).append(2)
+            self.assertEqual(lookup(1), [1])
+
+            # Deleting through this process should drop both tiers.
+            cache.delete_memoized(lookup, 1)
+            self.assertEqual(lookup(1), [1])
+            self.assertEqual(calls, [1, 1])
+
+            # Writes made through this process should always be read back.
+            cache.set("key", "first")
+            self.assertEqual(cache.get("key"), "first")
+            cache.set("key", "second")
+            self.assertEqual(cache.get("key"), "second")
+
+            # Changes made elsewhere show up once the local copy expires.
+            tiered.remote.set("key", "third")
+            self.assertEqual(cache.get("key"), "second")
+            with patch("time.monotonic", return_value=10**9):
+                self.assertEqual(cache.get("key"), "third")
+
+            # The local tier shouldn't grow past its size.
+            cache.set_many({"a": 1, "b": 2, "c": 3})
+            self.assertEqual(cache.get_many("a", "b", "c"), [1, 2, 3])
+            self.assertEqual(tiered.statistics()["local"]["size"], 2)
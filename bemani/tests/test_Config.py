@@ -0,0 +1,39 @@
+# vim: set fileencoding=utf-8
+import unittest
+
+from bemani.data import Config
+
+
+class TestConfig(unittest.TestCase):
+    def test_overlay(self) -> None:
+        config = Config(
+            {
+                "paseli": {"enabled": True, "infinite": False},
+                "server": {"uri": "http://some.dummy.net/"},
+                "verbose": False,
+            }
+        )
+        overlay = config.overlay()
+
+        # Reads see the original values without copying anything.
+        self.assertTrue(overlay.paseli.enabled)
+        self.assertIs(overlay.get("paseli"), config.get("paseli"))
+
+        # Modifying a section or a top-level value only affects the overlay.
+        overlay["paseli"]["enabled"] = False
+        overlay["machine"] = {"pcbid": "012010000000DEADBEEF"}
+        overlay["verbose"] = True
+        self.assertFalse(overlay.paseli.enabled)
+        self.assertTrue(config.paseli.enabled)
+        self.assertEqual(overlay.machine.pcbid, "012010000000DEADBEEF")
+        self.assertNotIn("machine", config)
+        self.assertFalse(config["verbose"])
+        self.assertEqual(overlay.server.uri, "http://some.dummy.net/")
+
+        # An overlay of an overlay behaves the same way.
+        second = overlay.overlay()
+        second["server"]["uri"] = None
+        self.assertIsNone(second.server.uri)
+        self.assertEqual(overlay.server.uri, "http://some.dummy.net/")
+        self.assertEqual(config.server.uri, "http://some.dummy.net/")
+        self.assertFalse(second.paseli.enabled)
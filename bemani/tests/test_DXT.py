@@ -0,0 +1,93 @@
+# vim: set fileencoding=utf-8
+import os
+import random
+import time
+import unittest
+
+from bemani.format import dxt
+from bemani.format.dxt import DXTBuffer
+from bemani.format.tdxt import TDXT
+from bemani.tests.helpers import ExtendedTestCase
+
+
+class TestDXT(unittest.TestCase):
+    def __color(self) -> bytes:
+        # A color that survives being packed down to 565 and back.
+        r, g, b = random.randrange(32), random.randrange(64), random.randrange(32)
+        return bytes([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)])
+
+    def test_decompress(self) -> None:
+        fast = dxt.numpy
+        for width, height in [(4, 4), (32, 16), (10, 6)]:
+            for swap in [False, True]:
+                data = os.urandom((width // 4) * (height // 4) * 16)
+
+                # Make sure that both the numpy and fallback implementations agree.
+                outputs = []
+                for lib in [fast, None]:
+                    try:
+                        dxt.numpy = lib
+                        outputs.append(
+                            (
+                                DXTBuffer(width, height).DXT1Decompress(data[: (len(data) // 2)], swap=swap),
+                                DXTBuffer(width, height).DXT5Decompress(data, swap=swap),
+                            )
+                        )
+                    finally:
+                        dxt.numpy = fast
+                self.assertEqual(outputs[0], outputs[1])
+
+    def test_compress(self) -> None:
+        if dxt.numpy is None:
+            with self.assertRaises(Exception):
+                DXTBuffer(4, 4).DXT5Compress(b"\0" * 64)
+            return
+
+        # Blocks made up of two colors and two alpha values should survive exactly.
+        width, height = 32, 16
+        blocks = [
+            ([self.__color(), self.__color()], [random.randrange(256), random.randrange(256)])
+            for _ in range((width // 4) * (height // 4))
+        ]
+        choices = [[(random.randrange(2), random.randrange(2)) for _ in range(16)] for _ in blocks]
+        pixels = bytearray(width * height * 4)
+        for block, ((colors, alphas), picks) in enumerate(zip(blocks, choices)):
+            for pixel, (color, alpha) in enumerate(picks):
+                x = (block % (width // 4)) * 4 + (pixel % 4)
+                y = (block // (width // 4)) * 4 + (pixel // 4)
+                pixels[((y * width + x) * 4) : ((y * width + x) * 4 + 4)] = colors[color] + bytes([alphas[alpha]])
+        data = bytes(pixels)
+
+        for swap in [False, True]:
+            buf = DXTBuffer(width, height)
+            self.assertEqual(buf.DXT5Decompress(buf.DXT5Compress(data, swap=swap), swap=swap), data)
+            opaque = buf.DXT1Decompress(buf.DXT1Compress(data, swap=swap), swap=swap)
+            self.assertEqual(opaque[0::4], data[0::4])
+            self.assertEqual(opaque[1::4], data[1::4])
+            self.assertEqual(opaque[2::4], data[2::4])
+            self.assertEqual(opaque[3::4], b"\xff" * (width * height))
+
+
+class TestDXTBenchmark(ExtendedTestCase):
+    def __time(self, width: int, height: int, data: bytes) -> float:
+        start = time.perf_counter()
+        TDXT._rawToImg(width, height, 0x1A, "<", False, data)
+        return time.perf_counter() - start
+
+    def test_benchmark(self) -> None:
+        width, height = 256, 256
+        data = os.urandom(width * height)
+
+        fast = dxt.numpy
+        try:
+            dxt.numpy = None
+            python_time = self.__time(width, height, data)
+        finally:
+            dxt.numpy = fast
+        default_time = self.__time(width, height, data)
+
+        if self.verbose:
+            print(f"DXT5 {width}x{height} texture pure python: {python_time * 1000:.2f} ms")
+            print(
+                f"DXT5 {width}x{height} texture {'numpy' if fast is not None else 'pure python'}: {default_time * 1000:.2f} ms"
+            )
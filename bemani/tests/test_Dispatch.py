@@ -0,0 +1,97 @@
+# vim: set fileencoding=utf-8
+import threading
+import unittest
+from typing import Any, Dict, List, Optional
+from unittest.mock import Mock, patch
+
+from bemani.backend.dispatch import Dispatch
+from bemani.common import Parallel
+from bemani.data import Config, Machine
+from bemani.data.mysql.base import BaseData, transaction
+from bemani.protocol import Node
+from bemani.tests.helpers import FakeCursor
+
+
+class FakeSession:
+    """
+    Acts like a scoped session, where each thread gets its own connection and can
+    only see what other threads have committed.
+    """
+
+    def __init__(self) -> None:
+        self.committed: List[int] = []
+        self.__local = threading.local()
+
+    def __state(self) -> threading.local:
+        if not hasattr(self.__local, "info"):
+            self.__local.info = {}
+            self.__local.pending = []
+        return self.__local
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        return self.__state().info
+
+    def execute(self, sql: Any, params: Dict[str, Any]) -> FakeCursor:
+        if str(sql).startswith("INSERT"):
+            self.__state().pending.append(params["value"])
+            return FakeCursor([])
+        return FakeCursor([{"value": value} for value in self.committed + self.__state().pending])
+
+    def commit(self) -> None:
+        self.committed.extend(self.__state().pending)
+        self.__state().pending = []
+
+    def rollback(self) -> None:
+        self.__state().pending = []
+
+    def begin_nested(self) -> Mock:
+        return Mock()
+
+
+class FakeGame:
+    game = None
+    version = 1
+
+    def __init__(self, data: BaseData) -> None:
+        self.data = data
+
+    def __read(self) -> List[int]:
+        return [row["value"] for row in self.data.execute("SELECT value FROM test").mappings()]
+
+    def handle_test_write_request(self, request: Node) -> Node:
+        self.data.execute("INSERT INTO test (value) VALUES (:value)", {"value": 5})
+        first, second = Parallel.execute([self.__read, self.__read])
+        if first != [5] or second != [5]:
+            raise Exception("Cannot find our own write after saving to DB!")
+        return Node.void("test")
+
+
+class TestDispatch(unittest.TestCase):
+    def __dispatch(self, session: FakeSession) -> Dispatch:
+        data = Mock()
+        data.local.machine.get_cached_machine = Mock(
+            return_value=Machine(1, "0101020304050607080A", "", "", None, 10000, None, None, {})
+        )
+        data.transaction = Mock(side_effect=lambda: transaction(session))  # type: ignore
+        return Dispatch(Config({"database": {"read_only": False}}), data, False)
+
+    def __request(self) -> Node:
+        tree = Node.void("call")
+        tree.set_attribute("model", "LDJ:J:A:A:2015111100")
+        tree.set_attribute("srcid", "0101020304050607080A")
+        request = Node.void("test")
+        request.set_attribute("method", "write")
+        tree.add_child(request)
+        return tree
+
+    def test_parallel_reads_see_request_writes(self) -> None:
+        session = FakeSession()
+        data = BaseData(Config({"database": {"read_only": False}}), session)  # type: ignore
+        dispatch = self.__dispatch(session)
+
+        with patch("bemani.backend.dispatch.Base.create", Mock(return_value=FakeGame(data))):
+            response: Optional[Node] = dispatch.handle(self.__request())
+
+        self.assertIsNotNone(response)
+        self.assertEqual(session.committed, [5])
@@ -3,6 +3,8 @@ import unittest
 from unittest.mock import Mock
 
 from bemani.common import GameConstants
+from bemani.data import UserID
+from bemani.data.mysql.base import BaseData
 from bemani.data.mysql.game import GameData
 from bemani.tests.helpers import FakeCursor
 
@@ -52,3 +54,33 @@ class TestGameData(unittest.TestCase):
         self.assertTrue(
             "This event overlaps an existing one with start time 12345 and end time 12350" in str(context.exception)
         )
+
+    def test_put_settings_changes(self) -> None:
+        game = GameData(Mock(), None)
+        game.execute = Mock(return_value=FakeCursor([{"data": '{"total_plays": 5, "options": {"a": 1}}'}]))  # type: ignore
+        settings = game.get_settings(GameConstants.IIDX, UserID(1))
+        assert settings is not None
+        before = BaseData.write_statistics().get("game_settings", {"elided": 0, "partial": 0, "full": 0})
+
+        # Saving settings that didn't change shouldn't write anything.
+        game.execute = Mock(return_value=FakeCursor([{}]))  # type: ignore
+        game.put_settings(GameConstants.IIDX, UserID(1), settings)
+        game.execute.assert_not_called()  # type: ignore
+
+        # Saving settings that did change should only write what changed.
+        settings.replace_int("total_plays", 6)
+        game.put_settings(GameConstants.IIDX, UserID(1), settings)
+        sql, params = game.execute.call_args[0]  # type: ignore
+        self.assertIn("UPDATE game_settings SET data = JSON_SET(data, :setpath0, CAST(:setvalue0 AS JSON))", sql)
+        self.assertEqual(params["setvalue0"], "6")
+
+        # Saving them for somebody else should write the whole thing.
+        game.put_settings(GameConstants.IIDX, UserID(2), settings)
+        sql, params = game.execute.call_args[0]  # type: ignore
+        self.assertIn("INSERT INTO game_settings", sql)
+        self.assertEqual(params["userid"], 2)
+
+        after = BaseData.write_statistics()["game_settings"]
+        self.assertEqual(after["elided"], before["elided"] + 1)
+        self.assertEqual(after["partial"], before["partial"] + 1)
+        self.assertEqual(after["full"], before["full"] + 1)
@@ -0,0 +1,69 @@
+# vim: set fileencoding=utf-8
+import unittest
+from unittest.mock import Mock
+
+from bemani.common import APIConstants, GameConstants, Time, VersionConstants
+from bemani.data import Server
+from bemani.data.api.base import BaseGlobalData
+from bemani.data.api.music import GlobalMusicData
+
+
+class TestGlobalMusicData(unittest.TestCase):
+    def test_shared_servers(self) -> None:
+        BaseGlobalData._reset()
+        api = Mock()
+        api.get_servers_version = Mock(return_value="first")
+        api.get_all_servers = Mock(return_value=[Server(1, 0, "http://127.0.0.1", "token", True, True)])
+
+        # Every request should see the same clients without looking servers up again.
+        first = GlobalMusicData(api, Mock(), Mock()).clients
+        second = GlobalMusicData(api, Mock(), Mock()).clients
+        self.assertEqual(api.get_all_servers.call_count, 1)
+        self.assertIs(first[0], second[0])
+        self.assertEqual(first[0].base_uri, "http://127.0.0.1")
+
+        # Once an admin edits the servers, the next request should pick that up.
+        api.get_servers_version = Mock(return_value="second")
+        api.get_all_servers = Mock(return_value=[])
+        self.assertEqual(GlobalMusicData(api, Mock(), Mock()).clients, [])
+        self.assertEqual(api.get_all_servers.call_count, 1)
+
+        # Providers that can't tell us about edits should always look servers up.
+        api.get_servers_version = Mock(return_value=None)
+        GlobalMusicData(api, Mock(), Mock()).clients
+        GlobalMusicData(api, Mock(), Mock()).clients
+        self.assertEqual(api.get_all_servers.call_count, 3)
+        BaseGlobalData._reset()
+
+    def test_mirrored_statistics(self) -> None:
+        api = Mock()
+        api.get_remote_syncs = Mock(
+            return_value={
+                # Synced recently, so it should be read from the mirror.
+                1: Time.now() - Time.SECONDS_IN_MINUTE,
+                # The scheduler hasn't gotten to this in a while, so ask it directly.
+                2: Time.now() - Time.SECONDS_IN_DAY,
+            }
+        )
+        api.get_remote_statistics = Mock(return_value=[{"song": 1, "chart": 0, "plays": 5, "clears": 3, "combos": 1}])
+        mirrored = Mock(allow_stats=True)
+        stale = Mock(allow_stats=True)
+        stale.get_statistics = Mock(return_value=[{"song": 1, "chart": 0, "plays": 2, "clears": 1, "combos": 0}])
+        unsynced = Mock(allow_stats=True)
+        unsynced.get_statistics = Mock(return_value=[])
+        disabled = Mock(allow_stats=False)
+
+        music = GlobalMusicData(api, Mock(), Mock())
+        music._BaseGlobalData__apiclients = {1: mirrored, 2: stale, 3: unsynced, 4: disabled}  # type: ignore
+
+        rates = music.get_clear_rates(GameConstants.IIDX, VersionConstants.IIDX_PENDUAL)
+        self.assertEqual(rates, {1: {0: {"plays": 7, "clears": 4, "combos": 1}}})
+        api.get_remote_statistics.assert_called_once_with(
+            [1], GameConstants.IIDX, VersionConstants.IIDX_PENDUAL, None, None
+        )
+        mirrored.get_statistics.assert_not_called()
+        disabled.get_statistics.assert_not_called()
+        stale.get_statistics.assert_called_once_with(
+            GameConstants.IIDX, VersionConstants.IIDX_PENDUAL, APIConstants.ID_TYPE_SERVER, []
+        )
+        unsynced.get_statistics.assert_called_once()
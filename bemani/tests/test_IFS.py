@@ -0,0 +1,88 @@
+# vim: set fileencoding=utf-8
+import hashlib
+import os
+import struct
+import tempfile
+import unittest
+
+from bemani.format import IFS
+from bemani.protocol import Node
+from bemani.protocol.binary import BinaryEncoding
+from bemani.protocol.lz77 import Lz77
+
+
+class TestIFS(unittest.TestCase):
+    def __archive(self) -> bytes:
+        texturelist = (
+            b'<texturelist compress="avslz"><texture format="argb8888rev"><image name="tex"/></texture></texturelist>'
+        )
+        texture = b"\x01\x02\x03\x04" * 64
+        compressed = Lz77().compress(texture)
+        texture = struct.pack(">II", len(texture), len(compressed)) + compressed
+        texturename = "_" + hashlib.md5(b"tex").hexdigest()
+
+        files = [
+            ("hello_Etxt", b"hello"),
+            ("texturelist_Exml", texturelist),
+            (texturename, texture),
+        ]
+        entries = []
+        body = b""
+        for name, data in files:
+            entries.append(f'<{name} __type="3s32">{len(body)} {len(data)} 0</{name}>'.encode("ascii"))
+            body += data
+        header = b"<imgfs>" + entries[0] + b"<tex>" + b"".join(entries[1:]) + b"</tex></imgfs>\0"
+        index = 20 + len(header)
+        return struct.pack(">IHHIII", 0x6CAD8F89, 1, 0xFFFE, 0, len(header), index) + header + body
+
+    def test_read_files(self) -> None:
+        data = self.__archive()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "test.ifs")
+            with open(filename, "wb") as fp:
+                fp.write(data)
+
+            # Opening from disk should behave exactly like handing over the data.
+            with IFS.open(filename) as ifs:
+                files = list(ifs.read_files())
+            self.assertEqual(files, list(IFS(data).read_files()))
+
+        # Texture names should be fixed up, and compressed textures decompressed on read.
+        self.assertEqual(
+            [name for name, _ in files],
+            ["hello.txt", os.path.join("tex", "texturelist.xml"), os.path.join("tex", "tex")],
+        )
+        self.assertEqual(files[0][1], b"hello")
+        self.assertEqual(files[2][1], b"\x01\x02\x03\x04" * 64)
+
+    def test_referenced_archives_closed(self) -> None:
+        # An archive holding a single file that is actually stored in the archive above.
+        root = Node.void("imgfs")
+        super_ = Node.string("_super_", "test.ifs")
+        super_.add_child(Node.binary("md5", b"\0" * 16))
+        root.add_child(super_)
+        entry = Node(name="hello_Etxt", type=Node.NODE_TYPE_3S32, value=[0, 5, 0])
+        entry.add_child(Node.s32("i", 1))
+        root.add_child(entry)
+        header = BinaryEncoding().encode(root, "ascii")
+        data = struct.pack(">IHHIII", 0x6CAD8F89, 1, 0xFFFE, 0, len(header), 20 + len(header)) + header
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name, contents in [("test.ifs", self.__archive()), ("referencing.ifs", data)]:
+                with open(os.path.join(tmpdir, name), "wb") as fp:
+                    fp.write(contents)
+
+            opened = []
+
+            def load(name: str) -> IFS:
+                ifs = IFS.open(os.path.join(tmpdir, name))
+                opened.append(ifs)
+                return ifs
+
+            with IFS.open(os.path.join(tmpdir, "referencing.ifs"), reference_loader=load) as ifs:
+                self.assertEqual(ifs.read_file("hello.txt"), b"hello")
+                self.assertEqual(len(opened), 1)
+
+            # Closing the archive should also close the archive it loaded to read from.
+            self.assertTrue(opened[0]._IFS__data.closed)  # type: ignore
@@ -0,0 +1,123 @@
+# vim: set fileencoding=utf-8
+import unittest
+from unittest.mock import Mock
+
+from bemani.common import cache
+from bemani.data.mysql.machine import LookupCache, MachineData
+from bemani.tests.helpers import FakeCursor
+
+
+class TestMachineData(unittest.TestCase):
+    def setUp(self) -> None:
+        MachineData.machine_cache.invalidate()
+        MachineData.arcade_cache.invalidate()
+
+    def __machine_row(self, name: str) -> FakeCursor:
+        return FakeCursor(
+            [
+                {
+                    "name": name,
+                    "description": "",
+                    "arcadeid": None,
+                    "id": 1,
+                    "port": 10000,
+                    "game": None,
+                    "version": None,
+                    "data": "{}",
+                }
+            ]
+        )
+
+    def test_cached_machine(self) -> None:
+        machine = MachineData(Mock(), None)
+        machine.execute = Mock(return_value=self.__machine_row("first"))  # type: ignore
+        before = MachineData.lookup_cache_statistics()["machine"]
+
+        # Only the first lookup should go to the DB.
+        first = machine.get_cached_machine("012010000000DEADBEEF")
+        second = machine.get_cached_machine("012010000000DEADBEEF")
+        self.assertEqual(machine.execute.call_count, 1)  # type: ignore
+        self.assertIsNotNone(first)
+        self.assertIsNotNone(second)
+        self.assertEqual(first.name, "first")
+        self.assertEqual(second.name, "first")
+
+        # Modifying what we got back shouldn't modify the cache.
+        second.data.replace_int("touched", 1)
+        third = machine.get_cached_machine("012010000000DEADBEEF")
+        self.assertEqual(third.data.get_int("touched"), 0)
+
+        after = MachineData.lookup_cache_statistics()["machine"]
+        self.assertEqual(after["misses"], before["misses"] + 1)
+        self.assertEqual(after["hits"], before["hits"] + 2)
+
+        # Saving the machine should cause the next lookup to go to the DB.
+        machine.put_machine(third)
+        machine.execute = Mock(return_value=self.__machine_row("second"))  # type: ignore
+        fourth = machine.get_cached_machine("012010000000DEADBEEF")
+        self.assertEqual(machine.execute.call_count, 1)  # type: ignore
+        self.assertEqual(fourth.name, "second")
+
+    def test_cached_missing_machine(self) -> None:
+        machine = MachineData(Mock(), None)
+        machine.execute = Mock(return_value=FakeCursor([]))  # type: ignore
+
+        self.assertIsNone(machine.get_cached_machine("012010000000DEADBEEF"))
+        self.assertIsNone(machine.get_cached_machine("012010000000DEADBEEF"))
+        self.assertEqual(machine.execute.call_count, 1)  # type: ignore
+
+        machine.destroy_machine("012010000000DEADBEEF")
+        self.assertIsNone(machine.get_cached_machine("012010000000DEADBEEF"))
+        self.assertEqual(machine.execute.call_count, 3)  # type: ignore
+
+    def test_cached_machine_other_process(self) -> None:
+        machine = MachineData(Mock(), None)
+        machine.execute = Mock(return_value=FakeCursor([]))  # type: ignore
+        self.assertIsNone(machine.get_cached_machine("012010000000DEADBEEF"))
+        self.assertIsNone(machine.get_cached_machine("012010000000DEADBEEF"))
+        self.assertEqual(machine.execute.call_count, 1)  # type: ignore
+
+        # Another process (such as the frontend) registering the machine bumps the shared
+        # version, which should get the new machine picked up right away.
+        cache.set(MachineData.LOOKUP_CACHE_VERSION_KEY, "registered", timeout=0)
+        machine.execute = Mock(return_value=self.__machine_row("registered"))  # type: ignore
+        found = machine.get_cached_machine("012010000000DEADBEEF")
+        self.assertIsNotNone(found)
+        self.assertEqual(found.name, "registered")
+        self.assertEqual(machine.execute.call_count, 1)  # type: ignore
+
+    def test_lookup_cache_sync(self) -> None:
+        lookups = LookupCache(60, 2)
+        lookups.sync("first")
+        lookups.put("a", 1)
+        lookups.sync("first")
+        self.assertEqual(lookups.get("a"), (True, 1))
+
+        # Without a version, there's nothing to go on so entries are kept.
+        lookups.sync(None)
+        self.assertEqual(lookups.get("a"), (True, 1))
+
+        lookups.sync("second")
+        self.assertEqual(lookups.get("a"), (False, None))
+        self.assertEqual(lookups.statistics()["invalidations"], 1)
+
+    def test_lookup_cache_negative_expiry(self) -> None:
+        lookups = LookupCache(60, 2, negative_ttl=0)
+        lookups.put("a", None)
+        lookups.put("b", 2)
+        self.assertEqual(lookups.get("a"), (False, None))
+        self.assertEqual(lookups.get("b"), (True, 2))
+
+    def test_lookup_cache_expiry(self) -> None:
+        cache = LookupCache(0, 2)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), (False, None))
+
+        cache = LookupCache(60, 2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.put("c", 3)
+        self.assertEqual(cache.get("a"), (False, None))
+        self.assertEqual(cache.get("b"), (True, 2))
+        self.assertEqual(cache.get("c"), (True, 3))
+        self.assertEqual(cache.statistics()["size"], 2)
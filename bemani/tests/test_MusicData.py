@@ -0,0 +1,161 @@
+# vim: set fileencoding=utf-8
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from bemani.common import GameConstants, VersionConstants
+from bemani.data import Config, UserID
+from bemani.data.mysql.music import MusicData
+from bemani.tests.helpers import FakeCursor
+
+
+class TestMusicData(unittest.TestCase):
+    def __songs(self) -> FakeCursor:
+        return FakeCursor(
+            [
+                {
+                    "version": VersionConstants.IIDX_PENDUAL,
+                    "songid": 1000,
+                    "chart": chart,
+                    "name": "Song",
+                    "artist": "Artist",
+                    "genre": "Genre",
+                    "data": '{"difficulty": 5}',
+                }
+                for chart in range(3)
+            ]
+            + [
+                {
+                    "version": VersionConstants.IIDX_SPADA,
+                    "songid": 1000,
+                    "chart": 0,
+                    "name": "Song",
+                    "artist": "Artist",
+                    "genre": "Genre",
+                    "data": '{"difficulty": 4}',
+                },
+            ]
+        )
+
+    def test_song_catalog(self) -> None:
+        music = MusicData(Mock(), None)
+        music.execute = Mock(return_value=self.__songs())  # type: ignore
+        music.publish_catalog()
+
+        # Only the first lookup should go to the DB.
+        song = music.get_song(GameConstants.IIDX, VersionConstants.IIDX_PENDUAL, 1000, 2)
+        self.assertIsNotNone(song)
+        self.assertEqual(song.data.get_int("difficulty"), 5)
+        self.assertIsNone(music.get_song(GameConstants.IIDX, VersionConstants.IIDX_PENDUAL, 1000, 3))
+        self.assertEqual(len(music.get_all_songs(GameConstants.IIDX, VersionConstants.IIDX_PENDUAL)), 3)
+        self.assertEqual(len(music.get_all_songs(GameConstants.IIDX, VersionConstants.IIDX_SPADA)), 1)
+        self.assertEqual(len(music.get_all_songs(GameConstants.IIDX)), 4)
+        self.assertEqual(music.execute.call_count, 1)  # type: ignore
+
+        # Importing new songs should cause a reload.
+        music.publish_catalog()
+        music.get_song(GameConstants.IIDX, VersionConstants.IIDX_SPADA, 1000, 0)
+        self.assertEqual(music.execute.call_count, 2)  # type: ignore
+
+    def test_song_catalog_snapshot(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "catalog.pickle")
+            music = MusicData(Mock(), None)
+            music.execute = Mock(return_value=self.__songs())  # type: ignore
+            music.publish_catalog(filename)
+            MusicData.load_catalog_snapshot(filename)
+
+            # A worker starting up with a snapshot shouldn't need the DB at all.
+            music.execute = Mock(side_effect=Exception("Should not query the DB!"))  # type: ignore
+            song = music.get_song(GameConstants.IIDX, VersionConstants.IIDX_SPADA, 1000, 0)
+            self.assertIsNotNone(song)
+            self.assertEqual(song.data.get_int("difficulty"), 4)
+            self.assertEqual(len(music.get_all_songs(GameConstants.IIDX)), 4)
+
+    def __music(self) -> MusicData:
+        music = MusicData(Config({"database": {"read_only": False}}), None)
+        music.execute = Mock(return_value=FakeCursor([]))  # type: ignore
+        music._MusicData__get_musicid = Mock(return_value=5)  # type: ignore
+        return music
+
+    def __score(self, plays: int) -> FakeCursor:
+        return FakeCursor(
+            [
+                {
+                    "songid": 1000,
+                    "chart": 2,
+                    "points": 500,
+                    "userid": 1337,
+                    "scorekey": 1,
+                    "data": "{}",
+                    "timestamp": 10,
+                    "update": 20,
+                    "lid": 3,
+                    "plays": plays,
+                }
+            ]
+        )
+
+    def test_score_plays(self) -> None:
+        music = self.__music()
+        music.execute = Mock(return_value=self.__score(4))  # type: ignore
+        score = music.get_score(GameConstants.IIDX, VersionConstants.IIDX_PENDUAL, UserID(1337), 1000, 2)
+        self.assertIsNotNone(score)
+        self.assertEqual(score.plays, 4)
+
+        # The play count is kept on the score itself, so looking it up shouldn't count history.
+        sql = str(music.execute.call_args[0][0])  # type: ignore
+        self.assertIn("score.plays AS plays", sql)
+        self.assertNotIn("score_history", sql)
+
+    def test_record_plays(self) -> None:
+        music = self.__music()
+        music.execute = Mock(return_value=self.__score(12))  # type: ignore
+        records = music.get_all_records(GameConstants.IIDX, VersionConstants.IIDX_PENDUAL)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0][0], UserID(1337))
+        self.assertEqual(records[0][1].plays, 12)
+
+        # Plays for a record are every attempt on the chart, which comes from the chart statistics.
+        # A chart without statistics yet still needs to show up, with no plays.
+        sql = str(music.execute.call_args[0][0])  # type: ignore
+        self.assertIn("LEFT JOIN score_stats ON score_stats.musicid = score.musicid", sql)
+        self.assertIn("COALESCE(score_stats.attempts, 0) AS plays", sql)
+        self.assertNotIn("score_history", sql)
+
+    def test_put_score_seeds_plays(self) -> None:
+        for new_record in [True, False]:
+            music = self.__music()
+            music.put_score(GameConstants.IIDX, 1, UserID(1337), 1000, 2, 3, 500, {}, new_record, timestamp=10)
+            self.assertEqual(music.execute.call_count, 1)  # type: ignore
+
+            # A new score counts the attempts saved before it, an existing score keeps its count.
+            sql, params = music.execute.call_args[0]  # type: ignore
+            inserted, updated = str(sql).split("ON DUPLICATE KEY UPDATE")
+            self.assertIn(
+                "(SELECT COUNT(timestamp) FROM score_history WHERE userid = :userid AND musicid = :musicid)",
+                inserted,
+            )
+            self.assertNotIn("plays", updated)
+            self.assertEqual(params["userid"], 1337)
+            self.assertEqual(params["musicid"], 5)
+
+    def test_put_attempt_counts_play(self) -> None:
+        music = self.__music()
+        music.put_attempt(GameConstants.IIDX, 1, UserID(1337), 1000, 2, 3, 500, {}, False, timestamp=10)
+
+        # The attempt, then the chart statistics, then the play count on the user's score.
+        statements = [str(call[0][0]) for call in music.execute.call_args_list]  # type: ignore
+        self.assertEqual(len(statements), 3)
+        self.assertIn("score_history", statements[0])
+        self.assertIn("score_stats", statements[1])
+        self.assertIn("UPDATE score SET plays = plays + 1", statements[2])
+        self.assertEqual(music.execute.call_args_list[2][0][1], {"userid": 1337, "musicid": 5})  # type: ignore
+
+        # Anonymous attempts have no score to count against.
+        music = self.__music()
+        music.put_attempt(GameConstants.IIDX, 1, None, 1000, 2, 3, 500, {}, False, timestamp=10)
+        statements = [str(call[0][0]) for call in music.execute.call_args_list]  # type: ignore
+        self.assertEqual(len(statements), 2)
+        self.assertFalse(any("plays = plays + 1" in statement for statement in statements))
@@ -1,5 +1,6 @@
 # vim: set fileencoding=utf-8
 from abc import ABC
+import threading
 import unittest
 
 from bemani.common import Parallel
@@ -100,3 +101,82 @@ class TestParallel(unittest.TestCase):
     def test_flatten(self) -> None:
         results = Parallel.flatten([[1, 2, 3], [4, 5, 6], [7, 8, 9], []])
         self.assertEqual(results, [1, 2, 3, 4, 5, 6, 7, 8, 9])
+
+    def test_nested(self) -> None:
+        # Nesting far more work than there are workers shouldn't deadlock.
+        def inner(x: int) -> int:
+            return sum(Parallel.map(lambda y: x * y, [1, 2]))
+
+        def outer(x: int) -> int:
+            return sum(Parallel.map(inner, [x] * (Parallel.MAX_WORKERS * 2)))
+
+        results = Parallel.map(outer, list(range(Parallel.MAX_WORKERS * 2)))
+        self.assertEqual(results, [x * 3 * Parallel.MAX_WORKERS * 2 for x in range(Parallel.MAX_WORKERS * 2)])
+
+    def test_exception(self) -> None:
+        def fun(x: int) -> int:
+            if x == 3:
+                raise ValueError("Bad value!")
+            return x
+
+        with self.assertRaises(ValueError):
+            Parallel.map(fun, [1, 2, 3, 4, 5])
+
+        # Nothing should be left queued or running once the call returns.
+        stats = Parallel.statistics()
+        self.assertEqual(stats["queued"], 0)
+        self.assertEqual(stats["running"], 0)
+
+    def test_statistics(self) -> None:
+        before = Parallel.statistics()
+        Parallel.execute([lambda: 1, lambda: 2, lambda: 3])
+        Parallel.execute([lambda: 4])
+        after = Parallel.statistics()
+
+        self.assertEqual(after["tasks"] - before["tasks"], 4)
+        self.assertGreaterEqual(after["inline"] - before["inline"], 1)
+        self.assertEqual(after["queued"], 0)
+        self.assertEqual(after["running"], 0)
+
+    def test_serial(self) -> None:
+        caller = threading.get_ident()
+
+        def fun(x: int) -> int:
+            self.assertEqual(threading.get_ident(), caller)
+            return sum(Parallel.map(lambda y: x * y, [1, 2]))
+
+        with Parallel.serial():
+            results = Parallel.map(fun, [1, 2, 3, 4, 5])
+            with self.assertRaises(ValueError):
+                Parallel.execute([lambda: 1, lambda: int("bad"), lambda: 3])
+        self.assertEqual(results, [3, 6, 9, 12, 15])
+
+        # Nothing should be left queued, and calls go back to the pool afterwards.
+        self.assertEqual(Parallel.statistics()["queued"], 0)
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait() -> int:
+            barrier.wait()
+            return threading.get_ident()
+
+        threads = Parallel.execute([wait, wait])
+        self.assertEqual(len(set(threads)), 2)
+
+    def test_serial_offloadable(self) -> None:
+        caller = threading.get_ident()
+        barrier = threading.Barrier(2, timeout=5)
+
+        @Parallel.offloadable
+        def remote(x: int) -> int:
+            # Both of these have to be running at once to get past the barrier.
+            barrier.wait()
+            return x
+
+        def local(x: int) -> int:
+            self.assertEqual(threading.get_ident(), caller)
+            return -x
+
+        with Parallel.serial():
+            self.assertEqual(Parallel.call([local, remote, remote, local], 2), [-2, 2, 2, -2])
+            self.assertEqual(Parallel.map(remote, [3, 4]), [3, 4])
+        self.assertEqual(Parallel.statistics()["queued"], 0)
@@ -1,8 +1,15 @@
 # vim: set fileencoding=utf-8
+import os
 import random
+import time
 import unittest
+from typing import Callable
 
+from bemani.protocol import rc4
+from bemani.protocol.node import Node
 from bemani.protocol.protocol import EAmuseProtocol
+from bemani.protocol.rc4 import RC4
+from bemani.tests.helpers import ExtendedTestCase
 
 
 class TestRC4Cipher(unittest.TestCase):
@@ -39,3 +46,42 @@ class TestRC4Cipher(unittest.TestCase):
 
         plaintext = proto.rc4_crypt(cyphertext, key)
         self.assertEqual(data, plaintext)
+
+
+class TestRC4Benchmark(ExtendedTestCase):
+    def __time(self, crypt: Callable[[bytes], bytes], data: bytes) -> float:
+        start = time.perf_counter()
+        for _ in range(5):
+            crypt(data)
+        return (time.perf_counter() - start) / 5
+
+    def test_benchmark(self) -> None:
+        data = os.urandom(256 * 1024)
+        key = os.urandom(16)
+        proto = EAmuseProtocol()
+
+        # Make sure that both the native and fallback implementations agree.
+        native = rc4.clib
+        try:
+            rc4.clib = None
+            python_time = self.__time(RC4(key).crypt, data)
+            python_output = RC4(key).crypt(data)
+        finally:
+            rc4.clib = native
+        default_time = self.__time(RC4(key).crypt, data)
+        self.assertEqual(python_output, RC4(key).crypt(data))
+        self.assertEqual(python_output, proto.rc4_crypt(data, key))
+
+        # Make sure that reusing a cached key schedule costs nothing extra.
+        encryption_key = "1-5a0b1c2d-3e4f"
+        start = time.perf_counter()
+        for _ in range(1000):
+            proto.encode(None, encryption_key, Node.void("response"), "shift-jis", EAmuseProtocol.XML)
+        cached_time = (time.perf_counter() - start) / 1000
+
+        if self.verbose:
+            print(f"RC4 pure python: {len(data) / python_time / 1024 / 1024:.2f} MiB/s")
+            print(
+                f"RC4 {'native' if native is not None else 'pure python'}: {len(data) / default_time / 1024 / 1024:.2f} MiB/s"
+            )
+            print(f"Small encrypted XML packet with cached key: {cached_time * 1000000:.2f} us")
@@ -0,0 +1,101 @@
+# vim: set fileencoding=utf-8
+import unittest
+from unittest.mock import Mock
+
+from bemani.common import GameConstants, Profile, VersionConstants
+from bemani.data import UserID
+from bemani.data.mysql.user import UserData
+from bemani.tests.helpers import FakeCursor
+
+
+class TestUserData(unittest.TestCase):
+    def test_get_any_profiles(self) -> None:
+        user = UserData(Mock(), None)
+        user.execute = Mock(  # type: ignore
+            return_value=FakeCursor(
+                [
+                    {
+                        "userid": 1,
+                        "version": VersionConstants.IIDX_PENDUAL,
+                        "refid": "A" * 16,
+                        "extid": 12345678,
+                        "data": '{"name": "PLAYER", "sgrade": 5, "dgrade": null}',
+                    },
+                    {
+                        "userid": 3,
+                        "version": VersionConstants.IIDX_SPADA,
+                        "refid": "B" * 16,
+                        "extid": 87654321,
+                        "data": '{"name": "OTHER", "sgrade": null, "dgrade": null}',
+                    },
+                ]
+            )
+        )
+
+        profiles = user.get_any_profiles(
+            GameConstants.IIDX,
+            VersionConstants.IIDX_PENDUAL,
+            [UserID(1), UserID(2), UserID(3)],
+            keys=["name", "sgrade", "dgrade"],
+        )
+
+        # Everything should come from one query, pulling out only the keys we asked for.
+        self.assertEqual(user.execute.call_count, 1)  # type: ignore
+        sql, params = user.execute.call_args[0]  # type: ignore
+        self.assertIn("JSON_OBJECT", sql)
+        self.assertEqual([params[f"path{i}"] for i in range(3)], ['$."name"', '$."sgrade"', '$."dgrade"'])
+
+        self.assertEqual([userid for userid, _ in profiles], [1, 2, 3])
+        first, missing, second = [profile for _, profile in profiles]
+        self.assertIsNone(missing)
+        assert first is not None and second is not None
+        self.assertEqual(first, {"name": "PLAYER", "sgrade": 5})
+        self.assertEqual(first.extid, 12345678)
+        self.assertEqual(first.get_int("dgrade", -1), -1)
+        self.assertEqual(second, {"name": "OTHER"})
+        self.assertEqual(second.version, VersionConstants.IIDX_SPADA)
+
+        with self.assertRaises(Exception):
+            user.get_any_profiles(GameConstants.IIDX, VersionConstants.IIDX_PENDUAL, [UserID(1)], keys=['name"'])
+
+    def test_put_profile_changes(self) -> None:
+        user = UserData(Mock(), None)
+        user.get_refid = Mock(return_value="A" * 16)  # type: ignore
+        user.execute = Mock(  # type: ignore
+            return_value=FakeCursor(
+                [{"refid": "A" * 16, "extid": 12345678, "data": '{"name": "PLAYER", "old": 1, "stuff": [1, 2]}'}]
+            )
+        )
+        profile = user.get_profile(GameConstants.IIDX, VersionConstants.IIDX_PENDUAL, UserID(1))
+        assert profile is not None
+
+        # Saving a profile that didn't change shouldn't write anything.
+        user.execute = Mock(return_value=FakeCursor([{}]))  # type: ignore
+        user.put_profile(GameConstants.IIDX, VersionConstants.IIDX_PENDUAL, UserID(1), profile)
+        user.execute.assert_not_called()  # type: ignore
+
+        # Saving a profile that did change should only write what changed, including
+        # changes made in place to nested values.
+        profile["stuff"].append(3)
+        del profile["old"]
+        user.put_profile(GameConstants.IIDX, VersionConstants.IIDX_PENDUAL, UserID(1), profile)
+        self.assertEqual(user.execute.call_count, 1)  # type: ignore
+        sql, params = user.execute.call_args[0]  # type: ignore
+        self.assertIn("JSON_REMOVE", sql)
+        self.assertIn("JSON_SET", sql)
+        self.assertEqual(params["removepath0"], '$."old"')
+        self.assertEqual(params["setpath0"], '$."stuff"')
+        self.assertEqual(params["setvalue0"], user.serialize([1, 2, 3]))  # type: ignore
+        self.assertNotIn("setpath1", params)
+
+        # Saving again shouldn't write the same changes twice.
+        user.put_profile(GameConstants.IIDX, VersionConstants.IIDX_PENDUAL, UserID(1), profile)
+        self.assertEqual(user.execute.call_count, 1)  # type: ignore
+
+        # Brand new profiles are written out in full.
+        new = Profile(GameConstants.IIDX, VersionConstants.IIDX_PENDUAL, "", 0, {"name": "NEW"})
+        user.get_extid = Mock(return_value=12345678)  # type: ignore
+        user.put_profile(GameConstants.IIDX, VersionConstants.IIDX_PENDUAL, UserID(1), new)
+        sql, params = user.execute.call_args[0]  # type: ignore
+        self.assertIn("INSERT INTO profile", sql)
+        self.assertEqual(new.refid, "A" * 16)
@@ -278,3 +278,23 @@ class TestValidatedDict(unittest.TestCase):
         self.assertEqual(validict.get_int("int2"), 1)
         validict.increment_int("int3")
         self.assertEqual(validict.get_int("int3"), 1)
+
+    def test_clone(self) -> None:
+        # Verify clone is a deep copy that keeps types and where it was loaded from
+        inner = ValidatedDict({"yay": "bla"})
+        validict = ValidatedDict(
+            {
+                "dict": {"list": [1, 2, {"nested": True}]},
+                "bytes": b"\x01\x02",
+                "inner": inner,
+            }
+        )
+        validict.original = '{"dict": {}}'
+        clone = validict.clone()
+        self.assertEqual(clone, validict)
+        self.assertEqual(clone.original, validict.original)
+        self.assertIsInstance(clone["inner"], ValidatedDict)
+        clone["dict"]["list"][2]["nested"] = False
+        clone["inner"].replace_str("yay", "boo")
+        self.assertEqual(validict["dict"]["list"][2]["nested"], True)
+        self.assertEqual(inner.get_str("yay"), "bla")
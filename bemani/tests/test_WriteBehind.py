@@ -0,0 +1,194 @@
+# vim: set fileencoding=utf-8
+import io
+import unittest
+from contextlib import redirect_stdout
+from typing import Any
+from unittest.mock import Mock
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from bemani.common import GameConstants
+from bemani.data import Config, ScoreSaveException, UserID
+from bemani.data.mysql.base import WriteBehind, transaction
+from bemani.data.mysql.music import MusicData
+from bemani.data.mysql.network import NetworkData
+from bemani.tests.helpers import FakeCursor
+
+
+class TestWriteBehind(unittest.TestCase):
+    def __config(self) -> Config:
+        return Config({"database": {"read_only": False}})
+
+    def test_events_written_together(self) -> None:
+        conn = Mock()
+        conn.info = {}
+        conn.execute = Mock(return_value=FakeCursor([]))
+        queue = WriteBehind()
+        network = NetworkData(self.__config(), conn, queue)
+
+        # Nothing should be written until the request is finished.
+        network.put_event("pcbevent", {"event": 1}, timestamp=1)
+        network.put_event("pcbevent", {"event": 2}, timestamp=2)
+        self.assertEqual(conn.execute.call_count, 0)
+        self.assertFalse(queue.due())
+        self.assertTrue(queue.due(end_of_request=True))
+
+        # Both rows should go to the DB as part of a single statement.
+        queue.flush(conn)
+        self.assertEqual(conn.execute.call_count, 1)
+        self.assertEqual(conn.commit.call_count, 1)
+        rows = conn.execute.call_args[0][1]
+        self.assertEqual([row["ts"] for row in rows], [1, 2])
+        self.assertFalse(queue.due(end_of_request=True))
+
+    def test_read_flushes_queue(self) -> None:
+        conn = Mock()
+        conn.info = {}
+        conn.execute = Mock(return_value=FakeCursor([]))
+        queue = WriteBehind()
+        network = NetworkData(self.__config(), conn, queue)
+
+        # Looking at an unrelated table shouldn't write anything.
+        network.put_event("pcbevent", {}, timestamp=1)
+        network.get_all_news()
+        self.assertEqual(conn.execute.call_count, 1)
+
+        # Looking at the audit log should see the queued event.
+        network.get_events()
+        self.assertEqual(conn.execute.call_count, 3)
+        self.assertEqual(len(conn.execute.call_args_list[1][0][1]), 1)
+
+    def test_duplicate_attempt(self) -> None:
+        conn = Mock()
+        conn.info = {}
+        queue = WriteBehind()
+        music = MusicData(self.__config(), conn, queue)
+        music._MusicData__get_musicid = Mock(return_value=5)  # type: ignore
+
+        music.put_attempt(GameConstants.DDR, 1, UserID(1337), 1, 0, 1, 100, {}, False, timestamp=10)
+        with self.assertRaises(ScoreSaveException):
+            music.put_attempt(GameConstants.DDR, 1, UserID(1337), 1, 0, 1, 100, {}, False, timestamp=10)
+        music.put_attempt(GameConstants.DDR, 1, UserID(1337), 1, 0, 1, 100, {}, False, timestamp=11)
+
+        # Nothing, not even the play count on the user's score, should be written right away.
+        self.assertEqual(conn.execute.call_count, 0)
+
+        # One statement each for score history, stats and play counts, with two rows each.
+        queue.flush(conn)
+        self.assertEqual(conn.execute.call_count, 3)
+        self.assertEqual([len(call[0][1]) for call in conn.execute.call_args_list], [2, 2, 2])
+
+    def test_read_only(self) -> None:
+        conn = Mock()
+        conn.info = {}
+        network = NetworkData(Config({"database": {"read_only": True}}), conn, WriteBehind())
+        with self.assertRaises(Exception):
+            network.put_event("pcbevent", {})
+
+    def test_colliding_attempt_skips_stats(self) -> None:
+        conn = Mock()
+        conn.info = {}
+        queue = WriteBehind()
+        music = MusicData(self.__config(), conn, queue)
+        music._MusicData__get_musicid = Mock(return_value=5)  # type: ignore
+        music.put_attempt(GameConstants.DDR, 1, UserID(1337), 1, 0, 1, 100, {}, False, timestamp=10)
+        music.put_attempt(GameConstants.DDR, 1, UserID(1337), 1, 0, 1, 200, {}, False, timestamp=11)
+
+        # Pretend the first attempt was already written by an earlier flush.
+        def execute(sql: Any, params: Any) -> FakeCursor:
+            if "score_history" in str(sql) and (isinstance(params, list) or params["timestamp"] == 10):
+                raise IntegrityError("INSERT", params, Exception("Duplicate entry"))
+            return FakeCursor([])
+
+        conn.execute = Mock(side_effect=execute)
+        queue.flush(conn)
+
+        # Only the attempt that was written should be counted in the stats and play count.
+        stats = [call[0][1] for call in conn.execute.call_args_list if "score_stats" in str(call[0][0])]
+        self.assertEqual(len(stats), 1)
+        self.assertEqual([row["points"] for row in stats[0]], [200])
+        plays = [call[0][1] for call in conn.execute.call_args_list if "plays = plays + 1" in str(call[0][0])]
+        self.assertEqual(len(plays), 1)
+        self.assertEqual(len(plays[0]), 1)
+
+    def test_failed_flush_keeps_rows(self) -> None:
+        conn = Mock()
+        conn.info = {}
+        conn.execute = Mock(side_effect=OperationalError("INSERT", {}, Exception("Lost connection")))
+        queue = WriteBehind()
+        network = NetworkData(self.__config(), conn, queue)
+        network.put_event("pcbevent", {"event": 1}, timestamp=1)
+        network.put_event("pcbevent", {"event": 2}, timestamp=2)
+
+        # Losing the connection shouldn't raise or lose anything.
+        with redirect_stdout(io.StringIO()):
+            queue.flush(conn)
+        self.assertTrue(queue.due(end_of_request=True))
+        self.assertTrue(queue.references("SELECT * FROM audit"))
+
+        # Once the connection is back, the rows should be written.
+        conn.execute = Mock(return_value=FakeCursor([]))
+        queue.flush(conn)
+        self.assertEqual([row["ts"] for row in conn.execute.call_args[0][1]], [1, 2])
+        self.assertFalse(queue.due(end_of_request=True))
+
+        # Rows that never make it are eventually dropped instead of piling up forever.
+        conn.execute = Mock(side_effect=OperationalError("INSERT", {}, Exception("Lost connection")))
+        network.put_event("pcbevent", {"event": 3}, timestamp=3)
+        with redirect_stdout(io.StringIO()):
+            for _ in range(WriteBehind.MAX_FAILURES):
+                queue.flush(conn)
+        self.assertFalse(queue.due(end_of_request=True))
+
+    def test_rolled_back_rows_discarded(self) -> None:
+        conn = Mock()
+        conn.info = {}
+        conn.execute = Mock(return_value=FakeCursor([]))
+        queue = WriteBehind()
+        network = NetworkData(self.__config(), conn, queue)
+
+        # A request that fails part way shouldn't leave any of its rows behind.
+        with self.assertRaises(Exception):
+            with transaction(conn):
+                network.put_event("pcbevent", {"event": 1}, timestamp=1)
+                raise Exception("Handler blew up!")
+        self.assertFalse(queue.due(end_of_request=True))
+        self.assertFalse(queue.references("SELECT * FROM audit"))
+
+        # Rows are only handed to the flusher once the request's transaction commits.
+        with transaction(conn):
+            network.put_event("pcbevent", {"event": 2}, timestamp=2)
+            with self.assertRaises(Exception):
+                with transaction(conn):
+                    network.put_event("pcbevent", {"event": 3}, timestamp=3)
+                    raise Exception("Savepoint blew up!")
+            self.assertFalse(queue.due(end_of_request=True))
+        self.assertTrue(queue.due(end_of_request=True))
+
+        queue.flush(conn)
+        self.assertEqual([row["ts"] for row in conn.execute.call_args[0][1]], [2])
+        self.assertFalse(queue.due(end_of_request=True))
+
+    def test_read_inside_transaction(self) -> None:
+        conn = Mock()
+        conn.info = {}
+        conn.execute = Mock(return_value=FakeCursor([]))
+        queue = WriteBehind(interval=60.0)
+        network = NetworkData(self.__config(), conn, queue)
+
+        # Leave a row from an earlier request waiting on the flush interval.
+        with transaction(conn):
+            network.put_event("pcbevent", {"event": 1}, timestamp=1)
+
+        # Reading inside a transaction writes that transaction's rows, and nothing else,
+        # so that rolling it back can't lose the earlier request's row.
+        with self.assertRaises(Exception):
+            with transaction(conn):
+                network.put_event("pcbevent", {"event": 2}, timestamp=2)
+                network.get_events()
+                self.assertEqual([row["ts"] for row in conn.execute.call_args_list[0][0][1]], [2])
+                raise Exception("Handler blew up!")
+
+        conn.execute.reset_mock()
+        queue.flush(conn)
+        self.assertEqual([row["ts"] for row in conn.execute.call_args[0][1]], [1])
@@ -1,30 +1,48 @@
 # vim: set fileencoding=utf-8
 import os
 import random
+import time
 import unittest
+from typing import Callable
 
-from bemani.protocol.lz77 import Lz77, Lz77Decompress
-from bemani.tests.helpers import get_fixture
+from bemani.protocol import lz77
+from bemani.protocol.lz77 import Lz77, Lz77Decompress, LzException
+from bemani.tests.helpers import ExtendedTestCase, get_fixture
 
 
 class TestLZ77Decompressor(unittest.TestCase):
-    def test_ringbuffer_fuzz(self) -> None:
-        dec = Lz77Decompress(b"")
+    def test_backrefs(self) -> None:
+        # An overlapping backref should repeat what it references.
+        self.assertEqual(b"".join(Lz77Decompress(b"\x07abc\x006\x00\x00").decompress_bytes()), b"abcabcabcabc")
 
-        for _ in range(100):
-            amount = random.randint(1, Lz77Decompress.RING_LENGTH)
-            data = os.urandom(amount)
+        # A backref before the start of the stream should read zeros.
+        self.assertEqual(b"".join(Lz77Decompress(b"\x00\x10\x05\x00\x00").decompress_bytes()), b"\x00" * 8)
 
-            # Save our ring position, write a chunk of data
-            readpos = dec.write_pos
-            dec._ring_write(data)
+        with self.assertRaises(LzException):
+            b"".join(Lz77Decompress(b"\x00\x10").decompress_bytes())
 
-            # Read a chunk of data back from that buffer, see its the same
-            newdata = b"".join(dec._ring_read(readpos, amount))
-            self.assertEqual(data, newdata)
+    def test_streaming(self) -> None:
+        data = b"".join(random.choice([b"abc", b"defg", os.urandom(5)]) for _ in range(24 * 1024))
+        compresseddata = Lz77().compress(data)
 
-            # Verify integrity of ringbuffer
-            self.assertEqual(len(dec.ring), Lz77Decompress.RING_LENGTH)
+        # Chunks should come out as we go without holding onto all of the output.
+        chunks = list(Lz77Decompress(compresseddata).decompress_bytes())
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b"".join(chunks), data)
+
+        # Bytearrays should be appended to, growing as needed and trimmed to fit.
+        for buf in [bytearray(b"header"), bytearray(len(data) + 6), bytearray(10)]:
+            self.assertEqual(Lz77().decompress_into(compresseddata, buf, 6), len(data))
+            self.assertEqual(len(buf), len(data) + 6)
+            self.assertEqual(buf[6:], data)
+        self.assertEqual(Lz77().decompress(compresseddata, size=len(data)), data)
+
+        # Preallocated buffers should be written into, and never overrun.
+        buf = bytearray(len(data) + 6)
+        self.assertEqual(Lz77().decompress_into(compresseddata, memoryview(buf)[6:]), len(data))
+        self.assertEqual(buf[6:], data)
+        with self.assertRaises(LzException):
+            Lz77().decompress_into(compresseddata, memoryview(bytearray(len(data) - 1)))
 
 
 class TestLz77RealCompressor(unittest.TestCase):
@@ -91,6 +109,29 @@ class TestLz77RealCompressor(unittest.TestCase):
         decompresseddata = lz77.decompress(compresseddata)
         self.assertEqual(data, decompresseddata)
 
+    def test_fuzz(self) -> None:
+        native = lz77.clib
+        for _ in range(50):
+            # Mix repeats in with noise so that we get backrefs of every length and distance.
+            data = b"".join(
+                random.choice([os.urandom(random.randint(1, 8)), bytes([random.randint(0, 3)]) * random.randint(1, 40)])
+                for _ in range(random.randint(0, 400))
+            )
+            level = random.choice([Lz77.LEVEL_FAST, Lz77.LEVEL_DEFAULT, Lz77.LEVEL_MAX, random.randint(1, 100)])
+            lz = Lz77(level=level)
+
+            outputs = [lz.compress(data)]
+            if native is not None:
+                try:
+                    lz77.clib = None
+                    outputs.append(lz.compress(data))
+                finally:
+                    lz77.clib = native
+
+            for compresseddata in outputs:
+                self.assertEqual(lz.decompress(compresseddata), data)
+                self.assertEqual(b"".join(Lz77Decompress(compresseddata).decompress_bytes()), data)
+
     def test_known_compression(self) -> None:
         """
         Specifically tests for ability to compress an overlap,
@@ -103,3 +144,64 @@ class TestLz77RealCompressor(unittest.TestCase):
 
         decompresseddata = lz77.decompress(compresseddata)
         self.assertEqual(data, decompresseddata)
+
+
+class TestLz77Benchmark(ExtendedTestCase):
+    def __time(self, func: Callable[[], object], data: bytes) -> float:
+        start = time.perf_counter()
+        for _ in range(3):
+            func()
+        return len(data) * 3 / (time.perf_counter() - start) / 1024 / 1024
+
+    def test_benchmark(self) -> None:
+        data = b"".join(get_fixture(name) for name in ["declaration.txt", "lorem.txt", "rawdata"]) * 4
+        compresseddata = Lz77().compress(data)
+        out = memoryview(bytearray(len(data)))
+
+        # Make sure that both the native and fallback implementations agree.
+        native = lz77.clib
+        try:
+            lz77.clib = None
+            python_time = self.__time(lambda: Lz77().decompress(compresseddata), data)
+            python_streaming_time = self.__time(
+                lambda: b"".join(Lz77Decompress(compresseddata).decompress_bytes()), data
+            )
+            python_into_time = self.__time(lambda: Lz77().decompress_into(compresseddata, out), data)
+            self.assertEqual(Lz77().decompress(compresseddata), data)
+        finally:
+            lz77.clib = native
+        default_time = self.__time(lambda: Lz77().decompress(compresseddata), data)
+        default_into_time = self.__time(lambda: Lz77().decompress_into(compresseddata, out), data)
+        self.assertEqual(Lz77().decompress(compresseddata), data)
+        self.assertEqual(out, data)
+
+        if self.verbose:
+            impl = "native" if native is not None else "pure python"
+            print(f"Lz77 pure python: {python_time:.2f} MiB/s")
+            print(f"Lz77 pure python streaming: {python_streaming_time:.2f} MiB/s")
+            print(f"Lz77 pure python into preallocated buffer: {python_into_time:.2f} MiB/s")
+            print(f"Lz77 {impl}: {default_time:.2f} MiB/s")
+            print(f"Lz77 {impl} into preallocated buffer: {default_into_time:.2f} MiB/s")
+
+    def test_compress_benchmark(self) -> None:
+        data = b"".join(get_fixture(name) for name in ["declaration.txt", "lorem.txt", "rawdata"]) * 4
+        native = lz77.clib
+
+        for level, name in [(Lz77.LEVEL_FAST, "fast"), (Lz77.LEVEL_DEFAULT, "default"), (Lz77.LEVEL_MAX, "max")]:
+            lz = Lz77(level=level)
+            try:
+                lz77.clib = None
+                python_time = self.__time(lambda: lz.compress(data), data)
+                python_size = len(lz.compress(data))
+                self.assertEqual(lz.decompress(lz.compress(data)), data)
+            finally:
+                lz77.clib = native
+            default_time = self.__time(lambda: lz.compress(data), data)
+            self.assertEqual(lz.decompress(lz.compress(data)), data)
+
+            if self.verbose:
+                impl = "native" if native is not None else "pure python"
+                print(
+                    f"Lz77 pure python {name} compression: {python_time:.2f} MiB/s, {python_size / len(data):.1%} of original"
+                )
+                print(f"Lz77 {impl} {name} compression: {default_time:.2f} MiB/s")
@@ -1,7 +1,11 @@
 # vim: set fileencoding=utf-8
+import time
 import unittest
+from typing import Callable
 
-from bemani.protocol import EAmuseProtocol, Node
+from bemani.protocol import EAmuseException, EAmuseProtocol, Node, binary
+from bemani.protocol.binary import BinaryEncoding
+from bemani.tests.helpers import ExtendedTestCase
 
 
 class TestProtocol(unittest.TestCase):
@@ -426,3 +430,130 @@ class TestProtocol(unittest.TestCase):
         root.add_child(unicode_node)
 
         self.assertLoopback(root)
+
+    def test_decode_statistics(self) -> None:
+        proto = EAmuseProtocol()
+        root = Node.void("call")
+        root.add_child(Node.u32("seq", 1))
+
+        for packet_encoding, stat in [
+            (EAmuseProtocol.BINARY, "binary"),
+            (EAmuseProtocol.BINARY_DECOMPRESSED, "binary_decompressed"),
+            (EAmuseProtocol.XML, "xml"),
+        ]:
+            before = EAmuseProtocol.decode_statistics()
+            data = proto.encode(None, None, root, EAmuseProtocol.SHIFT_JIS, packet_encoding)
+            self.assertEqual(proto.decode(None, None, data), root)
+            after = EAmuseProtocol.decode_statistics()
+            self.assertEqual(after[stat], before[stat] + 1)
+            self.assertEqual(sum(after.values()), sum(before.values()) + 1)
+
+        # A corrupt binary packet should not be handed to the XML decoder.
+        before = EAmuseProtocol.decode_statistics()
+        data = proto.encode(None, None, root, EAmuseProtocol.SHIFT_JIS, EAmuseProtocol.BINARY)
+        with self.assertRaises(EAmuseException):
+            proto.decode(None, None, data[:12])
+        after = EAmuseProtocol.decode_statistics()
+        self.assertEqual(after["unknown"], before["unknown"] + 1)
+
+
+class TestBinaryParity(unittest.TestCase):
+    def __tree(self) -> Node:
+        root = Node.void("test")
+        root.set_attribute("attr", "value")
+        root.add_child(Node.u8("u8_node", 1))
+        # 3-byte composites are allocated like ints, so the byte and short after them
+        # should still fill the holes they leave behind.
+        root.add_child(Node(name="3s8_node", type=Node.NODE_TYPE_3S8, value=[-1, 2, -3]))
+        root.add_child(Node(name="3u8_node", type=Node.NODE_TYPE_3U8, value=[250, 0, 7]))
+        root.add_child(Node.s16("s16_node", -2))
+        root.add_child(Node.u8("u8_node", 3))
+        root.add_child(Node(name="3u8_node", type=Node.NODE_TYPE_3U8, value=[1, 2, 3]))
+        root.add_child(Node.s64("s64_node", -1234567890000))
+        root.add_child(Node.string("str_node", "今日は"))
+        root.add_child(Node.binary("bin_node", b"\x01\x02\x03"))
+        root.add_child(Node.fouru8("4u8_node", [1, 2, 3, 4]))
+        root.add_child(Node.bool_array("bool_array_node", [True, False, True]))
+        root.add_child(Node.s16_array("s16_array_node", [-1, 2, -3]))
+        root.add_child(Node.u8("u8_node", 5))
+        child = Node.void("child")
+        child.set_attribute("a", "1")
+        child.add_child(Node.u16("u16_node", 65000))
+        child.add_child(Node(name="3s8_node", type=Node.NODE_TYPE_3S8, value=[4, 5, 6]))
+        root.add_child(child)
+        return root
+
+    @unittest.skipIf(binary.binarycpp is None, "Native binary codec is not compiled")
+    def test_native_matches_python(self) -> None:
+        encoding = BinaryEncoding()
+        root = self.__tree()
+
+        for compressed in [True, False]:
+            native = binary.binarycpp
+            try:
+                binary.binarycpp = None
+                python_data = encoding.encode(root, "shift-jis", compressed)
+                self.assertEqual(root, encoding.decode(python_data))
+            finally:
+                binary.binarycpp = native
+            native_data = encoding.encode(root, "shift-jis", compressed)
+
+            self.assertEqual(native_data, python_data)
+            self.assertEqual(root, encoding.decode(python_data))
+
+
+class TestBinaryBenchmark(ExtendedTestCase):
+    def __time(self, func: Callable[[], object]) -> float:
+        start = time.perf_counter()
+        for _ in range(5):
+            func()
+        return (time.perf_counter() - start) / 5
+
+    def __packet(self) -> Node:
+        # Roughly the shape of a large score load response.
+        root = Node.void("response")
+        root.set_attribute("status", "0")
+        music = Node.void("music")
+        root.add_child(music)
+        for songid in range(500):
+            song = Node.void("song")
+            song.set_attribute("id", str(songid))
+            song.set_attribute("chart", str(songid % 4))
+            music.add_child(song)
+            song.add_child(Node.string("name", f"ソング {songid}"))
+            song.add_child(Node.s32("points", songid * 1000))
+            song.add_child(Node.u8("medal", songid % 11))
+            song.add_child(Node.bool("full_combo", songid % 2 == 0))
+            song.add_child(Node.u16("combo", songid))
+            song.add_child(Node.s16_array("ghost", [songid % 100] * 32))
+            song.add_child(Node.time("timestamp", 1600000000 + songid))
+            song.add_child(Node.float("rate", songid / 4.0))
+            song.add_child(Node.fouru8("judge", [1, 2, 3, 4]))
+            song.add_child(Node.ipv4("ip", "10.0.0.1"))
+        return root
+
+    def test_benchmark(self) -> None:
+        root = self.__packet()
+        encoding = BinaryEncoding()
+
+        for compressed in [True, False]:
+            # Make sure that both the native and fallback implementations agree.
+            native = binary.binarycpp
+            try:
+                binary.binarycpp = None
+                data = encoding.encode(root, "shift-jis", compressed)
+                self.assertEqual(root, encoding.decode(data))
+                python_encode = self.__time(lambda: encoding.encode(root, "shift-jis", compressed))
+                python_decode = self.__time(lambda: encoding.decode(data))
+            finally:
+                binary.binarycpp = native
+            self.assertEqual(data, encoding.encode(root, "shift-jis", compressed))
+            self.assertEqual(root, encoding.decode(data))
+            default_encode = self.__time(lambda: encoding.encode(root, "shift-jis", compressed))
+            default_decode = self.__time(lambda: encoding.decode(data))
+
+            if self.verbose:
+                name = "native" if native is not None else "pure python"
+                print(f"Binary {'compressed' if compressed else 'decompressed'} packet, {len(data)} bytes")
+                print(f"    pure python: encode {python_encode * 1000:.2f} ms, decode {python_decode * 1000:.2f} ms")
+                print(f"    {name}: encode {default_encode * 1000:.2f} ms, decode {default_decode * 1000:.2f} ms")
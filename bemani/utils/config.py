@@ -1,6 +1,6 @@
 import yaml
 from flask import Flask
-from typing import Optional, Set
+from typing import Any, Dict, Optional, Set
 
 from bemani.backend.iidx import IIDXFactory
 from bemani.backend.popn import PopnMusicFactory
@@ -28,6 +28,19 @@ def load_config(filename: str, config: Config) -> None:
     config["support"] = supported_series
 
 
+def tiered_cache_config(config: Config, cacheconfig: Dict[str, Any]) -> Dict[str, Any]:
+    if config.local_cache_size <= 0 or config.local_cache_timeout <= 0:
+        # Local caching is disabled, so use the backend directly.
+        return cacheconfig
+    return {
+        **cacheconfig,
+        "CACHE_TYPE": "bemani.common.cache.TieredCache",
+        "CACHE_TIERED_REMOTE": cacheconfig["CACHE_TYPE"],
+        "CACHE_TIERED_LOCAL_SIZE": config.local_cache_size,
+        "CACHE_TIERED_LOCAL_TIMEOUT": config.local_cache_timeout,
+    }
+
+
 def instantiate_cache(config: Config, app: Optional[Flask] = None) -> None:
     # Possibly set up a dummy app context because flask-caching needs it.
     if app is None:
@@ -35,21 +48,29 @@ def instantiate_cache(config: Config, app: Optional[Flask] = None) -> None:
 
     # This could easily be extended to add support for any other backend that flask-caching
     # supports but right now the only demand is for in-memory, filesystem and memcached.
+    # Backends that live outside of this process get a small in-process cache in front of
+    # them, so hot values don't cost a round-trip on every lookup.
     if config.memcached_server is not None:
         cache.init_app(
             app,
-            config={
-                "CACHE_TYPE": "MemcachedCache",
-                "CACHE_MEMCACHED_SERVERS": [config.memcached_server],
-            },
+            config=tiered_cache_config(
+                config,
+                {
+                    "CACHE_TYPE": "MemcachedCache",
+                    "CACHE_MEMCACHED_SERVERS": [config.memcached_server],
+                },
+            ),
         )
     elif config.cache_dir is not None:
         cache.init_app(
             app,
-            config={
-                "CACHE_TYPE": "FileSystemCache",
-                "CACHE_DIR": config.cache_dir,
-            },
+            config=tiered_cache_config(
+                config,
+                {
+                    "CACHE_TYPE": "FileSystemCache",
+                    "CACHE_DIR": config.cache_dir,
+                },
+            ),
         )
     else:
         cache.init_app(
@@ -59,6 +80,11 @@ def instantiate_cache(config: Config, app: Optional[Flask] = None) -> None:
             },
         )
 
+    # Outside of an app context flask-caching falls back to the app it was created with, which
+    # would leave background threads and scripts talking to the default in-memory cache. Point
+    # that fallback at the configured cache so everything in the process shares it.
+    cache.app = app
+
 
 def register_games(config: Config) -> None:
     if GameConstants.POPN_MUSIC in config.support:
@@ -68,11 +68,18 @@ def remove_admin(config: Config, username: Optional[str]) -> None:
     print(f"User {username} lost admin rights.")
 
 
+def rebuild_statistics(config: Config) -> None:
+    data = Data(config)
+    tallied = data.local.music.rebuild_clear_statistics()
+    data.close()
+    print(f"Rebuilt clear statistics from {tallied} attempts.")
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="A utility for working with databases created with this codebase.")
     parser.add_argument(
         "operation",
-        help="Operation to perform, options include 'create', 'generate', 'upgrade', 'change-password', 'add-admin' and 'remove-admin'.",
+        help="Operation to perform, options include 'create', 'generate', 'upgrade', 'change-password', 'add-admin', 'remove-admin' and 'rebuild-statistics'.",
         type=str,
     )
     parser.add_argument(
@@ -118,6 +125,8 @@ def main() -> None:
             remove_admin(config, args.username)
         elif args.operation == "change-password":
             change_password(config, args.username)
+        elif args.operation == "rebuild-statistics":
+            rebuild_statistics(config)
         else:
             raise Exception(f"Unknown operation '{args.operation}'")
     except DBCreateException as e:
@@ -1,11 +1,73 @@
 import argparse
+import multiprocessing
 import os
 
-from typing import Optional
+from typing import Optional, Tuple
 
 from bemani.format import IFS
 
 
+def load_ifs(
+    fileroot: str,
+    fname: str,
+    root: bool = False,
+    convert_xml_files: bool = False,
+    convert_texture_files: bool = False,
+) -> Optional[IFS]:
+    fname = os.path.join(fileroot, fname)
+    if os.path.isfile(fname):
+        return IFS.open(
+            fname,
+            decode_binxml=root and convert_xml_files,
+            decode_textures=root and convert_texture_files,
+            keep_hex_names=not root,
+            reference_loader=lambda ref: load_ifs(fileroot, ref),
+        )
+    else:
+        return None
+
+
+def write_file(root: str, fn: str, data: bytes) -> None:
+    realfn = os.path.join(root, fn)
+    dirof = os.path.dirname(realfn)
+    os.makedirs(dirof, exist_ok=True)
+    with open(realfn, "wb") as fp:
+        fp.write(data)
+
+
+# Each worker process opens its own copy of the IFS file to extract from.
+worker: Optional[Tuple[IFS, str]] = None
+
+
+def init_worker(
+    fileroot: str,
+    fname: str,
+    directory: str,
+    convert_xml_files: bool,
+    convert_texture_files: bool,
+) -> None:
+    global worker
+
+    ifs = load_ifs(
+        fileroot,
+        fname,
+        root=True,
+        convert_xml_files=convert_xml_files,
+        convert_texture_files=convert_texture_files,
+    )
+    if ifs is None:
+        raise Exception(f"Couldn't locate file {fname}!")
+    worker = (ifs, directory)
+
+
+def extract_file(fn: str) -> str:
+    if worker is None:
+        raise Exception("Logic error, worker was not initialized!")
+    ifs, directory = worker
+    write_file(directory, fn, ifs.read_file(fn))
+    return fn
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="A utility to extract IFS files.")
     parser.add_argument(
@@ -29,6 +91,13 @@ def main() -> None:
         help="Convert texture files that are in game-format to PNG files.",
         action="store_true",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Number of processes to extract and convert files with. Use 0 for one per CPU core. Defaults to 1.",
+        type=int,
+        default=1,
+    )
     args = parser.parse_args()
 
     root = args.directory
@@ -37,35 +106,40 @@ def main() -> None:
     root = os.path.realpath(root)
 
     fileroot = os.path.dirname(os.path.realpath(args.file))
-
-    def load_ifs(fname: str, root: bool = False) -> Optional[IFS]:
-        fname = os.path.join(fileroot, fname)
-        if os.path.isfile(fname):
-            fp = open(fname, "rb")
-            data = fp.read()
-            fp.close()
-
-            return IFS(
-                data,
-                decode_binxml=root and args.convert_xml_files,
-                decode_textures=root and args.convert_texture_files,
-                keep_hex_names=not root,
-                reference_loader=load_ifs,
-            )
-        else:
-            return None
-
-    ifs = load_ifs(args.file, root=True)
+    ifs = load_ifs(
+        fileroot,
+        args.file,
+        root=True,
+        convert_xml_files=args.convert_xml_files,
+        convert_texture_files=args.convert_texture_files,
+    )
     if ifs is None:
         raise Exception(f"Couldn't locate file {args.file}!")
 
-    for fn in ifs.filenames:
-        print(f"Extracting {fn} to disk...")
-        realfn = os.path.join(root, fn)
-        dirof = os.path.dirname(realfn)
-        os.makedirs(dirof, exist_ok=True)
-        with open(realfn, "wb") as fp:
-            fp.write(ifs.read_file(fn))
+    jobs = args.jobs if args.jobs > 0 else multiprocessing.cpu_count()
+    with ifs:
+        filenames = ifs.filenames
+        if jobs == 1:
+            for i, (fn, data) in enumerate(ifs.read_files(), start=1):
+                print(f"Extracting {fn} to disk ({i}/{len(filenames)})...")
+                write_file(root, fn, data)
+        else:
+            # Decompressing and converting files happens in the workers, which write
+            # them out directly. Results come back in order so progress is reported
+            # the same way no matter how the work was split up.
+            with multiprocessing.Pool(
+                jobs,
+                initializer=init_worker,
+                initargs=(
+                    fileroot,
+                    args.file,
+                    root,
+                    args.convert_xml_files,
+                    args.convert_texture_files,
+                ),
+            ) as pool:
+                for i, fn in enumerate(pool.imap(extract_file, filenames), start=1):
+                    print(f"Extracted {fn} to disk ({i}/{len(filenames)})...")
 
 
 if __name__ == "__main__":
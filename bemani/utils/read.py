@@ -25,13 +25,13 @@ from bemani.common import (
     Time,
 )
 from bemani.format import ARC, IFS, IIDXChart, IIDXMusicDB
-from bemani.data import Config, Server, Song
+from bemani.data import Config, Data, Server, Song
 from bemani.data.interfaces import APIProviderInterface
 from bemani.data.api.music import GlobalMusicData
 from bemani.data.api.game import GlobalGameData
 from bemani.data.mysql.music import MusicData
 from bemani.data.mysql.user import UserData
-from bemani.utils.config import load_config
+from bemani.utils.config import load_config, instantiate_cache
 
 
 class CLIException(Exception):
@@ -3989,14 +3989,11 @@ class ImportIIDX(ImportBase):
                             data = fp.read()
                             fp.close()
                         else:
-                            fp = open(filename, "rb")
-                            ifsdata = fp.read()
-                            fp.close()
-                            ifs = IFS(ifsdata)
-                            for fn in ifs.filenames:
-                                _, extension = os.path.splitext(fn)
-                                if extension == ".1":
-                                    data = ifs.read_file(fn)
+                            with IFS.open(filename) as ifs:
+                                for fn in ifs.filenames:
+                                    _, extension = os.path.splitext(fn)
+                                    if extension == ".1":
+                                        data = ifs.read_file(fn)
 
                         if data is not None:
                             iidxchart = IIDXChart(data)
@@ -6307,6 +6304,7 @@ def main() -> None:
     # Load the config so we can talk to the server
     config = Config()
     load_config(args.config, config)
+    instantiate_cache(config)
 
     series = None
     try:
@@ -6468,6 +6466,11 @@ def main() -> None:
     else:
         raise CLIException("Unsupported game series!")
 
+    # Let running servers know that songs have changed so they reload their song catalogs.
+    data = Data(config)
+    data.local.music.publish_catalog(config.music_catalog)
+    data.close()
+
 
 if __name__ == "__main__":
     try:
@@ -21,10 +21,55 @@ from bemani.frontend.sdvx import SoundVoltexCache
 from bemani.frontend.reflec import ReflecBeatCache
 from bemani.frontend.museca import MusecaCache
 from bemani.frontend.danevo import DanceEvolutionCache
-from bemani.common import GameConstants, Time
+from bemani.common import APIConstants, GameConstants, Time
 from bemani.data import Config, Data
+from bemani.data.api.client import APIClient, APIException
 from bemani.utils.config import load_config, instantiate_cache
 
+# How far back to re-request records on every sync, in case a remote server's clock
+# is a little behind ours and it records something with a timestamp we already asked about.
+SYNC_OVERLAP = Time.SECONDS_IN_MINUTE * 5
+
+
+def sync_remote_data(data: Data, config: Config) -> None:
+    # Mirror records and statistics from every remote server into our own DB, so that game
+    # requests can look them up locally instead of waiting on the network for them.
+    for server in data.local.api.get_all_servers():
+        client = APIClient(server.uri, server.token, server.allow_stats, server.allow_scores)
+
+        for game in config.support:
+            for version in data.local.music.get_all_versions(game):
+                now = Time.now()
+
+                if server.allow_scores:
+                    # Only ask for records that changed since the last time we successfully synced.
+                    last = data.local.api.get_remote_syncs(game, version, "records").get(server.id)
+                    try:
+                        records = client.fetch_records(
+                            game,
+                            version,
+                            APIConstants.ID_TYPE_SERVER,
+                            [],
+                            since=(last - SYNC_OVERLAP) if last is not None else None,
+                            until=now,
+                        )
+                    except APIException:
+                        # Server is down or doesn't support this game, try again next time.
+                        pass
+                    else:
+                        with data.transaction():
+                            data.local.api.put_remote_records(server.id, game, version, records, now)
+
+                if server.allow_stats:
+                    try:
+                        statistics = client.fetch_statistics(game, version, APIConstants.ID_TYPE_SERVER, [])
+                    except APIException:
+                        # Server is down or doesn't support this game, try again next time.
+                        pass
+                    else:
+                        with data.transaction():
+                            data.local.api.put_remote_statistics(server.id, game, version, statistics, now)
+
 
 def run_scheduled_work(config: Config) -> None:
     data = Data(config)
@@ -67,6 +112,9 @@ def run_scheduled_work(config: Config) -> None:
     for factory in enabled_factories:
         factory.run_scheduled_work(data, config)
 
+    # Now, pull down anything new from remote servers
+    sync_remote_data(data, config)
+
     # Now, warm the caches for the frontend
     for cache in enabled_caches:
         cache.preload(data, config)
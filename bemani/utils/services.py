@@ -1,12 +1,13 @@
 import argparse
 import traceback
 from flask import Flask, request, redirect, Response, make_response
-from typing import Any
+from typing import Any, Optional
 
 
 from bemani.protocol import EAmuseProtocol
 from bemani.backend import Dispatch, UnrecognizedPCBIDException
 from bemani.data import Config, Data
+from bemani.data.mysql.music import MusicData
 from bemani.utils.config import (
     load_config as base_load_config,
     instantiate_cache as base_instantiate_cache,
@@ -17,6 +18,21 @@ from bemani.utils.config import (
 app = Flask(__name__)
 config = Config()
 
+# A single data provider per worker, created on first use so that it is created
+# after any forking. Each request gets its own DB session on top of this, which is
+# returned to the engine's pool when the request finishes.
+shared_data: Optional[Data] = None
+
+
+def get_data_provider() -> Data:
+    global shared_data
+
+    if shared_data is None:
+        shared_data = Data(config)
+        if config.music_catalog is not None:
+            MusicData.load_catalog_snapshot(config.music_catalog)
+    return shared_data
+
 
 @app.route("/", defaults={"path": ""}, methods=["GET"])
 @app.route("/<path:path>", methods=["GET"])
@@ -52,12 +68,12 @@ def receive_request(path: str) -> Response:
         return Response("Unrecognized packet!", 500)
 
     # Create and format config
-    requestconfig = config.clone()
+    requestconfig = config.overlay()
     requestconfig["client"] = {
         "address": remote_address or request.remote_addr,
     }
 
-    dataprovider = Data(requestconfig)
+    dataprovider = get_data_provider()
     try:
         dispatch = Dispatch(requestconfig, dataprovider, config["verbose"])
         resp = dispatch.handle(req)
@@ -113,7 +129,7 @@ def receive_request(path: str) -> Response:
         )
         return Response("Crash when handling packet!", 500)
     finally:
-        dataprovider.close()
+        dataprovider.release()
 
 
 def register_games() -> None:
@@ -30,6 +30,28 @@ def extensions():
             extra_compile_args=["-std=c++14"],
             extra_link_args=["-std=c++14"],
         ),
+        # Alternative, much faster version of RC4 which is used to encrypt and
+        # decrypt every packet for games that use old-style encryption.
+        Extension(
+            "bemani.protocol.rc4cpp",
+            [
+                "bemani/protocol/rc4cpp.cxx",
+            ],
+            language="c++",
+            extra_compile_args=["-std=c++14"],
+            extra_link_args=["-std=c++14"],
+        ),
+        # Typed implementation of the binary packet codec which skips the byte-at-a-time
+        # stream wrappers and the list-based hole-fill allocator of the pure python code.
+        Extension(
+            "bemani.protocol.binarycpp",
+            [
+                "bemani/protocol/binarycpp.pyx",
+            ],
+            language="c++",
+            extra_compile_args=["-std=c++14"],
+            extra_link_args=["-std=c++14"],
+        ),
         # This is a memory-unsafe, orders of magnitude faster threaded implementation
         # of the pure python blend code which takes rendering rough animations down
         # from over an hour to around a minute.
@@ -108,6 +130,14 @@ def extensions():
                             "bemani/protocol/lz77.py",
                         ]
                     ),
+                    # The C++ implementation of RC4 is used when available, but the fallback
+                    # touches every byte of every encrypted packet so compile it anyway.
+                    Extension(
+                        "bemani.protocol.rc4",
+                        [
+                            "bemani/protocol/rc4.py",
+                        ]
+                    ),
                     # Every single backend service uses this class for construction and
                     # parsing, so compiling this makes sense.
                     Extension(
@@ -263,6 +293,10 @@ setup(
     install_requires=[
         req for req in open('requirements.txt').read().split('\n') if len(req) > 0
     ],
+    extras_require={
+        # Optional, used to convert DXT textures a whole image at a time when present.
+        'numpy': ['numpy'],
+    },
     ext_modules=extensions(),
     cmdclass={
         'clean_ext': CleanExtCommand,